@@ -0,0 +1,59 @@
+"""Benchmark cold import time of bond_api entry points.
+
+Each import runs in a fresh interpreter so module caches do not hide the cost.
+
+    PYTHONPATH=. python benchmarks/import_time.py [--runs N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "bond_api.bpup": "import bond_api.bpup",
+    "bond_api.Action": "from bond_api import Action",
+    "bond_api.Bond": "from bond_api import Bond",
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, "aiohttp" in sys.modules)
+"""
+
+
+def measure(statement: str, runs: int):
+    """Return import times in ms and whether aiohttp was loaded."""
+    times = []
+    loaded = False
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        times.append(float(output[0]) * 1000)
+        loaded = output[1] == "True"
+    return times, loaded
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'import':<20} {'median ms':>10} {'min ms':>10}  aiohttp")
+    for name, statement in CASES.items():
+        times, loaded = measure(statement, args.runs)
+        print(
+            f"{name:<20} {statistics.median(times):>10.2f} {min(times):>10.2f}  {loaded}"
+        )
+
+
+if __name__ == "__main__":
+    main()
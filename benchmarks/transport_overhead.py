@@ -0,0 +1,88 @@
+"""Benchmark client CPU time per request for each transport.
+
+A stand-in hub runs in a child process so only client-side CPU is measured.
+
+    PYTHONPATH=. python benchmarks/transport_overhead.py [--requests N]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+from aiohttp import ClientSession
+
+from bond_api import Action, Bond
+from bond_api.transport import StreamTransport
+
+STATE = json.dumps({"power": 1, "speed": 3, "light": 0, "_": "7d8a1c2e"}).encode()
+
+
+async def _handle(reader, writer):
+    while True:
+        request_line = await reader.readline()
+        if not request_line:
+            break
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        body = STATE if request_line.startswith(b"GET") else b""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+        )
+    writer.close()
+
+
+def _serve(port_queue) -> None:
+    async def main():
+        server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def _run(bond: Bond, requests: int) -> float:
+    await bond.device_state("device-1")  # warm up the connection
+    start = time.process_time()
+    for index in range(requests):
+        if index % 2:
+            await bond.action("device-1", Action.set_speed(3))
+        else:
+            await bond.device_state("device-1")
+    return (time.process_time() - start) / requests * 1e6
+
+
+async def main(host: str, requests: int) -> None:
+    """Run the benchmark against the stand-in hub."""
+    async with ClientSession() as session:
+        aiohttp_us = await _run(Bond(host, "token", session=session), requests)
+    stream = StreamTransport(host, "token")
+    stream_us = await _run(Bond(host, "token", transport=stream), requests)
+    await stream.close()
+
+    print(f"{'transport':<10} {'CPU us/request':>15}")
+    print(f"{'aiohttp':<10} {aiohttp_us:>15.1f}")
+    print(f"{'stream':<10} {stream_us:>15.1f}")
+    print(f"saving: {100 * (1 - stream_us / aiohttp_us):.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    ports = multiprocessing.Queue()
+    hub = multiprocessing.Process(target=_serve, args=(ports,), daemon=True)
+    hub.start()
+    try:
+        asyncio.run(main(f"127.0.0.1:{ports.get()}", args.requests))
+    finally:
+        hub.terminate()
@@ -1,10 +1,28 @@
 """Asynchronous Python wrapper library over Bond Local API."""
 
-from .bond import Bond
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
 from .bpup import BPUPSubscriptions, start_bpup
 from .action import Action, Direction
+from .deadline import deadline_scope
 from .device_type import DeviceType
 
+if TYPE_CHECKING:
+    from .bond import Bond
+    from .scene import Scene, SceneResult, execute_scene
+    from .sync import SyncBond
+
+# Modules that may pull in aiohttp are only imported on first attribute access,
+# so push-only consumers of BPUP do not pay for them.
+_LAZY_ATTRIBUTES = {
+    "Bond": ".bond",
+    "Scene": ".scene",
+    "SceneResult": ".scene",
+    "execute_scene": ".scene",
+    "SyncBond": ".sync",
+}
+
 __all__ = [
     "Bond",
     "BPUPSubscriptions",
@@ -12,4 +30,22 @@ __all__ = [
     "Action",
     "Direction",
     "DeviceType",
+    "deadline_scope",
+    "Scene",
+    "SceneResult",
+    "execute_scene",
+    "SyncBond",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -157,6 +157,11 @@ class Action:
         """Hold cover."""
         return Action(Action.HOLD)
 
+    @staticmethod
+    def set_timer(seconds: int) -> "Action":
+        """Turns the device off after the given number of seconds."""
+        return Action(Action.SET_TIMER, seconds)
+
     @staticmethod
     def set_speed(speed: int) -> "Action":
         """Sets fan rotation to a provided speed."""
@@ -0,0 +1,200 @@
+"""Latency from issuing an action to the hub reporting its effect."""
+
+import asyncio
+import bisect
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .action import Action
+from .effects import expected_state, matches
+
+if TYPE_CHECKING:
+    from .bpup import BPUPSubscriptions, Subscription
+
+DEFAULT_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+DEFAULT_ACTUATION_TIMEOUT = 10.0
+UNKNOWN_DEVICE_TYPE = "unknown"
+
+# (hub, device type, action name)
+ActuationKey = Tuple[str, str, str]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Counts of samples per bucket with fixed upper bounds, plus an overflow bucket."""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS) -> None:
+        """Create an empty histogram."""
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        """Record a sample."""
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of samples."""
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float) -> float:
+        """Return the upper bound of the bucket holding the given quantile."""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram as plain data."""
+        return {
+            "bounds": list(self.bounds),
+            "buckets": list(self.buckets),
+            "count": self.count,
+            "sum": self.total,
+        }
+
+
+class _PendingActuation:
+    def __init__(self, key: ActuationKey, expected: Dict[str, Any], issued: float):
+        self.key = key
+        self.expected = expected
+        self.issued = issued
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class ActuationTracker:
+    """Correlates actions with the BPUP pushes reporting their effect.
+
+    The time from sending an action to the first push of the device matching
+    its expected state (or simply the next push, for actions without a known
+    effect) is recorded in a histogram per (hub, device type, action name) and
+    passed to `exporter`, if given. Actions without a push within `timeout`
+    seconds are counted in `timeouts` once that time has passed, whether or
+    not the device pushes again. Actions sent without BPUP subscriptions are
+    not tracked since nothing could confirm them.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = DEFAULT_ACTUATION_TIMEOUT,
+        bounds: Sequence[float] = DEFAULT_BOUNDS,
+        exporter: Optional[Callable[[ActuationKey, float], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an empty tracker."""
+        self._timeout = timeout
+        self._bounds = bounds
+        self._exporter = exporter
+        self._clock = clock
+        self._device_types: Dict[Tuple[str, str], str] = {}
+        self._pending: Dict[Tuple[str, str], List[_PendingActuation]] = {}
+        # by (id of the BPUP subscriptions, hub, device ID)
+        self._tracked: Dict[Tuple[int, str, str], "Subscription"] = {}
+        self.histograms: Dict[ActuationKey, Histogram] = {}
+        self.timeouts: Dict[ActuationKey, int] = {}
+
+    def set_device_type(self, hub: str, device_id: str, device_type: str) -> None:
+        """Label latencies of a device with its type."""
+        self._device_types[(hub, device_id)] = device_type
+
+    def issued(
+        self,
+        hub: str,
+        device_id: str,
+        action: Action,
+        bpup_subscriptions: Optional["BPUPSubscriptions"] = None,
+    ) -> Optional[_PendingActuation]:
+        """Record that an action is being sent; return it for `discard`.
+
+        Pushes of the device are observed through the subscriptions from now
+        on; without subscriptions nothing is recorded and None is returned.
+        """
+        if bpup_subscriptions is None:
+            return None
+        device = (hub, device_id)
+        tracked = (id(bpup_subscriptions), hub, device_id)
+        if tracked not in self._tracked:
+            self._tracked[tracked] = bpup_subscriptions.subscribe(
+                device_id, lambda state: self.observe(hub, device_id, state)
+            )
+        key = (hub, self._device_types.get(device, UNKNOWN_DEVICE_TYPE), action.name)
+        pending = _PendingActuation(key, expected_state(action), self._clock())
+        pending.timer = asyncio.get_event_loop().call_later(
+            self._timeout, self._expire, device, pending
+        )
+        self._pending.setdefault(device, []).append(pending)
+        return pending
+
+    def discard(
+        self, hub: str, device_id: str, pending: Optional[_PendingActuation]
+    ) -> None:
+        """Forget an action that failed to be sent."""
+        if pending is not None:
+            self._remove((hub, device_id), pending)
+
+    def observe(self, hub: str, device_id: str, state: Dict[str, Any]) -> None:
+        """Record latencies of pending actions a reported state confirms."""
+        device = (hub, device_id)
+        now = self._clock()
+        for pending in list(self._pending.get(device, ())):
+            if now - pending.issued > self._timeout:
+                self._expire(device, pending)
+            elif matches(state, pending.expected):
+                self._remove(device, pending)
+                self._record(pending.key, now - pending.issued)
+
+    def _remove(self, device: Tuple[str, str], pending: _PendingActuation) -> bool:
+        actions = self._pending.get(device, [])
+        if pending not in actions:
+            return False
+        actions.remove(pending)
+        if not actions:
+            del self._pending[device]
+        if pending.timer is not None:
+            pending.timer.cancel()
+        return True
+
+    def _expire(self, device: Tuple[str, str], pending: _PendingActuation) -> None:
+        if self._remove(device, pending):
+            self.timeouts[pending.key] = self.timeouts.get(pending.key, 0) + 1
+
+    @property
+    def pending(self) -> int:
+        """Return the number of actions awaiting their push."""
+        return sum(len(actions) for actions in self._pending.values())
+
+    def _record(self, key: ActuationKey, latency: float) -> None:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self._bounds)
+        histogram.add(latency)
+        if self._exporter:
+            try:
+                self._exporter(key, latency)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error in actuation latency exporter")
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Return every histogram as plain data labelled by hub, device type and action."""
+        keys = list(self.histograms)
+        keys += [key for key in self.timeouts if key not in self.histograms]
+        return [
+            {
+                "hub": key[0],
+                "device_type": key[1],
+                "action": key[2],
+                "timeouts": self.timeouts.get(key, 0),
+                **self.histograms.get(key, Histogram(self._bounds)).as_dict(),
+            }
+            for key in keys
+        ]
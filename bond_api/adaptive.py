@@ -0,0 +1,64 @@
+"""Request timeouts adapted to the observed latency of a hub."""
+
+from typing import Optional
+
+DEFAULT_MIN_TIMEOUT = 1.0
+DEFAULT_MAX_TIMEOUT = 30.0
+DEFAULT_INITIAL_TIMEOUT = 10.0
+
+
+class AdaptiveTimeout:
+    """Timeout derived from a smoothed latency estimate, as TCP derives its RTO.
+
+    Each successful request updates the smoothed latency and its mean
+    deviation; the timeout is the smoothed latency plus four deviations,
+    clamped to [min_timeout, max_timeout]. A timed out request doubles the
+    timeout until the next success, so a hub that became slow is not timed
+    out over and over while a healthy one fails fast.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_timeout: float = DEFAULT_MIN_TIMEOUT,
+        max_timeout: float = DEFAULT_MAX_TIMEOUT,
+        initial_timeout: float = DEFAULT_INITIAL_TIMEOUT,
+        alpha: float = 1 / 8,
+        beta: float = 1 / 4,
+        deviations: float = 4.0,
+    ) -> None:
+        """Create an estimator with no samples yet."""
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._alpha = alpha
+        self._beta = beta
+        self._deviations = deviations
+        self._timeout = self._clamp(initial_timeout)
+        self.smoothed: Optional[float] = None
+        self.deviation = 0.0
+        self.samples = 0
+        self.timeouts = 0
+
+    @property
+    def timeout(self) -> float:
+        """Return the timeout in seconds for the next request."""
+        return self._timeout
+
+    def observe(self, latency: float) -> None:
+        """Update the estimate with the latency of a successful request."""
+        if self.smoothed is None:
+            self.smoothed = latency
+            self.deviation = latency / 2
+        else:
+            self.deviation += self._beta * (abs(latency - self.smoothed) - self.deviation)
+            self.smoothed += self._alpha * (latency - self.smoothed)
+        self.samples += 1
+        self._timeout = self._clamp(self.smoothed + self._deviations * self.deviation)
+
+    def backoff(self) -> None:
+        """Double the timeout after a request timed out."""
+        self.timeouts += 1
+        self._timeout = self._clamp(self._timeout * 2)
+
+    def _clamp(self, timeout: float) -> float:
+        return min(self._max_timeout, max(self._min_timeout, timeout))
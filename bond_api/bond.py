@@ -1,11 +1,26 @@
 """Bond Local API wrapper."""
 
-from typing import Any, Callable, List, Optional
-
-from aiohttp import ClientSession, ClientTimeout
-from aiohttp.client_exceptions import ServerDisconnectedError, ClientOSError
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Optional
 
 from .action import Action
+from .deadline import current_deadline, deadline_scope, time_left
+from .effects import expected_state, matches
+from .priority import Priority, current_priority
+from .transport import Transport
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession, ClientTimeout
+
+    from .actuation import ActuationTracker
+    from .adaptive import AdaptiveTimeout
+    from .bpup import BPUPSubscriptions
+    from .optimistic import OptimisticState, PendingEffect
+    from .priority import PriorityScheduler
+    from .ratelimit import RateLimiter
+
+DEFAULT_CONFIRM_TIMEOUT = 10.0
 
 
 class Bond:
@@ -16,90 +31,437 @@ class Bond:
         host: str,
         token: str,
         *,
-        session: Optional[ClientSession] = None,
-        timeout: Optional[ClientTimeout] = None,
+        session: Optional["ClientSession"] = None,
+        timeout: Optional["ClientTimeout"] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        bpup_subscriptions: Optional["BPUPSubscriptions"] = None,
+        optimistic_state: Optional["OptimisticState"] = None,
+        scheduler: Optional["PriorityScheduler"] = None,
+        actuation_tracker: Optional["ActuationTracker"] = None,
+        adaptive_timeout: Optional["AdaptiveTimeout"] = None,
     ):
-        """Initialize Bond with provided host and token."""
+        """Initialize Bond with provided host and token.
+
+        Requests go through aiohttp unless another transport is provided, in
+        which case session and timeout are ignored. Actions are paced by the
+        rate limiter, if any, and confirmed through BPUP subscriptions when
+        those are provided and alive. Effects of actions are applied to the
+        optimistic state as soon as they are issued. With a scheduler, requests
+        are queued by priority: device and group actions are interactive and
+        other requests normal unless sent within a `priority_scope`. The
+        actuation tracker, if any, times device actions until BPUP pushes
+        report their effect. With an adaptive timeout, each request is bounded
+        by a timeout derived from the observed latency of the hub.
+
+        Every API method accepts a `timeout` in seconds and a `deadline` as a
+        `time.monotonic()` value bounding the whole call, on top of any
+        enclosing `deadline_scope`.
+        """
         self._host = host
-        self._api_kwargs = {"headers": {"BOND-Token": token}}
-        if timeout:
-            self._api_kwargs["timeout"] = timeout
-        self._session = session
+        if transport is None:
+            from .transport_aiohttp import AiohttpTransport
+
+            transport = AiohttpTransport(host, token, session=session, timeout=timeout)
+        self._transport = transport
+        self._rate_limiter = rate_limiter
+        self._bpup_subscriptions = bpup_subscriptions
+        self._optimistic_state = optimistic_state
+        self._scheduler = scheduler
+        self._actuation_tracker = actuation_tracker
+        self._adaptive_timeout = adaptive_timeout
+
+    @property
+    def host(self) -> str:
+        """Return the host this instance talks to."""
+        return self._host
+
+    @property
+    def scheduler(self) -> Optional["PriorityScheduler"]:
+        """Return the scheduler queueing requests by priority, if any."""
+        return self._scheduler
+
+    @property
+    def rate_limiter(self) -> Optional["RateLimiter"]:
+        """Return the rate limiter pacing actions, if any."""
+        return self._rate_limiter
 
-    async def version(self) -> dict:
+    async def warm(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[float]:
+        """Open or refresh a connection to the hub ahead of use.
+
+        Return seconds until the first response byte, None when the transport
+        does not pool connections. With a scheduler, the refresh is queued as
+        background work unless sent within a `priority_scope`.
+        """
+        with deadline_scope(timeout, deadline):
+            return await self.__scheduled(self._transport.warm(), Priority.BACKGROUND)
+
+    async def version(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return the version of hub/bridge reported by API."""
-        return await self.__get("/v2/sys/version")
+        with deadline_scope(timeout, deadline):
+            return await self.__get("/v2/sys/version")
 
-    async def token(self) -> dict:
+    async def token(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return the token after power rest or proof of ownership event."""
-        return await self.__get("/v2/token")
+        with deadline_scope(timeout, deadline):
+            return await self.__get("/v2/token")
 
-    async def bridge(self) -> dict:
+    async def bridge(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return the name and location of the bridge."""
-        return await self.__get("/v2/bridge")
+        with deadline_scope(timeout, deadline):
+            return await self.__get("/v2/bridge")
 
-    async def devices(self) -> List[str]:
+    async def devices(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> List[str]:
         """Return the list of available device IDs reported by API."""
-        json = await self.__get("/v2/devices")
-        return [key for key in json if not key.startswith("_") and type(json[key]) is dict]
+        with deadline_scope(timeout, deadline):
+            json = await self.__get("/v2/devices")
+            return [key for key in json if not key.startswith("_") and type(json[key]) is dict]
+
+    async def device_hashes(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """Return the content hash of every available device reported by API."""
+        with deadline_scope(timeout, deadline):
+            json = await self.__get("/v2/devices")
+            return {
+                key: value.get("_")
+                for key, value in json.items()
+                if not key.startswith("_") and type(value) is dict
+            }
 
-    async def device(self, device_id: str) -> dict:
+    async def device(
+        self,
+        device_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return main device metadata reported by API."""
-        return await self.__get(f"/v2/devices/{device_id}")
+        with deadline_scope(timeout, deadline):
+            device = await self.__get(f"/v2/devices/{device_id}")
+            if self._actuation_tracker and "type" in device:
+                self._actuation_tracker.set_device_type(
+                    self._host, device_id, device["type"]
+                )
+            return device
 
-    async def device_properties(self, device_id: str) -> dict:
+    async def device_properties(
+        self,
+        device_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return device properties reported by API."""
-        return await self.__get(f"/v2/devices/{device_id}/properties")
+        with deadline_scope(timeout, deadline):
+            return await self.__get(f"/v2/devices/{device_id}/properties")
 
-    async def device_state(self, device_id: str) -> dict:
+    async def device_state(
+        self,
+        device_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
         """Return current device state reported by API."""
-        return await self.__get(f"/v2/devices/{device_id}/state")
+        with deadline_scope(timeout, deadline):
+            state = await self.__get(f"/v2/devices/{device_id}/state")
+            if self._optimistic_state:
+                self._optimistic_state.reconcile(device_id, state)
+            return state
 
-    async def action(self, device_id: str, action: Action) -> None:
-        """Execute given action for a given device."""
-        if action.name == Action.SET_STATE_BELIEF:
-            path = f"/v2/devices/{device_id}/state"
+    async def action(
+        self,
+        device_id: str,
+        action: Action,
+        *,
+        confirm: bool = False,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[dict]:
+        """Execute given action for a given device.
+
+        With `confirm`, wait for a BPUP push showing the effect of the action
+        and return the pushed state; the wait lasts until the deadline of the
+        call, or DEFAULT_CONFIRM_TIMEOUT seconds when unbounded. When BPUP is
+        not alive the state is read once from the API instead.
+        """
+        with deadline_scope(timeout, deadline):
+            optimistic_state = self._optimistic_state
+            effect = None
+            if optimistic_state:
+                effect = optimistic_state.apply(device_id, action)
+            state = await self.__device_action(device_id, action, confirm, effect)
+            if state is not None and optimistic_state:
+                optimistic_state.reconcile(device_id, state)
+            return state
+
+    async def __device_action(
+        self,
+        device_id: str,
+        action: Action,
+        confirm: bool,
+        effect: Optional["PendingEffect"] = None,
+    ) -> Optional[dict]:
+        subscriptions = self._bpup_subscriptions
+        waiter = None
+        try:
+            try:
+                if self._rate_limiter:
+                    await self.__within(
+                        self._rate_limiter.acquire(device_id, action.name)
+                    )
+                if confirm and subscriptions is not None and subscriptions.alive:
+                    expected = expected_state(action)
+                    waiter = subscriptions.wait_for(
+                        device_id, lambda state: matches(state, expected)
+                    )
+                await self.__send_action(device_id, action)
+            except BaseException:
+                # only an action that was not sent is undone; a missed
+                # confirmation leaves its effect pending until it expires
+                if self._optimistic_state:
+                    self._optimistic_state.rollback(effect)
+                raise
+            if not confirm:
+                return None
+            if waiter is None:
+                return await self.device_state(device_id)
+            remaining = time_left()
+            return await asyncio.wait_for(
+                waiter, DEFAULT_CONFIRM_TIMEOUT if remaining is None else remaining
+            )
+        finally:
+            if waiter is not None:
+                waiter.cancel()
 
-            async def patch(session: ClientSession) -> None:
-                async with session.patch(
-                    f"http://{self._host}{path}",
-                    **self._api_kwargs,
-                    json=action.argument,
-                ) as response:
-                    response.raise_for_status()
+    async def __send_action(self, device_id: str, action: Action) -> None:
+        path = f"/v2/devices/{device_id}"
+        tracker = self._actuation_tracker
+        if tracker is None:
+            await self.__action(path, action)
+            return
+        pending = tracker.issued(
+            self._host, device_id, action, self._bpup_subscriptions
+        )
+        try:
+            await self.__action(path, action)
+        except BaseException:
+            tracker.discard(self._host, device_id, pending)
+            raise
 
-            await self.__call(patch)
+    async def device_schedules(
+        self,
+        device_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> List[str]:
+        """Return the list of schedule IDs of a device reported by API."""
+        with deadline_scope(timeout, deadline):
+            json = await self.__get(f"/v2/devices/{device_id}/schedules")
+            return [key for key in json if not key.startswith("_")]
+
+    async def device_schedule(
+        self,
+        device_id: str,
+        schedule_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
+        """Return a schedule of a device reported by API."""
+        with deadline_scope(timeout, deadline):
+            return await self.__get(f"/v2/devices/{device_id}/schedules/{schedule_id}")
+
+    async def create_device_schedule(
+        self,
+        device_id: str,
+        schedule: dict,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[dict]:
+        """Create a schedule on a device and return it as reported by API."""
+        with deadline_scope(timeout, deadline):
+            return await self.__call(
+                "POST", f"/v2/devices/{device_id}/schedules", schedule
+            )
+
+    async def update_device_schedule(
+        self,
+        device_id: str,
+        schedule_id: str,
+        schedule: dict,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[dict]:
+        """Update fields of a schedule of a device."""
+        with deadline_scope(timeout, deadline):
+            return await self.__call(
+                "PATCH", f"/v2/devices/{device_id}/schedules/{schedule_id}", schedule
+            )
+
+    async def delete_device_schedule(
+        self,
+        device_id: str,
+        schedule_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """Delete a schedule of a device."""
+        with deadline_scope(timeout, deadline):
+            await self.__call(
+                "DELETE", f"/v2/devices/{device_id}/schedules/{schedule_id}"
+            )
+
+    async def groups(
+        self,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> List[str]:
+        """Return the list of available group IDs reported by API."""
+        with deadline_scope(timeout, deadline):
+            json = await self.__get("/v2/groups")
+            return [key for key in json if not key.startswith("_") and type(json[key]) is dict]
+
+    async def group(
+        self,
+        group_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
+        """Return main group metadata reported by API."""
+        with deadline_scope(timeout, deadline):
+            return await self.__get(f"/v2/groups/{group_id}")
+
+    async def group_properties(
+        self,
+        group_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
+        """Return group properties reported by API."""
+        with deadline_scope(timeout, deadline):
+            return await self.__get(f"/v2/groups/{group_id}/properties")
+
+    async def group_state(
+        self,
+        group_id: str,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> dict:
+        """Return current group state reported by API."""
+        with deadline_scope(timeout, deadline):
+            return await self.__get(f"/v2/groups/{group_id}/state")
+
+    async def group_action(
+        self,
+        group_id: str,
+        action: Action,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """Execute given action for all devices of a given group in one request."""
+        with deadline_scope(timeout, deadline):
+            if self._rate_limiter:
+                await self.__within(
+                    self._rate_limiter.acquire(f"groups/{group_id}", action.name)
+                )
+            await self.__action(f"/v2/groups/{group_id}", action)
+
+    async def __action(self, base_path: str, action: Action) -> None:
+        if action.name == Action.SET_STATE_BELIEF:
+            await self.__call(
+                "PATCH", f"{base_path}/state", action.argument, Priority.INTERACTIVE
+            )
         else:
-            path = f"/v2/devices/{device_id}/actions/{action.name}"
-
-            async def put(session: ClientSession) -> None:
-                async with session.put(
-                    f"http://{self._host}{path}",
-                    **self._api_kwargs,
-                    json=action.argument,
-                ) as response:
-                    response.raise_for_status()
-
-            await self.__call(put)
-
-    async def __get(self, path) -> dict:
-        async def get(session: ClientSession) -> dict:
-            async with session.get(
-                f"http://{self._host}{path}", **self._api_kwargs
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
-
-        return await self.__call(get)
-
-    async def __call(self, handler: Callable[[ClientSession], Any]):
-        if not self._session:
-            async with ClientSession() as request_session:
-                return await handler(request_session)
+            await self.__call(
+                "PUT",
+                f"{base_path}/actions/{action.name}",
+                action.argument,
+                Priority.INTERACTIVE,
+            )
+
+    async def __get(self, path: str) -> dict:
+        return await self.__call("GET", path)
+
+    async def __call(
+        self,
+        method: str,
+        path: str,
+        json: Optional[dict] = None,
+        default: Priority = Priority.NORMAL,
+    ) -> Any:
+        if self._adaptive_timeout:
+            request = self.__adaptive_request(method, path, json)
         else:
-            try:
-                return await handler(self._session)
-            except (ClientOSError, ServerDisconnectedError):
-                # bond has a short connection close time
-                # so we need to retry if we idled for a bit
-                return await handler(self._session)
+            request = self._transport.request(method, path, json)
+        return await self.__scheduled(request, default)
+
+    async def __scheduled(self, request: Awaitable[Any], default: Priority) -> Any:
+        if self._scheduler:
+            request = self._scheduler.run(current_priority(default), request)
+        # the deadline covers queueing and transport retries as a whole
+        return await self.__within(request)
+
+    async def __adaptive_request(
+        self, method: str, path: str, json: Optional[dict]
+    ) -> Any:
+        adaptive = self._adaptive_timeout
+        assert adaptive is not None
+        outer = current_deadline()
+        start = time.monotonic()
+        ours = start + adaptive.timeout
+        try:
+            with deadline_scope(deadline=ours):
+                result = await self.__within(self._transport.request(method, path, json))
+        except asyncio.TimeoutError:
+            # an earlier deadline of the caller says nothing about the hub
+            if outer is None or ours < outer:
+                adaptive.backoff()
+            raise
+        adaptive.observe(time.monotonic() - start)
+        return result
+
+    @staticmethod
+    async def __within(awaitable: Awaitable[Any]) -> Any:
+        remaining = time_left()
+        if remaining is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, remaining)
@@ -3,62 +3,338 @@
 import asyncio
 import json
 import logging
+import os
+import socket
+import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, cast
+import weakref
+from collections import deque
+from concurrent.futures import Executor
+from types import BuiltinMethodType, MethodType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
+
+if TYPE_CHECKING:
+    from .recording import BPUPRecorder
 
 BPUP_INIT_PUSH_MESSAGE = b"\n"
 BPUP_PORT = 30007
 BPUP_ALIVE_TIMEOUT = 70
+BPUP_SLOW_CALLBACK_THRESHOLD = 0.05
+BPUP_MAX_DATAGRAM = 65535
+PROC_NET_UDP = ("/proc/net/udp", "/proc/net/udp6")
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class CallbackStats:
+    """Execution statistics of a subscriber callback."""
+
+    def __init__(self) -> None:
+        """Init empty statistics."""
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.slow = False
+
+    @property
+    def mean_time(self) -> float:
+        """Return the mean execution time in seconds."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+def _callback_key(callback: Callable) -> Any:
+    """Return a key equal for equal callbacks without referencing them."""
+    if isinstance(callback, MethodType):
+        return (id(callback.__self__), callback.__func__)
+    if isinstance(callback, BuiltinMethodType) and callback.__self__ is not None:
+        return (id(callback.__self__), callback.__name__)
+    return id(callback)
+
+
+class Subscription:
+    """Handle of a single BPUP subscription."""
+
+    def __init__(
+        self,
+        registry: "_Registry",
+        topic_id: str,
+        callback: Callable,
+        weak: bool,
+        offload: bool = False,
+    ) -> None:
+        """Create a subscription, referencing the callback weakly if asked to."""
+        self._registry = registry
+        self.topic_id = topic_id
+        self.key = _callback_key(callback)
+        self.offload = offload
+        self.stats = CallbackStats()
+        # pushes waiting for the executor, delivered one at a time in order
+        self.queue: Deque[Dict[str, Any]] = deque()
+        self.draining = False
+        self.lock = threading.Lock()
+        self._callback: Optional[Callable] = None
+        self._ref: Optional[Callable[[], Optional[Callable]]] = None
+        if not weak:
+            self._callback = callback
+        elif isinstance(callback, MethodType):
+            self._ref = weakref.WeakMethod(callback, self._collected)
+        else:
+            self._ref = weakref.ref(callback, self._collected)
+
+    @property
+    def callback(self) -> Optional[Callable]:
+        """Return the callback, or None if it was garbage collected."""
+        return self._ref() if self._ref is not None else self._callback
+
+    def unsubscribe(self) -> None:
+        """Remove this subscription; does nothing if already removed."""
+        self._registry.remove(self)
+
+    def _collected(self, _ref: Any) -> None:
+        self._registry.remove(self)
+
+
+class _Registry:
+    """Subscriptions by topic ID with O(1) add and remove."""
+
+    def __init__(self) -> None:
+        self._topics: Dict[str, Dict[int, Subscription]] = {}
+        self._by_key: Dict[Tuple[str, Any], List[Subscription]] = {}
+
+    def add(
+        self, topic_id: str, callback: Callable, weak: bool, offload: bool
+    ) -> Subscription:
+        subscription = Subscription(self, topic_id, callback, weak, offload)
+        self._topics.setdefault(topic_id, {})[id(subscription)] = subscription
+        self._by_key.setdefault((topic_id, subscription.key), []).append(subscription)
+        return subscription
+
+    def remove(self, subscription: Subscription) -> None:
+        topic = self._topics.get(subscription.topic_id, {})
+        if topic.pop(id(subscription), None) is None:
+            return
+        if not topic:
+            del self._topics[subscription.topic_id]
+        key = (subscription.topic_id, subscription.key)
+        same_key = self._by_key[key]
+        same_key.remove(subscription)
+        if not same_key:
+            del self._by_key[key]
+
+    def remove_callback(self, topic_id: str, callback: Callable) -> None:
+        same_key = self._by_key.get((topic_id, _callback_key(callback)))
+        if same_key:
+            self.remove(same_key[0])
+        else:
+            _LOGGER.debug("No BPUP subscription of %s for %s", callback, topic_id)
+
+    def get(self, topic_id: str) -> Tuple[Subscription, ...]:
+        """Return a snapshot of the subscriptions of a topic ID."""
+        return tuple(self._topics.get(topic_id, {}).values())
+
+    def all(self) -> Iterator[Subscription]:
+        for topic in list(self._topics.values()):
+            yield from list(topic.values())
+
+
 class BPUPSubscriptions:
     """Store BPUP subscriptions."""
 
-    def __init__(self) -> None:
-        """Init and store callbacks."""
-        self._callbacks: Dict[str, List[Callable]] = {}
+    def __init__(
+        self,
+        *,
+        slow_callback_threshold: float = BPUP_SLOW_CALLBACK_THRESHOLD,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """Init and store callbacks.
+
+        Callbacks taking longer than `slow_callback_threshold` seconds are
+        flagged as slow. With an executor, later calls of flagged callbacks
+        subscribed with `offload` run on the executor instead of the receive
+        path: off the event loop thread, one at a time and in push order.
+        Other callbacks always run on the event loop.
+        """
+        self._devices = _Registry()
+        self._groups = _Registry()
+        self._slow_callback_threshold = slow_callback_threshold
+        self._executor = executor
         self.last_message_time: float = -BPUP_ALIVE_TIMEOUT
+        self.message_count = 0
+        self.parse_error_count = 0
+        self.socket_inode: Optional[int] = None
 
     @property
     def alive(self) -> bool:
         """Return if the subscriptions are considered alive."""
         return (time.monotonic() - self.last_message_time) < BPUP_ALIVE_TIMEOUT
 
+    @property
+    def kernel_drops(self) -> Optional[int]:
+        """Return pushes the kernel dropped for lack of receive buffer space.
+
+        Only known on Linux once started with `start_bpup`, None otherwise.
+        """
+        if self.socket_inode is None:
+            return None
+        return udp_drops(self.socket_inode)
+
+    @property
+    def callback_stats(self) -> Dict[Callable, CallbackStats]:
+        """Return execution statistics of subscribed callbacks."""
+        stats = {}
+        for registry in (self._devices, self._groups):
+            for subscription in registry.all():
+                callback = subscription.callback
+                if callback is not None:
+                    stats[callback] = subscription.stats
+        return stats
+
     def connection_lost(self) -> None:
         """Set the last message time to never."""
         self.last_message_time = -BPUP_ALIVE_TIMEOUT
 
-    def subscribe(self, device_id: str, callback: Callable) -> None:
-        """Subscribe to BPUP updates."""
-        self._callbacks.setdefault(device_id, []).append(callback)
+    def subscribe(
+        self,
+        device_id: str,
+        callback: Callable,
+        *,
+        weak: bool = False,
+        offload: bool = False,
+    ) -> Subscription:
+        """Subscribe to BPUP updates.
+
+        With `weak`, the callback is not kept alive by the subscription, which
+        is removed once the callback is garbage collected. With `offload`, the
+        callback may be moved to the executor once it is flagged as slow, so
+        it must not touch the event loop.
+        """
+        return self._devices.add(device_id, callback, weak, offload)
 
     def unsubscribe(self, device_id: str, callback: Callable) -> None:
         """Unsubscribe from BPUP updates."""
-        self._callbacks[device_id].remove(callback)
+        self._devices.remove_callback(device_id, callback)
+
+    def subscribe_group(
+        self,
+        group_id: str,
+        callback: Callable,
+        *,
+        weak: bool = False,
+        offload: bool = False,
+    ) -> Subscription:
+        """Subscribe to BPUP updates for a group."""
+        return self._groups.add(group_id, callback, weak, offload)
+
+    def unsubscribe_group(self, group_id: str, callback: Callable) -> None:
+        """Unsubscribe from BPUP updates for a group."""
+        self._groups.remove_callback(group_id, callback)
+
+    def subscribers(self, device_id: str) -> int:
+        """Return the number of subscriptions for a device."""
+        return len(self._devices.get(device_id))
+
+    def wait_for(
+        self, device_id: str, predicate: Callable[[dict], bool]
+    ) -> "asyncio.Future[dict]":
+        """Return a future resolved by the first device update matching predicate.
+
+        The subscription is removed once the future is done or cancelled.
+        """
+        future: "asyncio.Future[dict]" = asyncio.get_event_loop().create_future()
+
+        def _on_update(state: dict) -> None:
+            if not future.done() and predicate(state):
+                future.set_result(state)
+
+        subscription = self.subscribe(device_id, _on_update)
+        future.add_done_callback(lambda _: subscription.unsubscribe())
+        return future
 
     def notify(self, json_msg: Dict[str, Any]) -> None:
         """Notify subscribers of an update."""
         self.last_message_time = time.monotonic()
+        self.message_count += 1
 
         if json_msg.get("s") != 200:
             return
 
         topic = json_msg["t"].split("/")
-        device_id = topic[1]
+        registry = self._groups if topic[0] == "groups" else self._devices
+
+        for subscription in registry.get(topic[1]):
+            self._dispatch(subscription, json_msg["b"])
+
+    def _dispatch(self, subscription: Subscription, body: Dict[str, Any]) -> None:
+        callback = subscription.callback
+        if callback is None:
+            return
+        if subscription.offload and subscription.stats.slow and self._executor:
+            self._offload(subscription, body)
+        else:
+            self._run(callback, body, subscription.stats)
+
+    def _offload(self, subscription: Subscription, body: Dict[str, Any]) -> None:
+        assert self._executor is not None
+        with subscription.lock:
+            subscription.queue.append(body)
+            if subscription.draining:
+                return
+            subscription.draining = True
+        self._executor.submit(self._drain, subscription)
 
-        for callback in self._callbacks.get(device_id, []):
-            callback(json_msg["b"])
+    def _drain(self, subscription: Subscription) -> None:
+        while True:
+            with subscription.lock:
+                if not subscription.queue:
+                    subscription.draining = False
+                    return
+                body = subscription.queue.popleft()
+            callback = subscription.callback
+            if callback is not None:
+                self._run(callback, body, subscription.stats)
+
+    def _run(self, callback: Callable, body: Dict[str, Any], stats: CallbackStats) -> None:
+        start = time.perf_counter()
+        try:
+            callback(body)
+        except Exception:  # pylint: disable=broad-except
+            stats.errors += 1
+            _LOGGER.exception("Error in BPUP callback %s", callback)
+        elapsed = time.perf_counter() - start
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        if elapsed > self._slow_callback_threshold and not stats.slow:
+            stats.slow = True
+            _LOGGER.warning(
+                "Slow BPUP callback %s took %.3f seconds", callback, elapsed
+            )
 
 
 class BPUProtocol(asyncio.Protocol):
     """Implements BPU Protocol."""
 
-    def __init__(self, bpup_subscriptions: BPUPSubscriptions) -> None:
-        """Create BPU Protocol."""
+    def __init__(
+        self,
+        bpup_subscriptions: BPUPSubscriptions,
+        recorder: Optional["BPUPRecorder"] = None,
+    ) -> None:
+        """Create BPU Protocol, optionally recording raw datagrams."""
         self.loop = asyncio.get_event_loop()
         self.bpup_subscriptions: BPUPSubscriptions = bpup_subscriptions
+        self.recorder = recorder
         self.transport: Optional[asyncio.DatagramTransport] = None
         self.keep_alive: Optional[asyncio.TimerHandle] = None
 
@@ -80,9 +356,12 @@ class BPUProtocol(asyncio.Protocol):
     def datagram_received(self, data: bytes, addr: Any) -> None:
         """Process incoming state changes."""
         _LOGGER.debug("%s: BPUP message: %s", addr, data)
+        if self.recorder:
+            self.recorder.record(data, addr)
         try:
             self.bpup_subscriptions.notify(json.loads(data.decode().rstrip("\n")))
         except json.JSONDecodeError as ex:
+            self.bpup_subscriptions.parse_error_count += 1
             _LOGGER.warning(
                 "%s: Failed to process BPUP message: %s: %s", addr, data, ex
             )
@@ -117,15 +396,161 @@ class BPUProtocol(asyncio.Protocol):
             self.transport.close()
 
 
+class _DrainingTransport(asyncio.DatagramTransport):
+    """Datagram transport reading every pending datagram on each wakeup."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        sock: socket.socket,
+        protocol: BPUProtocol,
+        batch_size: int,
+    ) -> None:
+        super().__init__()
+        self._loop = loop
+        self._sock = sock
+        self._protocol = protocol
+        self._batch_size = batch_size
+        self._closing = False
+        loop.add_reader(sock.fileno(), self._read_ready)
+        loop.call_soon(protocol.connection_made, self)
+
+    def _read_ready(self) -> None:
+        for _ in range(self._batch_size):
+            try:
+                data, addr = self._sock.recvfrom(BPUP_MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                self._protocol.error_received(exc)
+                return
+            self._protocol.datagram_received(data, addr)
+
+    def sendto(self, data: Any, addr: Any = None) -> None:
+        try:
+            self._sock.send(data)
+        except OSError as exc:
+            self._protocol.error_received(exc)
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        if name == "socket":
+            return self._sock
+        try:
+            if name == "sockname":
+                return self._sock.getsockname()
+            if name == "peername":
+                return self._sock.getpeername()
+        except OSError:
+            pass
+        return default
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if self._closing:
+            return
+        self._closing = True
+        self._loop.remove_reader(self._sock.fileno())
+        self._loop.call_soon(self._finish)
+
+    def abort(self) -> None:
+        self.close()
+
+    def _finish(self) -> None:
+        try:
+            self._protocol.connection_lost(None)
+        finally:
+            self._sock.close()
+
+
+def udp_drops(inode: int) -> Optional[int]:
+    """Return datagrams dropped on the UDP socket with the given inode, if known."""
+    for path in PROC_NET_UDP:
+        try:
+            with open(path, encoding="ascii") as file:
+                lines = file.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if len(fields) > 12 and fields[9] == str(inode):
+                return int(fields[12])
+    return None
+
+
+def _socket_inode(sock: Any) -> Optional[int]:
+    try:
+        return os.fstat(sock.fileno()).st_ino
+    except (AttributeError, OSError, TypeError):
+        return None
+
+
+async def _bpup_socket(
+    host_ip_addr: str,
+    port: int,
+    rcvbuf: Optional[int],
+    local_addr: Optional[Tuple[str, int]],
+    interface: Optional[str],
+) -> socket.socket:
+    loop = asyncio.get_event_loop()
+    family, _, _, _, address = (
+        await loop.getaddrinfo(host_ip_addr, port, type=socket.SOCK_DGRAM)
+    )[0]
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        if rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        if interface:
+            if not hasattr(socket, "SO_BINDTODEVICE"):
+                raise OSError("Binding to an interface is not supported here")
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode()
+            )
+        if local_addr:
+            sock.bind(local_addr)
+        sock.connect(address)
+        sock.setblocking(False)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
 async def start_bpup(
-    host_ip_addr: str, bpup_subscriptions: BPUPSubscriptions
+    host_ip_addr: str,
+    bpup_subscriptions: BPUPSubscriptions,
+    *,
+    recorder: Optional["BPUPRecorder"] = None,
+    port: int = BPUP_PORT,
+    rcvbuf: Optional[int] = None,
+    local_addr: Optional[Tuple[str, int]] = None,
+    interface: Optional[str] = None,
+    batch_size: int = 0,
 ) -> Callable:
-    """Create the socket and protocol."""
+    """Create the socket and protocol.
+
+    `rcvbuf` sets the socket receive buffer in bytes, so bursts of pushes
+    after a scene are not dropped; `local_addr` and `interface` bind the
+    socket to an address or, on Linux, a network interface. With a
+    `batch_size`, up to that many pending datagrams are read per wakeup.
+    """
     loop = asyncio.get_event_loop()
 
-    _, protocol = await loop.create_datagram_endpoint(
-        lambda: BPUProtocol(bpup_subscriptions),
-        remote_addr=(host_ip_addr, BPUP_PORT),
-    )
+    def factory() -> BPUProtocol:
+        return BPUProtocol(bpup_subscriptions, recorder)
+
+    if rcvbuf is None and local_addr is None and interface is None and not batch_size:
+        transport, protocol = await loop.create_datagram_endpoint(
+            factory, remote_addr=(host_ip_addr, port)
+        )
+    else:
+        sock = await _bpup_socket(host_ip_addr, port, rcvbuf, local_addr, interface)
+        if batch_size:
+            protocol = factory()
+            transport = _DrainingTransport(loop, sock, protocol, batch_size)
+        else:
+            transport, protocol = await loop.create_datagram_endpoint(factory, sock=sock)
+    bpup_subscriptions.socket_inode = _socket_inode(transport.get_extra_info("socket"))
     bpup_protocol = cast(BPUProtocol, protocol)
     return bpup_protocol.stop
@@ -0,0 +1,221 @@
+"""Command line tool for fleet-wide queries, actions and BPUP monitoring."""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from .action import Action
+from .bond import Bond
+from .bpup import BPUPSubscriptions, start_bpup
+from .scene import Scene
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_CONCURRENCY_PER_HUB = 4
+DEFAULT_TIMEOUT = 10.0
+QUERIES = ("version", "bridge", "devices", "state")
+
+
+def _emit(output: TextIO, record: Dict[str, Any]) -> None:
+    output.write(json.dumps(record, separators=(",", ":")))
+    output.write("\n")
+    output.flush()
+
+
+def parse_hubs(
+    hubs: Iterable[str], hubs_file: Optional[str], token: Optional[str]
+) -> Dict[str, Optional[str]]:
+    """Return a host to token mapping from HOST[=TOKEN] values and a hubs file."""
+    lines = list(hubs)
+    if hubs_file:
+        with open(hubs_file, encoding="utf-8") as file:
+            for line in file:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    lines.append("=".join(line.split(None, 1)))
+    result: Dict[str, Optional[str]] = {}
+    for line in lines:
+        host, _, hub_token = line.partition("=")
+        result[host] = hub_token or token
+    return result
+
+
+def _session(args: argparse.Namespace) -> ClientSession:
+    return ClientSession(
+        connector=TCPConnector(
+            limit=args.concurrency, limit_per_host=args.concurrency_per_hub
+        ),
+        timeout=ClientTimeout(total=args.timeout),
+    )
+
+
+async def query(
+    args: argparse.Namespace, hubs: Dict[str, Optional[str]], output: TextIO
+) -> None:
+    """Run a query on every hub, streaming NDJSON records as they complete."""
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async with _session(args) as session:
+
+        async def call(bond: Bond, method: str, *call_args: str) -> Any:
+            async with slots:
+                return await getattr(bond, method)(*call_args)
+
+        async def device_state(bond: Bond, device_id: str) -> None:
+            record: Dict[str, Any] = {"hub": bond.host, "device_id": device_id}
+            try:
+                record["state"] = await call(bond, "device_state", device_id)
+            except Exception as ex:  # pylint: disable=broad-except
+                record["error"] = str(ex) or type(ex).__name__
+            _emit(output, record)
+
+        async def hub(host: str, token: Optional[str]) -> None:
+            bond = Bond(host, token or "", session=session)
+            method = "devices" if args.query == "state" else args.query
+            try:
+                result = await call(bond, method)
+            except Exception as ex:  # pylint: disable=broad-except
+                _emit(output, {"hub": host, "error": str(ex) or type(ex).__name__})
+                return
+            if args.query != "state":
+                _emit(output, {"hub": host, args.query: result})
+                return
+            await asyncio.gather(*[device_state(bond, device_id) for device_id in result])
+
+        await asyncio.gather(*[hub(host, token) for host, token in hubs.items()])
+
+
+async def actions(
+    args: argparse.Namespace, hubs: Dict[str, Optional[str]], output: TextIO
+) -> None:
+    """Execute NDJSON actions from a file as a scene and report each result."""
+    with open(args.file, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    async with _session(args) as session:
+        bonds: Dict[str, Bond] = {}
+        scene = Scene(max_concurrency_per_hub=args.concurrency_per_hub)
+        for record in records:
+            host = record["hub"]
+            if host not in bonds:
+                token = record.get("token") or hubs.get(host) or args.token
+                if token is None:
+                    raise ValueError(f"No token for hub {host}")
+                bonds[host] = Bond(host, token, session=session)
+            scene.add(
+                bonds[host],
+                record["device_id"],
+                Action(record["action"], record.get("argument")),
+                after=record.get("after", ()),
+            )
+
+        for result in await scene.execute():
+            report: Dict[str, Any] = {
+                "hub": result.step.bond.host,
+                "device_id": result.step.device_id,
+                "action": result.step.action.name,
+                "ok": result.ok,
+                "started": result.started,
+                "duration": result.duration,
+            }
+            if result.error is not None:
+                report["error"] = str(result.error) or type(result.error).__name__
+            _emit(output, report)
+
+
+async def monitor(
+    args: argparse.Namespace, hosts: List[str], output: TextIO
+) -> None:
+    """Print BPUP message rates, time since last push and parse errors per hub."""
+    subscriptions = {host: BPUPSubscriptions() for host in hosts}
+    stops = [await start_bpup(host, subscriptions[host]) for host in hosts]
+    previous = {host: 0 for host in hosts}
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            await asyncio.sleep(args.interval)
+            now = time.monotonic()
+            output.write(
+                f"{'hub':<24} {'alive':<6} {'msg/s':>8} {'last push s':>12} {'errors':>7}\n"
+            )
+            for host, subs in subscriptions.items():
+                rate = (subs.message_count - previous[host]) / args.interval
+                previous[host] = subs.message_count
+                since = (
+                    f"{now - subs.last_message_time:.1f}" if subs.message_count else "-"
+                )
+                output.write(
+                    f"{host:<24} {str(subs.alive):<6} {rate:>8.1f} {since:>12} "
+                    f"{subs.parse_error_count:>7}\n"
+                )
+            output.flush()
+    finally:
+        for stop in stops:
+            stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the command line tool."""
+    parser = argparse.ArgumentParser(prog="python -m bond_api", description=__doc__)
+    parser.add_argument(
+        "--hub",
+        action="append",
+        default=[],
+        metavar="HOST[=TOKEN]",
+        help="hub to use, may be repeated",
+    )
+    parser.add_argument(
+        "--hubs-file", help="file with one 'HOST [TOKEN]' per line, # for comments"
+    )
+    parser.add_argument("--token", help="token for hubs listed without one")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument(
+        "--concurrency-per-hub", type=int, default=DEFAULT_CONCURRENCY_PER_HUB
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = commands.add_parser("query", help="query every hub")
+    query_parser.add_argument("query", choices=QUERIES)
+
+    actions_parser = commands.add_parser(
+        "actions",
+        help="execute actions from an NDJSON file of "
+        '{"hub", "device_id", "action", "argument", "after"} records, '
+        "where after lists line indices to wait for",
+    )
+    actions_parser.add_argument("file")
+
+    monitor_parser = commands.add_parser("monitor", help="monitor BPUP pushes")
+    monitor_parser.add_argument("--interval", type=float, default=1.0)
+    monitor_parser.add_argument(
+        "--duration", type=float, default=0, help="seconds to run, 0 for forever"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, output: TextIO = sys.stdout) -> int:
+    """Run the command line tool."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    hubs = parse_hubs(args.hub, args.hubs_file, args.token)
+    if args.command == "actions":
+        coro = actions(args, hubs, output)
+    elif not hubs:
+        parser.error("no hubs given")
+    elif args.command == "monitor":
+        coro = monitor(args, list(hubs), output)
+    else:
+        missing = [host for host, token in hubs.items() if token is None]
+        if missing:
+            parser.error(f"no token for hubs: {', '.join(missing)}")
+        coro = query(args, hubs, output)
+    try:
+        asyncio.run(coro)
+    except KeyboardInterrupt:
+        return 130
+    return 0
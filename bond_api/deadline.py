@@ -0,0 +1,45 @@
+"""Deadlines bounding Bond API calls, scoped through a context variable."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("bond_api_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(
+    timeout: Optional[float] = None, deadline: Optional[float] = None
+) -> Iterator[Optional[float]]:
+    """Bound every Bond API call made within the block, including in new tasks.
+
+    `timeout` is in seconds from now and `deadline` is a `time.monotonic()`
+    value. Nested scopes can only bring the deadline closer. Yields the
+    deadline in effect, None if unbounded.
+    """
+    effective = _DEADLINE.get()
+    if timeout is not None:
+        effective = _earliest(effective, time.monotonic() + timeout)
+    if deadline is not None:
+        effective = _earliest(effective, deadline)
+    token = _DEADLINE.set(effective)
+    try:
+        yield effective
+    finally:
+        _DEADLINE.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """Return the deadline in effect, None if unbounded."""
+    return _DEADLINE.get()
+
+
+def time_left() -> Optional[float]:
+    """Return seconds until the deadline in effect, None if unbounded."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _earliest(first: Optional[float], second: float) -> float:
+    return second if first is None else min(first, second)
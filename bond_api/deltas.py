@@ -0,0 +1,80 @@
+"""Field-level changes of device state for subscribers."""
+
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .bpup import BPUPSubscriptions, Subscription
+
+Delta = Dict[str, Tuple[Any, Any]]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StateDeltas:
+    """Last known state per device, delivering only changed fields.
+
+    Subscribers receive a mapping of changed fields to (old, new) values, old
+    being None for fields not known before. Reports changing nothing are not
+    delivered at all. The "_" content hash is ignored.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty tracker."""
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._callbacks: Dict[str, List[Callable[[Delta], None]]] = {}
+        # by (id of the BPUP subscriptions, device ID)
+        self._tracked: Dict[Tuple[int, str], "Subscription"] = {}
+
+    def state(self, device_id: str) -> Dict[str, Any]:
+        """Return the last known state of a device."""
+        return dict(self._states.get(device_id, {}))
+
+    def subscribe(
+        self, device_id: str, callback: Callable[[Delta], None]
+    ) -> Callable[[], None]:
+        """Call `callback` with the changes of a device; return a function removing it."""
+        self._callbacks.setdefault(device_id, []).append(callback)
+        return lambda: self._callbacks[device_id].remove(callback)
+
+    def seed(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Set the known state of a device, e.g. from the API, without notifying."""
+        self._states[device_id] = {
+            field: value for field, value in state.items() if field != "_"
+        }
+
+    def update(self, device_id: str, state: Dict[str, Any]) -> Delta:
+        """Record a reported state and notify subscribers of the fields it changes."""
+        known = self._states.setdefault(device_id, {})
+        delta: Delta = {}
+        for field, value in state.items():
+            if field == "_":
+                continue
+            old = known.get(field)
+            if field not in known or old != value:
+                delta[field] = (old, value)
+                known[field] = value
+        if delta:
+            for callback in list(self._callbacks.get(device_id, ())):
+                try:
+                    callback(delta)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error in state delta callback %s", callback)
+        return delta
+
+    def track(
+        self, bpup_subscriptions: "BPUPSubscriptions", device_id: str
+    ) -> "Subscription":
+        """Update a device from its BPUP pushes, subscribing once per device.
+
+        Tracking the device through other subscriptions, e.g. after BPUP was
+        restarted, subscribes again.
+        """
+        key = (id(bpup_subscriptions), device_id)
+        subscription = self._tracked.get(key)
+        if subscription is None:
+            subscription = bpup_subscriptions.subscribe(
+                device_id, lambda state: self.update(device_id, state)
+            )
+            self._tracked[key] = subscription
+        return subscription
@@ -0,0 +1,209 @@
+"""Concurrent discovery and verification of Bond hubs."""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from .bond import Bond
+from .bpup import BPUP_INIT_PUSH_MESSAGE, BPUP_PORT
+
+DEFAULT_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_CONNECT_TIMEOUT = 0.5
+DEFAULT_CACHE_TTL = 3600
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DiscoveredHub:
+    """Bond hub found on the network."""
+
+    def __init__(
+        self, host: str, bond_id: str, version: Optional[dict], bpup: bool
+    ) -> None:
+        """Create a discovered hub record."""
+        self.host = host
+        self.bond_id = bond_id
+        self.version = version
+        self.bpup = bpup
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, DiscoveredHub) and (
+            self.host,
+            self.bond_id,
+            self.version,
+            self.bpup,
+        ) == (other.host, other.bond_id, other.version, other.bpup)
+
+    def __repr__(self) -> str:
+        return f"DiscoveredHub({self.host!r}, {self.bond_id!r}, bpup={self.bpup})"
+
+
+class DiscoveryCache:
+    """Remembers probe outcomes, including misses, for a limited time."""
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL) -> None:
+        """Create an empty cache."""
+        self._ttl = ttl
+        self._entries: Dict[str, Tuple[float, Optional[DiscoveredHub]]] = {}
+
+    def get(self, host: str) -> Tuple[bool, Optional[DiscoveredHub]]:
+        """Return (hit, hub) for the host; hub is None for a cached miss."""
+        entry = self._entries.get(host)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            return False, None
+        return True, entry[1]
+
+    def put(self, host: str, hub: Optional[DiscoveredHub]) -> None:
+        """Store the probe outcome for the host."""
+        self._entries[host] = (time.monotonic(), hub)
+
+
+def expand_hosts(hosts: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Expand a CIDR or an iterable of hosts and CIDRs into single hosts."""
+    if isinstance(hosts, str):
+        hosts = [hosts]
+    for host in hosts:
+        if "/" not in host:
+            yield host
+            continue
+        network = ipaddress.ip_network(host, strict=False)
+        if network.num_addresses == 1:
+            yield str(network.network_address)
+        else:
+            yield from (str(address) for address in network.hosts())
+
+
+class _HelloProtocol(asyncio.DatagramProtocol):
+    """Waits for the first BPUP datagram after a hello."""
+
+    def __init__(self) -> None:
+        self.reply: "asyncio.Future[bytes]" = asyncio.get_event_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        if not self.reply.done():
+            self.reply.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.reply.done():
+            self.reply.set_exception(exc)
+
+
+async def probe_bpup(
+    host: str, *, port: int = BPUP_PORT, timeout: float = DEFAULT_TIMEOUT
+) -> Optional[str]:
+    """Send a BPUP hello and return the Bond ID from the reply, if any."""
+    loop = asyncio.get_event_loop()
+    try:
+        transport, protocol = await loop.create_datagram_endpoint(
+            _HelloProtocol, remote_addr=(host, port)
+        )
+    except OSError as ex:
+        _LOGGER.debug("%s: BPUP probe failed: %s", host, ex)
+        return None
+    try:
+        transport.sendto(BPUP_INIT_PUSH_MESSAGE)
+        data = await asyncio.wait_for(protocol.reply, timeout)
+        return json.loads(data.decode()).get("B")
+    except (asyncio.TimeoutError, OSError, ValueError, AttributeError) as ex:
+        _LOGGER.debug("%s: BPUP probe failed: %s", host, ex)
+        return None
+    finally:
+        transport.close()
+
+
+async def probe_http(
+    host: str, session: ClientSession, *, timeout: Optional[ClientTimeout] = None
+) -> Optional[dict]:
+    """Return the version reported by a Bond hub at the host, if any."""
+    bond = Bond(host, "", session=session, timeout=timeout)
+    try:
+        version = await bond.version()
+    except (ClientError, asyncio.TimeoutError, OSError, ValueError) as ex:
+        _LOGGER.debug("%s: HTTP probe failed: %s", host, ex)
+        return None
+    return version if isinstance(version, dict) and "bondid" in version else None
+
+
+async def probe(
+    host: str,
+    session: ClientSession,
+    *,
+    timeout: float = DEFAULT_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    bpup_probe: bool = True,
+    bpup_port: int = BPUP_PORT,
+) -> Optional[DiscoveredHub]:
+    """Probe a single host over HTTP and BPUP concurrently."""
+    client_timeout = ClientTimeout(total=timeout, sock_connect=connect_timeout)
+    if bpup_probe:
+        version, bpup_id = await asyncio.gather(
+            probe_http(host, session, timeout=client_timeout),
+            probe_bpup(host, port=bpup_port, timeout=timeout),
+        )
+    else:
+        version, bpup_id = await probe_http(host, session, timeout=client_timeout), None
+    bond_id = bpup_id or (version or {}).get("bondid")
+    if not bond_id:
+        return None
+    return DiscoveredHub(host, bond_id, version, bpup_id is not None)
+
+
+async def discover(
+    hosts: Union[str, Iterable[str]],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    bpup_probe: bool = True,
+    bpup_port: int = BPUP_PORT,
+    cache: Optional[DiscoveryCache] = None,
+    session: Optional[ClientSession] = None,
+) -> AsyncIterator[DiscoveredHub]:
+    """Scan hosts or CIDRs with bounded concurrency, yielding hubs as found."""
+    host_iter = expand_hosts(hosts)
+    found: "asyncio.Queue[Optional[DiscoveredHub]]" = asyncio.Queue()
+    own_session = session is None
+    if session is None:
+        session = ClientSession(connector=TCPConnector(limit=concurrency))
+
+    async def worker() -> None:
+        for host in host_iter:
+            hit, hub = cache.get(host) if cache else (False, None)
+            if not hit:
+                hub = await probe(
+                    host,
+                    session,
+                    timeout=timeout,
+                    connect_timeout=connect_timeout,
+                    bpup_probe=bpup_probe,
+                    bpup_port=bpup_port,
+                )
+                if cache:
+                    cache.put(host, hub)
+            if hub:
+                await found.put(hub)
+
+    async def run() -> None:
+        try:
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+        finally:
+            await found.put(None)
+
+    runner = asyncio.ensure_future(run())
+    try:
+        while True:
+            hub = await found.get()
+            if hub is None:
+                break
+            yield hub
+        await runner
+    finally:
+        runner.cancel()
+        if own_session:
+            await session.close()
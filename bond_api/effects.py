@@ -0,0 +1,105 @@
+"""State effects of actions as reported by the hub."""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .action import Action
+
+# actions that set a state field to a fixed value
+_FIXED_EFFECTS: Dict[str, Dict[str, Any]] = {
+    Action.TURN_ON: {"power": 1},
+    Action.TURN_OFF: {"power": 0},
+    Action.TURN_LIGHT_ON: {"light": 1},
+    Action.TURN_LIGHT_OFF: {"light": 0},
+    Action.TURN_UP_LIGHT_ON: {"up_light": 1},
+    Action.TURN_UP_LIGHT_OFF: {"up_light": 0},
+    Action.TURN_DOWN_LIGHT_ON: {"down_light": 1},
+    Action.TURN_DOWN_LIGHT_OFF: {"down_light": 0},
+    Action.TURN_FP_FAN_ON: {"fpfan_power": 1},
+    Action.TURN_FP_FAN_OFF: {"fpfan_power": 0},
+    Action.OPEN: {"open": 1},
+    Action.CLOSE: {"open": 0},
+}
+
+# actions that set a state field to their argument
+_ARGUMENT_EFFECTS: Dict[str, str] = {
+    Action.SET_SPEED: "speed",
+    Action.SET_BRIGHTNESS: "brightness",
+    Action.SET_DIRECTION: "direction",
+    Action.SET_FLAME: "flame",
+    Action.SET_POSITION: "position",
+    Action.SET_FP_FAN: "fpfan_speed",
+}
+
+
+# actions that flip a 0/1 state field
+_TOGGLE_EFFECTS: Dict[str, str] = {
+    Action.TOGGLE_POWER: "power",
+    Action.TOGGLE_LIGHT: "light",
+    Action.TOGGLE_UP_LIGHT: "up_light",
+    Action.TOGGLE_DOWN_LIGHT: "down_light",
+    Action.TOGGLE_OPEN: "open",
+}
+
+# actions that move a state field by their argument: field, sign, default step, bounds
+_STEP_EFFECTS: Dict[str, Tuple[str, int, int, Tuple[int, Optional[int]]]] = {
+    Action.INCREASE_SPEED: ("speed", 1, 1, (1, None)),
+    Action.DECREASE_SPEED: ("speed", -1, 1, (1, None)),
+    Action.INCREASE_BRIGHTNESS: ("brightness", 1, 10, (1, 100)),
+    Action.DECREASE_BRIGHTNESS: ("brightness", -1, 10, (1, 100)),
+    Action.INCREASE_POSITION: ("position", 1, 10, (0, 100)),
+    Action.DECREASE_POSITION: ("position", -1, 10, (0, 100)),
+    Action.INCREASE_FLAME: ("flame", 1, 10, (0, 100)),
+    Action.DECREASE_FLAME: ("flame", -1, 10, (0, 100)),
+}
+
+# fields the hub turns on as a side effect of setting another field
+_IMPLIED_EFFECTS: Dict[str, Dict[str, Any]] = {
+    "speed": {"power": 1},
+    "flame": {"power": 1},
+    "brightness": {"light": 1},
+}
+
+
+def expected_state(action: Action) -> Optional[Dict[str, Any]]:
+    """Return state fields the action sets, or None when not predictable."""
+    if action.name == Action.SET_STATE_BELIEF:
+        return dict(action.argument)
+    if action.name in _FIXED_EFFECTS:
+        return dict(_FIXED_EFFECTS[action.name])
+    if action.name in _ARGUMENT_EFFECTS and "argument" in action.argument:
+        return {_ARGUMENT_EFFECTS[action.name]: action.argument["argument"]}
+    return None
+
+
+def matches(state: Dict[str, Any], expected: Optional[Dict[str, Any]]) -> bool:
+    """Return if the state has every expected field value."""
+    return all(state.get(key) == value for key, value in (expected or {}).items())
+
+
+def effect(state: Dict[str, Any], action: Action) -> Dict[str, Any]:
+    """Return state fields changed by applying the action to the given state.
+
+    Toggles and relative moves need the current value and are skipped when
+    the state does not have it.
+    """
+    changes = expected_state(action)
+    if changes is None:
+        changes = {}
+        if action.name in _TOGGLE_EFFECTS:
+            field = _TOGGLE_EFFECTS[action.name]
+            if field in state:
+                changes[field] = 0 if state[field] else 1
+        elif action.name == Action.TOGGLE_DIRECTION:
+            if "direction" in state:
+                changes["direction"] = -state["direction"]
+        elif action.name in _STEP_EFFECTS:
+            field, sign, step, (low, high) = _STEP_EFFECTS[action.name]
+            if field in state:
+                value = state[field] + sign * action.argument.get("argument", step)
+                value = max(low, value)
+                changes[field] = value if high is None else min(high, value)
+    if action.name != Action.SET_STATE_BELIEF:
+        for field in list(changes):
+            for implied, value in _IMPLIED_EFFECTS.get(field, {}).items():
+                changes.setdefault(implied, value)
+    return changes
@@ -0,0 +1,210 @@
+"""Fixed-capacity, columnar history of device state fields."""
+
+import time
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from .bpup import BPUPSubscriptions, Subscription
+
+DEFAULT_CAPACITY = 4096
+DEFAULT_FIELDS = ("power", "speed", "light", "brightness", "open", "position")
+
+AGGREGATES: Dict[str, Callable[[Any], float]] = {
+    "mean": lambda values: sum(values) / len(values),
+    "min": min,
+    "max": max,
+    "sum": sum,
+    "count": len,
+    "last": lambda values: values[-1],
+}
+
+
+class RingBuffer:
+    """Timestamp and value columns overwriting the oldest sample when full."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Create empty columns growing as samples arrive, up to capacity."""
+        self._capacity = capacity
+        self._times = array("d")
+        self._values = array("d")
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Add a sample; timestamps are expected in non-decreasing order."""
+        if self._size < self._capacity:
+            self._times.append(timestamp)
+            self._values.append(value)
+            self._size += 1
+            return
+        self._times[self._start] = timestamp
+        self._values[self._start] = value
+        self._start = (self._start + 1) % self._capacity
+
+    def _time_at(self, position: int) -> float:
+        return self._times[(self._start + position) % self._capacity]
+
+    def _bisect(self, timestamp: float) -> int:
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(
+        self, start: float = float("-inf"), end: float = float("inf")
+    ) -> Tuple[array, array]:
+        """Return (timestamps, values) of samples with start <= timestamp < end."""
+        first = self._bisect(start)
+        count = self._bisect(end) - first
+        if count <= 0:
+            return array("d"), array("d")
+        begin = (self._start + first) % self._capacity
+        stop = begin + count
+        if stop <= self._capacity:
+            return self._times[begin:stop], self._values[begin:stop]
+        stop -= self._capacity
+        return (
+            self._times[begin:] + self._times[:stop],
+            self._values[begin:] + self._values[:stop],
+        )
+
+
+class StateHistory:
+    """Ring buffers per device and state field, fed from state reports."""
+
+    def __init__(
+        self,
+        *,
+        capacity: int = DEFAULT_CAPACITY,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create an empty history recording the given fields."""
+        self._capacity = capacity
+        self._fields = tuple(fields)
+        self._clock = clock
+        self._buffers: Dict[str, Dict[str, RingBuffer]] = {}
+
+    @property
+    def devices(self) -> Tuple[str, ...]:
+        """Return IDs of devices with recorded history."""
+        return tuple(self._buffers)
+
+    def record(
+        self, device_id: str, state: Dict[str, Any], timestamp: Optional[float] = None
+    ) -> None:
+        """Record numeric fields of a reported state."""
+        timestamp = self._clock() if timestamp is None else timestamp
+        buffers = self._buffers.get(device_id)
+        for field in self._fields:
+            value = state.get(field)
+            if not isinstance(value, (int, float)):
+                continue
+            if buffers is None:
+                buffers = self._buffers[device_id] = {}
+            buffer = buffers.get(field)
+            if buffer is None:
+                buffer = buffers[field] = RingBuffer(self._capacity)
+            buffer.append(timestamp, value)
+
+    def track(
+        self, bpup_subscriptions: "BPUPSubscriptions", device_id: str
+    ) -> "Subscription":
+        """Record every BPUP push of a device."""
+        return bpup_subscriptions.subscribe(
+            device_id, lambda state: self.record(device_id, state)
+        )
+
+    def window(
+        self,
+        device_id: str,
+        field: str,
+        start: float = float("-inf"),
+        end: float = float("inf"),
+    ) -> Tuple[array, array]:
+        """Return (timestamps, values) of a device field within [start, end)."""
+        buffer = self._buffers.get(device_id, {}).get(field)
+        if buffer is None:
+            return array("d"), array("d")
+        return buffer.window(start, end)
+
+    def aggregate(
+        self,
+        field: str,
+        how: str = "mean",
+        start: float = float("-inf"),
+        end: float = float("inf"),
+    ) -> Dict[str, float]:
+        """Return an aggregate of a field within [start, end) for every device.
+
+        Devices without samples in the window are omitted. When NumPy is
+        installed, the windows of all devices are reduced in a single pass.
+        """
+        reduce = AGGREGATES[how]
+        windows = {}
+        for device_id in self._buffers:
+            _, values = self.window(device_id, field, start, end)
+            if values:
+                windows[device_id] = values
+        if not windows:
+            return {}
+        reduce_all = _numpy_aggregate(how)
+        if reduce_all is None:
+            return {
+                device_id: float(reduce(values)) for device_id, values in windows.items()
+            }
+        return dict(zip(windows, reduce_all(list(windows.values()))))
+
+    def to_numpy(self, device_id: str, field: str) -> Tuple[Any, Any]:
+        """Return (timestamps, values) of a device field as NumPy arrays."""
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        times, values = self.window(device_id, field)
+        return numpy.frombuffer(times, dtype=float), numpy.frombuffer(values, dtype=float)
+
+
+def _numpy_aggregate(how: str) -> Optional[Callable[[List[array]], List[float]]]:
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    def reduce_all(windows: List[array]) -> List[float]:
+        # one flat column with the offset of each non-empty window
+        counts = numpy.array([len(values) for values in windows])
+        offsets = numpy.cumsum(counts) - counts
+        values = numpy.concatenate(
+            [numpy.frombuffer(values, dtype=float) for values in windows]
+        )
+        if how == "count":
+            result = counts
+        elif how == "last":
+            result = values[offsets + counts - 1]
+        elif how == "min":
+            result = numpy.minimum.reduceat(values, offsets)
+        elif how == "max":
+            result = numpy.maximum.reduceat(values, offsets)
+        else:
+            result = numpy.add.reduceat(values, offsets)
+            if how == "mean":
+                result = result / counts
+        return result.astype(float).tolist()
+
+    return reduce_all
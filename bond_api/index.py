@@ -0,0 +1,191 @@
+"""In-memory secondary indexes for fleet-wide device queries."""
+
+import asyncio
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .scene import DEFAULT_MAX_CONCURRENCY_PER_HUB
+
+if TYPE_CHECKING:
+    from .bond import Bond
+    from .bpup import BPUPSubscriptions, Subscription
+    from .inventory import InventoryCache
+
+DEFAULT_STATE_FIELDS = ("power", "light", "open")
+
+# (hub, device ID)
+DeviceKey = Tuple[str, str]
+
+
+def _add(index: Dict[Any, Set[DeviceKey]], value: Hashable, key: DeviceKey) -> None:
+    index.setdefault(value, set()).add(key)
+
+
+def _discard(index: Dict[Any, Set[DeviceKey]], value: Hashable, key: DeviceKey) -> None:
+    keys = index.get(value)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[value]
+
+
+class DeviceIndex:
+    """Devices of many hubs indexed by type, location, hub and state fields.
+
+    Metadata comes from `put_device`, `refresh` or an inventory cache, state
+    from `update_state`, `refresh` or BPUP pushes through `track`. Only the
+    configured `state_fields` are indexed; queries intersect the index sets.
+    """
+
+    def __init__(self, *, state_fields: Iterable[str] = DEFAULT_STATE_FIELDS) -> None:
+        """Create an empty index."""
+        self._state_fields = tuple(state_fields)
+        self._devices: Dict[DeviceKey, dict] = {}
+        self._states: Dict[DeviceKey, Dict[str, Any]] = {}
+        self._by_type: Dict[str, Set[DeviceKey]] = {}
+        self._by_location: Dict[str, Set[DeviceKey]] = {}
+        self._by_hub: Dict[str, Set[DeviceKey]] = {}
+        self._by_state: Dict[str, Dict[Any, Set[DeviceKey]]] = {
+            field: {} for field in self._state_fields
+        }
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def device(self, hub: str, device_id: str) -> Optional[dict]:
+        """Return indexed metadata of a device."""
+        return self._devices.get((hub, device_id))
+
+    def state(self, hub: str, device_id: str) -> Dict[str, Any]:
+        """Return indexed state fields of a device."""
+        return dict(self._states.get((hub, device_id), {}))
+
+    def put_device(self, hub: str, device_id: str, device: dict) -> None:
+        """Index or re-index metadata of a device."""
+        key = (hub, device_id)
+        self._unindex_device(key)
+        self._devices[key] = device
+        _add(self._by_hub, hub, key)
+        if "type" in device:
+            _add(self._by_type, device["type"], key)
+        if "location" in device:
+            _add(self._by_location, device["location"], key)
+
+    def remove_device(self, hub: str, device_id: str) -> None:
+        """Drop a device and its state from the index."""
+        key = (hub, device_id)
+        self._unindex_device(key)
+        self._devices.pop(key, None)
+        for field, value in self._states.pop(key, {}).items():
+            _discard(self._by_state[field], value, key)
+
+    def _unindex_device(self, key: DeviceKey) -> None:
+        device = self._devices.get(key)
+        if device is None:
+            return
+        _discard(self._by_hub, key[0], key)
+        if "type" in device:
+            _discard(self._by_type, device["type"], key)
+        if "location" in device:
+            _discard(self._by_location, device["location"], key)
+
+    def update_state(self, hub: str, device_id: str, state: Dict[str, Any]) -> None:
+        """Re-index the indexed fields present in a reported state."""
+        key = (hub, device_id)
+        known = self._states.setdefault(key, {})
+        for field in self._state_fields:
+            if field not in state:
+                continue
+            value = state[field]
+            if field in known:
+                if known[field] == value:
+                    continue
+                _discard(self._by_state[field], known[field], key)
+            known[field] = value
+            _add(self._by_state[field], value, key)
+
+    def query(
+        self,
+        *,
+        device_type: Optional[str] = None,
+        location: Optional[str] = None,
+        hub: Optional[str] = None,
+        **state: Any,
+    ) -> Set[DeviceKey]:
+        """Return (hub, device ID) of devices matching every given criterion.
+
+        State criteria are given as keyword arguments, e.g. `power=1`, and must
+        name indexed state fields. Without criteria every device is returned.
+        """
+        candidates = []
+        if device_type is not None:
+            candidates.append(self._by_type.get(device_type, set()))
+        if location is not None:
+            candidates.append(self._by_location.get(location, set()))
+        if hub is not None:
+            candidates.append(self._by_hub.get(hub, set()))
+        for field, value in state.items():
+            if field not in self._by_state:
+                raise ValueError(f"State field {field!r} is not indexed")
+            candidates.append(self._by_state[field].get(value, set()))
+        if not candidates:
+            return set(self._devices)
+        candidates.sort(key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+    def track(
+        self, bpup_subscriptions: "BPUPSubscriptions", hub: str, device_id: str
+    ) -> "Subscription":
+        """Update the state of a device from its BPUP pushes."""
+        return bpup_subscriptions.subscribe(
+            device_id, lambda state: self.update_state(hub, device_id, state)
+        )
+
+    def load_inventory(self, inventory: "InventoryCache") -> None:
+        """Index device metadata of every hub in an inventory cache."""
+        for hub in inventory.hosts:
+            for device_id in inventory.devices(hub):
+                device = inventory.device(hub, device_id)
+                if device is not None:
+                    self.put_device(hub, device_id, device)
+
+    async def refresh(
+        self,
+        bond: "Bond",
+        *,
+        max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+    ) -> None:
+        """Re-index metadata and state of every device of a hub from the API.
+
+        At most `max_concurrency_per_hub` requests are sent to the hub at once.
+        """
+        hub = bond.host
+        device_ids = await bond.devices()
+        slots = asyncio.Semaphore(max_concurrency_per_hub)
+
+        async def get(method: Callable[[str], Awaitable[dict]], device_id: str) -> dict:
+            async with slots:
+                return await method(device_id)
+
+        async def fetch(device_id: str) -> None:
+            device, state = await asyncio.gather(
+                get(bond.device, device_id), get(bond.device_state, device_id)
+            )
+            self.put_device(hub, device_id, device)
+            self.update_state(hub, device_id, state)
+
+        await asyncio.gather(*[fetch(device_id) for device_id in device_ids])
+        for _, device_id in self._by_hub.get(hub, set()) - {
+            (hub, device_id) for device_id in device_ids
+        }:
+            self.remove_device(hub, device_id)
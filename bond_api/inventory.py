@@ -0,0 +1,148 @@
+"""Persistent snapshot of hub inventory for fast warm startup."""
+
+import asyncio
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .scene import DEFAULT_MAX_CONCURRENCY_PER_HUB
+
+if TYPE_CHECKING:
+    from .bond import Bond
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class InventoryCache:
+    """Device metadata and properties of every hub, persisted as JSON lines.
+
+    Load the snapshot at startup to serve inventory immediately, then call
+    `refresh` (or `start_refresh` for many hubs) to validate it against the hub
+    hashes and re-fetch only devices whose hash has changed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Create a cache stored at the given path."""
+        self._path = path
+        self._hubs: Dict[str, Dict[str, dict]] = {}
+
+    @property
+    def hosts(self) -> List[str]:
+        """Return the hosts present in the snapshot."""
+        return list(self._hubs)
+
+    def load(self) -> None:
+        """Load the snapshot from disk; a missing file yields an empty cache."""
+        self._hubs = {}
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                for number, line in enumerate(file, 1):
+                    try:
+                        entry = json.loads(line)
+                        hub = self._hubs.setdefault(entry.pop("hub"), {})
+                        hub[entry.pop("id")] = entry
+                    except (ValueError, KeyError, AttributeError) as ex:
+                        _LOGGER.warning(
+                            "%s:%s: Skipping corrupt inventory entry: %s",
+                            self._path,
+                            number,
+                            ex,
+                        )
+        except FileNotFoundError:
+            pass
+
+    def save(self) -> None:
+        """Write the snapshot to disk atomically."""
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            for host, devices in self._hubs.items():
+                for device_id, entry in devices.items():
+                    line = {"hub": host, "id": device_id, **entry}
+                    file.write(json.dumps(line, separators=(",", ":")))
+                    file.write("\n")
+        os.replace(tmp_path, self._path)
+
+    def devices(self, host: str) -> List[str]:
+        """Return cached device IDs of a hub."""
+        return list(self._hubs.get(host, {}))
+
+    def device(self, host: str, device_id: str) -> Optional[dict]:
+        """Return cached device metadata."""
+        return self._hubs.get(host, {}).get(device_id, {}).get("device")
+
+    def device_properties(self, host: str, device_id: str) -> Optional[dict]:
+        """Return cached device properties."""
+        return self._hubs.get(host, {}).get(device_id, {}).get("properties")
+
+    async def refresh(
+        self,
+        bond: "Bond",
+        *,
+        save: bool = True,
+        max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+    ) -> List[str]:
+        """Re-fetch devices whose hash changed; return IDs changed or removed.
+
+        At most `max_concurrency_per_hub` requests are sent to the hub at once.
+        """
+        hashes = await bond.device_hashes()
+        cached = self._hubs.get(bond.host, {})
+        changed = [
+            device_id
+            for device_id, hash_ in hashes.items()
+            if hash_ is None or cached.get(device_id, {}).get("hash") != hash_
+        ]
+        removed = set(cached) - set(hashes)
+
+        slots = asyncio.Semaphore(max_concurrency_per_hub)
+
+        async def get(method: Callable[[str], Awaitable[dict]], device_id: str) -> dict:
+            async with slots:
+                return await method(device_id)
+
+        async def fetch(device_id: str) -> dict:
+            device, properties = await asyncio.gather(
+                get(bond.device, device_id), get(bond.device_properties, device_id)
+            )
+            return {"hash": hashes[device_id], "device": device, "properties": properties}
+
+        entries = await asyncio.gather(*[fetch(device_id) for device_id in changed])
+        if not changed and not removed:
+            return []
+
+        hub = {
+            device_id: cached[device_id]
+            for device_id in hashes
+            if device_id in cached and device_id not in changed
+        }
+        hub.update(zip(changed, entries))
+        self._hubs[bond.host] = hub
+        if save:
+            self.save()
+        return changed + sorted(removed)
+
+    def start_refresh(
+        self,
+        bonds: Iterable["Bond"],
+        *,
+        max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+    ) -> "asyncio.Task[None]":
+        """Refresh all hubs in the background and save once when done."""
+
+        async def refresh_one(bond: "Bond") -> bool:
+            try:
+                changed = await self.refresh(
+                    bond, save=False, max_concurrency_per_hub=max_concurrency_per_hub
+                )
+                return bool(changed)
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.warning("%s: Inventory refresh failed: %s", bond.host, ex)
+                return False
+
+        async def refresh_all() -> None:
+            updated = await asyncio.gather(*[refresh_one(bond) for bond in bonds])
+            if any(updated):
+                self.save()
+
+        return asyncio.ensure_future(refresh_all())
@@ -0,0 +1,91 @@
+"""Keep connections to a hub open while it is in use."""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from .priority import Priority, priority_scope
+from .stats import LatencyStats
+
+if TYPE_CHECKING:
+    from .bond import Bond
+    from .bpup import BPUPSubscriptions, Subscription
+
+# Hubs close idle connections after a few seconds; refresh a bit earlier.
+DEFAULT_REFRESH_INTERVAL = 4.0
+DEFAULT_ACTIVE_PERIOD = 60.0
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KeepWarm:
+    """Keeps a connection to a hub open while there is user activity.
+
+    Each call to `on_activity`, e.g. from a BPUP push, warms a connection right
+    away and keeps refreshing it every `refresh_interval` seconds, before the
+    hub closes it, until `active_period` seconds pass without activity. The
+    first-byte latency of every refresh is recorded in `stats`. Refreshes are
+    sent at normal priority so a background sweep queued on the scheduler of
+    the Bond does not delay them past `refresh_interval`.
+    """
+
+    def __init__(
+        self,
+        bond: "Bond",
+        *,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        active_period: float = DEFAULT_ACTIVE_PERIOD,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an idle keep-warm for the hub of a Bond."""
+        self._bond = bond
+        self._refresh_interval = refresh_interval
+        self._active_period = active_period
+        self._clock = clock
+        self._active_until = 0.0
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.stats = LatencyStats()
+        self.errors = 0
+
+    @property
+    def active(self) -> bool:
+        """Return if connections are being kept warm."""
+        return self._task is not None and not self._task.done()
+
+    def on_activity(self, *_: Any) -> None:
+        """Signal expected use of the hub soon."""
+        self._active_until = self._clock() + self._active_period
+        if not self.active:
+            self._task = asyncio.ensure_future(self._run())
+
+    def track(
+        self, bpup_subscriptions: "BPUPSubscriptions", device_id: str
+    ) -> "Subscription":
+        """Treat every BPUP push of a device as activity."""
+        return bpup_subscriptions.subscribe(device_id, self.on_activity)
+
+    async def warm(self) -> Optional[float]:
+        """Warm a connection once and return its first-byte latency."""
+        try:
+            with priority_scope(Priority.NORMAL):
+                latency = await self._bond.warm(timeout=self._refresh_interval)
+        except Exception as ex:  # pylint: disable=broad-except
+            self.errors += 1
+            _LOGGER.debug("%s: Failed to warm connection: %s", self._bond.host, ex)
+            return None
+        if latency is not None:
+            self.stats.add(latency)
+        return latency
+
+    async def _run(self) -> None:
+        while self._clock() < self._active_until:
+            await self.warm()
+            await asyncio.sleep(self._refresh_interval)
+
+    def stop(self) -> None:
+        """Stop keeping connections warm until the next activity."""
+        self._active_until = 0.0
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
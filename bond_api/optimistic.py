@@ -0,0 +1,117 @@
+"""Optimistic local device state reconciled against the hub."""
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from .action import Action
+from .effects import effect, matches
+
+if TYPE_CHECKING:
+    from .bpup import BPUPSubscriptions, Subscription
+
+DEFAULT_PENDING_TIMEOUT = 10.0
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PendingEffect:
+    """Effect of an issued action not yet confirmed by the hub."""
+
+    def __init__(self, device_id: str, action: Action, changes: Dict[str, Any]):
+        """Create a pending effect."""
+        self.device_id = device_id
+        self.action = action
+        self.changes = changes
+        self.created = time.monotonic()
+
+
+class OptimisticState:
+    """Local per-device state showing action effects before the hub reports them.
+
+    The view of a device is its last state reported by the hub with the effects
+    of pending actions applied on top. A pending effect is dropped once a
+    reported state shows it, when its action fails, or after `pending_timeout`
+    seconds without confirmation. Listeners are called with the device ID and
+    its new view whenever the view may have changed.
+    """
+
+    def __init__(self, *, pending_timeout: float = DEFAULT_PENDING_TIMEOUT) -> None:
+        """Create an empty state store."""
+        self._pending_timeout = pending_timeout
+        self._confirmed: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, List[PendingEffect]] = {}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def add_listener(
+        self, listener: Callable[[str, Dict[str, Any]], None]
+    ) -> Callable[[], None]:
+        """Add a listener and return a function removing it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def state(self, device_id: str) -> Dict[str, Any]:
+        """Return the current view of a device."""
+        self._expire(device_id)
+        view = dict(self._confirmed.get(device_id, {}))
+        for pending in self._pending.get(device_id, []):
+            view.update(pending.changes)
+        return view
+
+    def confirmed_state(self, device_id: str) -> Dict[str, Any]:
+        """Return the last state of a device reported by the hub."""
+        return dict(self._confirmed.get(device_id, {}))
+
+    def apply(self, device_id: str, action: Action) -> Optional[PendingEffect]:
+        """Apply the effect of an issued action; return it for rollback."""
+        changes = effect(self.state(device_id), action)
+        if not changes:
+            return None
+        pending = PendingEffect(device_id, action, changes)
+        self._pending.setdefault(device_id, []).append(pending)
+        self._notify(device_id)
+        return pending
+
+    def rollback(self, pending: Optional[PendingEffect]) -> None:
+        """Drop the effect of an action that failed."""
+        if pending is None:
+            return
+        effects = self._pending.get(pending.device_id, [])
+        if pending in effects:
+            effects.remove(pending)
+            self._notify(pending.device_id)
+
+    def reconcile(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Record a state reported by the hub and drop effects it confirms."""
+        confirmed = self._confirmed.setdefault(device_id, {})
+        confirmed.update({key: value for key, value in state.items() if key != "_"})
+        effects = self._pending.get(device_id, [])
+        effects[:] = [
+            pending for pending in effects if not matches(confirmed, pending.changes)
+        ]
+        self._notify(device_id)
+
+    def track(
+        self, bpup_subscriptions: "BPUPSubscriptions", device_id: str
+    ) -> "Subscription":
+        """Reconcile a device from its BPUP pushes."""
+        return bpup_subscriptions.subscribe(
+            device_id, lambda state: self.reconcile(device_id, state)
+        )
+
+    def _expire(self, device_id: str) -> None:
+        effects = self._pending.get(device_id)
+        if not effects:
+            return
+        deadline = time.monotonic() - self._pending_timeout
+        expired = [pending for pending in effects if pending.created < deadline]
+        for pending in expired:
+            _LOGGER.debug(
+                "%s: Unconfirmed effect of %s expired", device_id, pending.action.name
+            )
+            effects.remove(pending)
+
+    def _notify(self, device_id: str) -> None:
+        view = self.state(device_id)
+        for listener in list(self._listeners):
+            listener(device_id, view)
@@ -0,0 +1,143 @@
+"""Priority lanes sharing the few connections of a hub."""
+
+import asyncio
+import collections
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Deque, Dict, Iterator, Optional
+
+from .stats import LatencyStats
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_BACKGROUND = 1
+
+
+class Priority(IntEnum):
+    """Request priority, lower values are served first."""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+_PRIORITY: ContextVar[Optional[Priority]] = ContextVar("bond_api_priority", default=None)
+
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Send every Bond API request made within the block at the given priority."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority(default: Priority = Priority.NORMAL) -> Priority:
+    """Return the priority in effect, or `default` outside any scope."""
+    priority = _PRIORITY.get()
+    return default if priority is None else priority
+
+
+class LaneStats:
+    """Latency statistics of a priority lane."""
+
+    def __init__(self) -> None:
+        """Init empty statistics."""
+        self.wait = LatencyStats()
+        self.latency = LatencyStats()
+
+
+class PriorityScheduler:
+    """Limits concurrent requests, always serving higher priority lanes first.
+
+    At most `max_concurrency` requests run at once, of which at most
+    `max_background` are background requests, so a polling burst never
+    occupies every connection. `stats` holds the queue wait and the total
+    latency of requests per lane.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_background: int = DEFAULT_MAX_BACKGROUND,
+    ) -> None:
+        """Create an idle scheduler."""
+        self._max_concurrency = max_concurrency
+        self._max_background = max_background
+        self._running = 0
+        self._background = 0
+        self._waiters: Dict[Priority, Deque["asyncio.Future[None]"]] = {
+            priority: collections.deque() for priority in Priority
+        }
+        self.stats: Dict[Priority, LaneStats] = {
+            priority: LaneStats() for priority in Priority
+        }
+
+    @property
+    def queued(self) -> Dict[Priority, int]:
+        """Return the number of requests waiting per lane."""
+        return {priority: len(waiters) for priority, waiters in self._waiters.items()}
+
+    async def run(self, priority: Priority, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` once a slot of the given lane is free."""
+        start = time.perf_counter()
+        try:
+            await self._acquire(priority)
+        except BaseException:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        stats = self.stats[priority]
+        stats.wait.add(time.perf_counter() - start)
+        try:
+            return await awaitable
+        finally:
+            stats.latency.add(time.perf_counter() - start)
+            self._release(priority)
+
+    def _can_start(self, priority: Priority) -> bool:
+        if self._running >= self._max_concurrency:
+            return False
+        return (
+            priority != Priority.BACKGROUND
+            or self._background < self._max_background
+        )
+
+    def _start(self, priority: Priority) -> None:
+        self._running += 1
+        if priority == Priority.BACKGROUND:
+            self._background += 1
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self._can_start(priority) and not any(
+            self._waiters[lane] for lane in Priority if lane <= priority
+        ):
+            self._start(priority)
+            return
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was granted as the waiter was being cancelled
+                self._release(priority)
+            elif waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+            raise
+
+    def _release(self, priority: Priority) -> None:
+        self._running -= 1
+        if priority == Priority.BACKGROUND:
+            self._background -= 1
+        for lane in Priority:
+            waiters = self._waiters[lane]
+            while waiters and self._can_start(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._start(lane)
+                    waiter.set_result(None)
@@ -0,0 +1,137 @@
+"""Token-bucket pacing of actions transmitted by a hub over RF."""
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from .action import Action
+
+DEFAULT_HUB_RATE = 4.0
+DEFAULT_HUB_BURST = 4.0
+DEFAULT_DEVICE_RATE = 1.0
+DEFAULT_DEVICE_BURST = 2.0
+
+# Belief updates only change the hub's records and are never transmitted,
+# while shade moves keep the device busy for longer than a power toggle.
+DEFAULT_ACTION_COSTS: Dict[str, float] = {
+    Action.SET_STATE_BELIEF: 0.0,
+    Action.SET_POSITION: 2.0,
+    Action.INCREASE_POSITION: 2.0,
+    Action.DECREASE_POSITION: 2.0,
+}
+
+
+class TokenBucket:
+    """Token bucket that lets callers reserve tokens ahead of time."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a full bucket refilled at `rate` tokens per second."""
+        self._rate = rate
+        self._capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        """Return seconds until `cost` tokens would be available."""
+        self._refill()
+        return max(0.0, (cost - self._tokens) / self._rate)
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens, possibly going into debt; return seconds to wait."""
+        self._refill()
+        self._tokens -= cost
+        return max(0.0, -self._tokens / self._rate)
+
+    def refund(self, cost: float = 1.0) -> None:
+        """Give back tokens reserved for something that was not done."""
+        self._refill()
+        self._tokens = min(self._capacity, self._tokens + cost)
+
+
+class RateLimiter:
+    """Paces actions with one bucket per hub and one per device.
+
+    Actions are delayed rather than dropped: every action reserves its cost
+    from both buckets and waits until both are out of debt, so commands are
+    sent in the order they were issued.
+    """
+
+    def __init__(
+        self,
+        *,
+        hub_rate: float = DEFAULT_HUB_RATE,
+        hub_burst: float = DEFAULT_HUB_BURST,
+        device_rate: float = DEFAULT_DEVICE_RATE,
+        device_burst: float = DEFAULT_DEVICE_BURST,
+        costs: Optional[Dict[str, float]] = None,
+        default_cost: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a limiter; `costs` override the default per-action costs."""
+        self._device_rate = device_rate
+        self._device_burst = device_burst
+        self._costs = {**DEFAULT_ACTION_COSTS, **(costs or {})}
+        self._default_cost = default_cost
+        self._clock = clock
+        self._hub = TokenBucket(hub_rate, hub_burst, clock=clock)
+        self._devices: Dict[str, TokenBucket] = {}
+
+    def cost(self, action_name: str) -> float:
+        """Return the number of tokens an action consumes."""
+        return self._costs.get(action_name, self._default_cost)
+
+    def _device(self, device_id: str) -> TokenBucket:
+        bucket = self._devices.get(device_id)
+        if bucket is None:
+            bucket = TokenBucket(self._device_rate, self._device_burst, clock=self._clock)
+            self._devices[device_id] = bucket
+        return bucket
+
+    def wait_time(self, device_id: str, action_name: str) -> float:
+        """Return seconds an action issued now would be delayed."""
+        cost = self.cost(action_name)
+        if not cost:
+            return 0.0
+        return max(self._hub.wait_time(cost), self._device(device_id).wait_time(cost))
+
+    def reserve(self, device_id: str, action_name: str) -> float:
+        """Reserve tokens for an action and return seconds to wait before sending."""
+        cost = self.cost(action_name)
+        if not cost:
+            return 0.0
+        return max(self._hub.reserve(cost), self._device(device_id).reserve(cost))
+
+    def refund(self, device_id: str, action_name: str) -> None:
+        """Give back tokens reserved for an action that was not sent."""
+        cost = self.cost(action_name)
+        if cost:
+            self._hub.refund(cost)
+            self._device(device_id).refund(cost)
+
+    async def acquire(self, device_id: str, action_name: str) -> float:
+        """Wait until an action may be sent; return the seconds waited.
+
+        Tokens are given back when the wait is cancelled, e.g. by a timeout.
+        """
+        delay = self.reserve(device_id, action_name)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.refund(device_id, action_name)
+                raise
+        return delay
@@ -0,0 +1,127 @@
+"""Recording and replay of raw BPUP datagrams."""
+
+import asyncio
+import mmap
+import struct
+import time
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Union
+
+from .bpup import BPUProtocol, BPUPSubscriptions
+
+MAGIC = b"BPUPREC1"
+
+# monotonic timestamp, source port, source host length, datagram length
+_RECORD = struct.Struct("<dHHI")
+
+Datagram = Tuple[float, Tuple[str, int], bytes]
+
+
+class BPUPRecorder:
+    """Appends raw datagrams to a compact binary log."""
+
+    def __init__(self, path: str) -> None:
+        """Open the log for appending, writing the header for a new file."""
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def record(self, data: bytes, addr: Any, timestamp: Optional[float] = None) -> None:
+        """Append a datagram received from addr."""
+        host, port = (addr[0], addr[1]) if addr else ("", 0)
+        host_bytes = host.encode()
+        self._file.write(
+            _RECORD.pack(
+                time.monotonic() if timestamp is None else timestamp,
+                port,
+                len(host_bytes),
+                len(data),
+            )
+            + host_bytes
+            + data
+        )
+
+    def flush(self) -> None:
+        """Flush buffered records to disk."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the log."""
+        self._file.close()
+
+    def __enter__(self) -> "BPUPRecorder":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+class BPUPRecording:
+    """Memory-mapped, read-only view of a datagram log."""
+
+    def __init__(self, path: str) -> None:
+        """Map the log into memory."""
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a BPUP recording")
+
+    def __iter__(self) -> Iterator[Datagram]:
+        """Yield (timestamp, addr, data) in recorded order.
+
+        A record truncated by an interrupted write ends the iteration.
+        """
+        view = self._map
+        offset = len(MAGIC)
+        end = len(view)
+        while offset + _RECORD.size <= end:
+            timestamp, port, host_length, data_length = _RECORD.unpack_from(view, offset)
+            offset += _RECORD.size
+            if offset + host_length + data_length > end:
+                return
+            host = view[offset : offset + host_length].decode()
+            offset += host_length
+            yield timestamp, (host, port), view[offset : offset + data_length]
+            offset += data_length
+
+    def close(self) -> None:
+        """Unmap the log."""
+        self._map.close()
+
+    def __enter__(self) -> "BPUPRecording":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+async def replay(
+    recording: Union[str, BPUPRecording],
+    bpup_subscriptions: BPUPSubscriptions,
+    *,
+    speed: float = 1.0,
+) -> int:
+    """Feed recorded datagrams to subscriptions and return how many were sent.
+
+    Datagrams are replayed with their recorded spacing divided by `speed`;
+    a speed of 0 replays them as fast as possible.
+    """
+    if isinstance(recording, str):
+        with BPUPRecording(recording) as opened:
+            return await replay(opened, bpup_subscriptions, speed=speed)
+
+    loop = asyncio.get_event_loop()
+    protocol = BPUProtocol(bpup_subscriptions)
+    count = 0
+    first: Optional[float] = None
+    start = loop.time()
+    for timestamp, addr, data in recording:
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = start + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        protocol.datagram_received(data, addr)
+        count += 1
+    return count
@@ -0,0 +1,161 @@
+"""Scene execution across one or more Bond hubs."""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .action import Action
+
+if TYPE_CHECKING:
+    from .bond import Bond
+
+DEFAULT_MAX_CONCURRENCY_PER_HUB = 2
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SceneStepSkipped(Exception):
+    """Raised for a step that was not executed because a dependency failed."""
+
+
+class SceneStep:
+    """Single action of a scene."""
+
+    def __init__(
+        self,
+        bond: "Bond",
+        device_id: str,
+        action: Action,
+        *,
+        after: Sequence[int] = (),
+    ):
+        """Create a step; `after` lists indices of steps that must finish first."""
+        self.bond = bond
+        self.device_id = device_id
+        self.action = action
+        self.after = tuple(after)
+
+
+class SceneResult:
+    """Outcome and timing of a single scene step."""
+
+    def __init__(self, step: SceneStep) -> None:
+        """Create an empty result for the step."""
+        self.step = step
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Return if the step was executed without an error."""
+        return self.finished is not None and self.error is None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Return seconds spent executing the step, excluding queueing."""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+SceneItem = Union[SceneStep, Tuple["Bond", str, Action]]
+
+
+class Scene:
+    """Set of actions executed across hubs with per-hub concurrency caps.
+
+    Steps for different hubs run in parallel. Steps for the same hub share
+    `max_concurrency_per_hub` slots, which are handed out to steps with the
+    longest chain of dependents first so the scene finishes as early as possible.
+    """
+
+    def __init__(
+        self,
+        steps: Iterable[SceneItem] = (),
+        *,
+        max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+    ):
+        """Create a scene from steps or (hub, device_id, action) tuples."""
+        self._max_concurrency_per_hub = max_concurrency_per_hub
+        self._steps: List[SceneStep] = []
+        for step in steps:
+            if isinstance(step, SceneStep):
+                self._add_step(step)
+            else:
+                self.add(*step)
+
+    @property
+    def steps(self) -> List[SceneStep]:
+        """Return the steps of this scene in the order they were added."""
+        return list(self._steps)
+
+    def add(
+        self, bond: "Bond", device_id: str, action: Action, *, after: Sequence[int] = ()
+    ) -> int:
+        """Add an action to the scene and return its step index."""
+        return self._add_step(SceneStep(bond, device_id, action, after=after))
+
+    def _add_step(self, step: SceneStep) -> int:
+        index = len(self._steps)
+        for dependency in step.after:
+            if not 0 <= dependency < index:
+                raise ValueError(
+                    f"Step {index} can only depend on earlier steps, got {dependency}"
+                )
+        self._steps.append(step)
+        return index
+
+    def _critical_path(self) -> List[int]:
+        """Return the length of the longest dependent chain starting at each step."""
+        lengths = [1] * len(self._steps)
+        for index in reversed(range(len(self._steps))):
+            for dependency in self._steps[index].after:
+                lengths[dependency] = max(lengths[dependency], lengths[index] + 1)
+        return lengths
+
+    async def execute(self) -> List[SceneResult]:
+        """Execute the scene and return results in step order."""
+        results = [SceneResult(step) for step in self._steps]
+        done: List[asyncio.Event] = [asyncio.Event() for _ in self._steps]
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        for step in self._steps:
+            if step.bond.host not in semaphores:
+                semaphores[step.bond.host] = asyncio.Semaphore(
+                    self._max_concurrency_per_hub
+                )
+        start = time.monotonic()
+
+        async def run(index: int) -> None:
+            step = self._steps[index]
+            result = results[index]
+            try:
+                for dependency in step.after:
+                    await done[dependency].wait()
+                    if not results[dependency].ok:
+                        raise SceneStepSkipped(f"Dependency {dependency} failed")
+                async with semaphores[step.bond.host]:
+                    result.started = time.monotonic() - start
+                    await step.bond.action(step.device_id, step.action)
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.debug("Scene step %s failed: %s", index, ex)
+                result.error = ex
+            finally:
+                result.finished = time.monotonic() - start
+                done[index].set()
+
+        lengths = self._critical_path()
+        order = sorted(range(len(self._steps)), key=lambda index: -lengths[index])
+        await asyncio.gather(*[run(index) for index in order])
+        return results
+
+
+async def execute_scene(
+    steps: Iterable[SceneItem],
+    *,
+    max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+) -> List[SceneResult]:
+    """Execute (hub, device_id, action) tuples as a scene."""
+    scene = Scene(steps, max_concurrency_per_hub=max_concurrency_per_hub)
+    return await scene.execute()
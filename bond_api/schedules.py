@@ -0,0 +1,166 @@
+"""Synchronize hub-side device schedules with a desired set."""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from .effects import matches
+from .priority import Priority, priority_scope
+from .scene import DEFAULT_MAX_CONCURRENCY_PER_HUB
+
+if TYPE_CHECKING:
+    from .bond import Bond
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+
+class ScheduleChange:
+    """A change bringing the schedules of a device to the desired set."""
+
+    def __init__(
+        self,
+        kind: str,
+        device_id: str,
+        schedule_id: Optional[str] = None,
+        schedule: Optional[Dict[str, Any]] = None,
+    ):
+        """Create a change of the given kind."""
+        self.kind = kind
+        self.device_id = device_id
+        self.schedule_id = schedule_id
+        self.schedule = schedule
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ScheduleChange) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return (
+            f"ScheduleChange({self.kind!r}, {self.device_id!r}, "
+            f"{self.schedule_id!r}, {self.schedule!r})"
+        )
+
+
+def _content(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in schedule.items() if key != "_"}
+
+
+def diff_schedules(
+    device_id: str,
+    current: Dict[str, Dict[str, Any]],
+    desired: List[Dict[str, Any]],
+) -> List[ScheduleChange]:
+    """Return the changes turning current schedules by ID into the desired ones.
+
+    A schedule on the hub matches a desired one when it has every field the
+    desired schedule specifies, so fields filled in by the hub are ignored.
+    Leftover schedules are updated in place when the desired schedule sets
+    all of their fields, as a PATCH cannot remove fields; the others are
+    deleted and the remaining desired schedules created.
+    """
+    remaining = [_content(schedule) for schedule in desired]
+    unmatched = []
+    for schedule_id in sorted(current):
+        content = _content(current[schedule_id])
+        match = next((want for want in remaining if matches(content, want)), None)
+        if match is not None:
+            remaining.remove(match)
+        else:
+            unmatched.append(schedule_id)
+
+    changes = []
+    deleted = []
+    for schedule_id in unmatched:
+        fields = set(_content(current[schedule_id]))
+        replacement = next((want for want in remaining if fields <= set(want)), None)
+        if replacement is None:
+            deleted.append(schedule_id)
+        else:
+            remaining.remove(replacement)
+            changes.append(ScheduleChange(UPDATE, device_id, schedule_id, replacement))
+    changes += [ScheduleChange(DELETE, device_id, schedule_id) for schedule_id in deleted]
+    changes += [
+        ScheduleChange(CREATE, device_id, schedule=schedule) for schedule in remaining
+    ]
+    return changes
+
+
+async def current_schedules(
+    bond: "Bond",
+    device_id: str,
+    *,
+    max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+) -> Dict[str, Dict[str, Any]]:
+    """Return the schedules of a device on its hub by schedule ID."""
+    return await _current_schedules(
+        bond, device_id, asyncio.Semaphore(max_concurrency_per_hub)
+    )
+
+
+async def _current_schedules(
+    bond: "Bond", device_id: str, slots: asyncio.Semaphore
+) -> Dict[str, Dict[str, Any]]:
+    async def get(schedule_id: str) -> Dict[str, Any]:
+        async with slots:
+            return await bond.device_schedule(device_id, schedule_id)
+
+    async with slots:
+        schedule_ids = await bond.device_schedules(device_id)
+    schedules = await asyncio.gather(*[get(schedule_id) for schedule_id in schedule_ids])
+    return dict(zip(schedule_ids, schedules))
+
+
+async def plan_schedules(
+    bond: "Bond",
+    desired: Dict[str, List[Dict[str, Any]]],
+    *,
+    max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+) -> List[ScheduleChange]:
+    """Return the changes needed for the devices of a hub to have the desired schedules.
+
+    Devices missing from `desired` are left untouched; map a device to an
+    empty list to remove all of its schedules. At most
+    `max_concurrency_per_hub` requests are sent to the hub at once.
+    """
+    slots = asyncio.Semaphore(max_concurrency_per_hub)
+    device_ids = list(desired)
+    currents = await asyncio.gather(
+        *[_current_schedules(bond, device_id, slots) for device_id in device_ids]
+    )
+    changes = []
+    for device_id, current in zip(device_ids, currents):
+        changes += diff_schedules(device_id, current, desired[device_id])
+    return changes
+
+
+async def apply_schedule_changes(bond: "Bond", changes: List[ScheduleChange]) -> None:
+    """Send schedule changes to the hub, one request each, as background work."""
+    with priority_scope(Priority.BACKGROUND):
+        for change in changes:
+            if change.kind == CREATE:
+                assert change.schedule is not None
+                await bond.create_device_schedule(change.device_id, change.schedule)
+            elif change.kind == UPDATE:
+                assert change.schedule_id is not None and change.schedule is not None
+                await bond.update_device_schedule(
+                    change.device_id, change.schedule_id, change.schedule
+                )
+            else:
+                assert change.schedule_id is not None
+                await bond.delete_device_schedule(change.device_id, change.schedule_id)
+
+
+async def sync_schedules(
+    bond: "Bond",
+    desired: Dict[str, List[Dict[str, Any]]],
+    *,
+    dry_run: bool = False,
+    max_concurrency_per_hub: int = DEFAULT_MAX_CONCURRENCY_PER_HUB,
+) -> List[ScheduleChange]:
+    """Bring the schedules of a hub to the desired set and return the changes made."""
+    changes = await plan_schedules(
+        bond, desired, max_concurrency_per_hub=max_concurrency_per_hub
+    )
+    if not dry_run:
+        await apply_schedule_changes(bond, changes)
+    return changes
@@ -0,0 +1,375 @@
+"""Run hubs of a large fleet in worker processes, one event loop per core."""
+
+import asyncio
+import functools
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import struct
+import time
+import zlib
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from aiohttp import ClientSession
+
+from .bond import Bond
+from .bpup import BPUPSubscriptions, Subscription, start_bpup
+
+_LOGGER = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<I")
+
+BondFactory = Callable[[str, str, ClientSession, BPUPSubscriptions], Bond]
+
+
+class ShardError(Exception):
+    """Raised when a shard fails a call with an error it cannot send back."""
+
+
+def shard_for(host: str, shards: int) -> int:
+    """Return the index of the shard owning a host, stable across processes."""
+    return zlib.crc32(host.encode()) % shards
+
+
+def default_bond_factory(
+    host: str, token: str, session: ClientSession, subscriptions: BPUPSubscriptions
+) -> Bond:
+    """Create the Bond of a hub inside a shard."""
+    return Bond(host, token, session=session, bpup_subscriptions=subscriptions)
+
+
+def _topic(json_msg: Dict[str, Any]) -> str:
+    return "/".join(json_msg["t"].split("/")[:2])
+
+
+class _ForwardingSubscriptions(BPUPSubscriptions):
+    """Subscriptions of a shard that also forward pushes the parent wants.
+
+    Only successful pushes of `topics`, e.g. "devices/<id>", are forwarded;
+    other messages are only counted so the parent knows the hub is alive.
+    """
+
+    def __init__(self, forward: Callable[[Optional[Dict[str, Any]]], None]) -> None:
+        super().__init__()
+        self._forward = forward
+        self.topics: Set[str] = set()
+
+    def notify(self, json_msg: Dict[str, Any]) -> None:
+        super().notify(json_msg)
+        if json_msg.get("s") == 200 and _topic(json_msg) in self.topics:
+            self._forward(json_msg)
+        else:
+            self._forward(None)
+
+
+class _FleetSubscriptions(BPUPSubscriptions):
+    """Subscriptions of a hub in the parent, announcing new topics to its shard."""
+
+    def __init__(self, announce: Callable[[str], None]) -> None:
+        super().__init__()
+        self._announce = announce
+        self.topics: Set[str] = set()
+
+    def subscribe(
+        self, device_id: str, callback: Callable, **kwargs: Any
+    ) -> Subscription:
+        subscription = super().subscribe(device_id, callback, **kwargs)
+        self._add_topic(f"devices/{device_id}")
+        return subscription
+
+    def subscribe_group(
+        self, group_id: str, callback: Callable, **kwargs: Any
+    ) -> Subscription:
+        subscription = super().subscribe_group(group_id, callback, **kwargs)
+        self._add_topic(f"groups/{group_id}")
+        return subscription
+
+    def seen(self, count: int) -> None:
+        """Account for messages the shard received but did not forward."""
+        self.last_message_time = time.monotonic()
+        self.message_count += count
+
+    def _add_topic(self, topic: str) -> None:
+        if topic not in self.topics:
+            self.topics.add(topic)
+            self._announce(topic)
+
+
+def _picklable(ex: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(ex))
+    except Exception:  # pylint: disable=broad-except
+        return ShardError(f"{type(ex).__name__}: {ex}")
+    return ex
+
+
+def _frame(message: Any) -> bytes:
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(data)) + data
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Any:
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return pickle.loads(await reader.readexactly(size))
+
+
+async def _open_stream(
+    conn: Connection,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    # the pipe is only used to hand over a socket; writes to the stream are
+    # buffered by the loop instead of blocking it when the peer is busy
+    sock = socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.close()
+    return await asyncio.open_unix_connection(sock=sock)
+
+
+def _run_shard(
+    conn: Connection, hubs: Dict[str, str], bond_factory: BondFactory, bpup: bool
+) -> None:
+    asyncio.run(_serve(conn, hubs, bond_factory, bpup))
+
+
+async def _serve(
+    conn: Connection, hubs: Dict[str, str], bond_factory: BondFactory, bpup: bool
+) -> None:
+    loop = asyncio.get_event_loop()
+    reader, writer = await _open_stream(conn)
+    pushes: List[Tuple[str, Dict[str, Any]]] = []
+    skipped: Dict[str, int] = {}
+    tasks = set()
+
+    def send(message: Any) -> None:
+        if not writer.is_closing():
+            writer.write(_frame(message))
+
+    def flush() -> None:
+        send(("pushes", pushes[:], dict(skipped)))
+        pushes.clear()
+        skipped.clear()
+
+    def forwarder(host: str) -> Callable[[Optional[Dict[str, Any]]], None]:
+        def forward(json_msg: Optional[Dict[str, Any]]) -> None:
+            # messages received in one loop iteration travel in a single frame
+            if not pushes and not skipped:
+                loop.call_soon(flush)
+            if json_msg is None:
+                skipped[host] = skipped.get(host, 0) + 1
+            else:
+                pushes.append((host, json_msg))
+
+        return forward
+
+    async def call(
+        request_id: int, host: str, method: str, args: tuple, kwargs: dict
+    ) -> None:
+        try:
+            result = await getattr(bonds[host], method)(*args, **kwargs)
+        except Exception as ex:  # pylint: disable=broad-except
+            send(("error", request_id, _picklable(ex)))
+        else:
+            send(("result", request_id, result))
+
+    async with ClientSession() as session:
+        bonds: Dict[str, Bond] = {}
+        forwarding: Dict[str, _ForwardingSubscriptions] = {}
+        stops = []
+        for host, token in hubs.items():
+            subscriptions = forwarding[host] = _ForwardingSubscriptions(forwarder(host))
+            bonds[host] = bond_factory(host, token, session, subscriptions)
+            if bpup:
+                stops.append(await start_bpup(host, subscriptions))
+        send(("ready",))
+        try:
+            while True:
+                try:
+                    message = await _read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if message[0] == "stop":
+                    break
+                if message[0] == "topics":
+                    for host, topics in message[1].items():
+                        forwarding[host].topics.update(topics)
+                    continue
+                task = loop.create_task(call(*message[1:]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for stop in stops:
+                stop()
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+class _Shard:
+    """Parent side of a worker process."""
+
+    def __init__(
+        self, process: multiprocessing.process.BaseProcess, writer: asyncio.StreamWriter
+    ):
+        self.process = process
+        self.writer = writer
+        self.ready = asyncio.get_event_loop().create_future()
+        self.pending: Dict[int, "asyncio.Future[Any]"] = {}
+        self.receiver: Optional["asyncio.Task[None]"] = None
+        self.closed = False
+
+
+class ShardedFleet:
+    """Partitions hubs across worker processes, each with its own event loop.
+
+    Every worker owns a pooled session, the `Bond` of each of its hubs and
+    their BPUP endpoints. Calls are forwarded to the worker owning the hub and
+    BPUP pushes are streamed back in batches and delivered to the parent's
+    per-hub `BPUPSubscriptions`, so JSON decoding and HTTP handling scale with
+    the number of cores. Only successful pushes of devices and groups
+    subscribed to in the parent are sent back; other messages only keep the
+    parent's subscriptions alive. Messages travel as length-prefixed pickles over a
+    Unix socket read and written by the event loops, so neither side blocks
+    on a full buffer. `bond_factory` must be picklable, e.g. a module level
+    function, as workers are started with the spawn method.
+    """
+
+    def __init__(
+        self,
+        hubs: Dict[str, str],
+        *,
+        shards: Optional[int] = None,
+        bond_factory: BondFactory = default_bond_factory,
+        bpup: bool = True,
+    ) -> None:
+        """Create a fleet of hubs given as host to token mapping."""
+        count = max(1, min(shards or os.cpu_count() or 1, len(hubs)))
+        self._partitions: Dict[int, Dict[str, str]] = {}
+        self._owners: Dict[str, int] = {}
+        for host, token in hubs.items():
+            index = shard_for(host, count)
+            self._partitions.setdefault(index, {})[host] = token
+            self._owners[host] = index
+        self._bond_factory = bond_factory
+        self._bpup = bpup
+        self._subscriptions = {
+            host: _FleetSubscriptions(functools.partial(self._announce, host))
+            for host in hubs
+        }
+        self._shards: Dict[int, _Shard] = {}
+        self._request_ids = itertools.count()
+
+    @property
+    def shard_count(self) -> int:
+        """Return the number of worker processes, one per non-empty partition."""
+        return len(self._partitions)
+
+    def _announce(self, host: str, topic: str) -> None:
+        shard = self._shards.get(self._owners[host])
+        if shard is not None and not shard.closed:
+            shard.writer.write(_frame(("topics", {host: [topic]})))
+
+    def subscriptions(self, host: str) -> BPUPSubscriptions:
+        """Return the subscriptions receiving BPUP pushes of a hub."""
+        return self._subscriptions[host]
+
+    def subscribe(
+        self, host: str, device_id: str, callback: Callable, *, weak: bool = False
+    ) -> Subscription:
+        """Subscribe to BPUP updates of a device on a hub."""
+        return self._subscriptions[host].subscribe(device_id, callback, weak=weak)
+
+    async def start(self) -> None:
+        """Start the worker processes and wait until they serve their hubs."""
+        context = multiprocessing.get_context("spawn")
+        for index, hubs in self._partitions.items():
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_run_shard,
+                args=(child_conn, hubs, self._bond_factory, self._bpup),
+                name=f"bond-api-shard-{index}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            reader, writer = await _open_stream(conn)
+            shard = self._shards[index] = _Shard(process, writer)
+            # later subscriptions are announced as they are made
+            topics = {host: list(self._subscriptions[host].topics) for host in hubs}
+            writer.write(_frame(("topics", topics)))
+            shard.receiver = asyncio.ensure_future(self._receive(shard, reader))
+        await asyncio.gather(*[shard.ready for shard in self._shards.values()])
+
+    async def call(self, host: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a `Bond` coroutine method of a hub in its worker process."""
+        if host not in self._owners:
+            raise KeyError(host)
+        shard = self._shards.get(self._owners[host])
+        if shard is None or shard.closed:
+            raise ShardError(f"Shard of {host} is not running")
+        request_id = next(self._request_ids)
+        future = shard.pending[request_id] = asyncio.get_event_loop().create_future()
+        try:
+            shard.writer.write(_frame(("call", request_id, host, method, args, kwargs)))
+            return await future
+        finally:
+            shard.pending.pop(request_id, None)
+
+    async def _receive(self, shard: _Shard, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                message = await _read_frame(reader)
+                kind = message[0]
+                if kind == "pushes":
+                    for host, json_msg in message[1]:
+                        self._subscriptions[host].notify(json_msg)
+                    for host, count in message[2].items():
+                        self._subscriptions[host].seen(count)
+                elif kind == "ready":
+                    shard.ready.set_result(None)
+                else:
+                    future = shard.pending.get(message[1])
+                    if future is None or future.done():
+                        continue
+                    if kind == "error":
+                        future.set_exception(message[2])
+                    else:
+                        future.set_result(message[2])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._lost(shard)
+
+    def _lost(self, shard: _Shard) -> None:
+        if shard.closed:
+            return
+        _LOGGER.debug("Shard %s exited", shard.process.name)
+        shard.closed = True
+        shard.writer.close()
+        error = ShardError(f"{shard.process.name} exited")
+        if not shard.ready.done():
+            shard.ready.set_exception(error)
+        for future in shard.pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def stop(self) -> None:
+        """Stop the worker processes."""
+        loop = asyncio.get_event_loop()
+        for shard in self._shards.values():
+            if not shard.closed:
+                shard.writer.write(_frame(("stop",)))
+            self._lost(shard)
+            if shard.receiver is not None:
+                shard.receiver.cancel()
+        for shard in self._shards.values():
+            await loop.run_in_executor(None, shard.process.join)
+        self._shards.clear()
+
+    async def __aenter__(self) -> "ShardedFleet":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
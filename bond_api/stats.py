@@ -0,0 +1,26 @@
+"""Running latency statistics."""
+
+from typing import Optional
+
+
+class LatencyStats:
+    """Running statistics of latencies."""
+
+    def __init__(self) -> None:
+        """Init empty statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last: Optional[float] = None
+
+    def add(self, latency: float) -> None:
+        """Record a latency in seconds."""
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.last = latency
+
+    @property
+    def mean(self) -> float:
+        """Return the mean latency in seconds."""
+        return self.total / self.count if self.count else 0.0
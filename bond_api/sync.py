@@ -0,0 +1,204 @@
+"""Blocking facade over Bond API for threaded callers."""
+
+import asyncio
+import atexit
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout
+
+from .bond import Bond
+from .bpup import BPUPSubscriptions, start_bpup
+
+
+class _LoopThread:
+    """Event loop running in a daemon thread, shared by the whole process."""
+
+    _lock = threading.Lock()
+    _instance: Optional["_LoopThread"] = None
+
+    def __init__(self) -> None:
+        """Start the loop thread."""
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self._session: Optional[ClientSession] = None
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="bond-api-loop", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "_LoopThread":
+        """Return the loop thread of this process, starting it if needed."""
+        with cls._lock:
+            # a forked child inherits the instance but not the thread
+            if cls._instance is None or cls._instance.pid != os.getpid():
+                cls._instance = _LoopThread()
+            return cls._instance
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it completes."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Blocking call made from the bond-api loop thread")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def session(self) -> ClientSession:
+        """Return the pooled session shared by all facades."""
+        if self._session is None or self._session.closed:
+            self._session = ClientSession()
+        return self._session
+
+    def shutdown(self) -> None:
+        """Close the pooled session and stop the loop."""
+        if self.loop.is_closed():
+            return
+        if self._session is not None:
+            self.run(self._session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def shutdown() -> None:
+    """Stop the background loop used by synchronous facades, if running."""
+    with _LoopThread._lock:
+        runner = _LoopThread._instance
+        _LoopThread._instance = None
+    if runner is not None and runner.pid == os.getpid():
+        runner.shutdown()
+
+
+atexit.register(shutdown)
+
+
+class SyncBond:
+    """Blocking Bond API backed by a shared background event loop.
+
+    Every coroutine method of `Bond` is available as a blocking method with the
+    same signature. Calls may be made from any thread; all of them share one
+    event loop and one pooled `ClientSession` per process.
+    """
+
+    def __init__(
+        self, host: str, token: str, *, timeout: Optional[ClientTimeout] = None
+    ):
+        """Initialize SyncBond with provided host and token."""
+        self._runner = _LoopThread.get()
+        self._bond: Bond = self._runner.run(self._create(host, token, timeout))
+
+    async def _create(
+        self, host: str, token: str, timeout: Optional[ClientTimeout]
+    ) -> Bond:
+        session = await self._runner.session()
+        return Bond(host, token, session=session, timeout=timeout)
+
+    @property
+    def host(self) -> str:
+        """Return the host this instance talks to."""
+        return self._bond.host
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._bond, name) if not name.startswith("_") else None
+        if not inspect.iscoroutinefunction(attr):
+            raise AttributeError(name)
+
+        @functools.wraps(attr)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self._runner.run(attr(*args, **kwargs))
+
+        return call
+
+    def bpup(self, *, executor: Optional[Executor] = None) -> "SyncBPUP":
+        """Start listening for BPUP pushes from this hub."""
+        return SyncBPUP(self.host, executor=executor)
+
+
+class SyncBPUP:
+    """BPUP listener running on the shared background event loop.
+
+    Callbacks run on the loop thread unless an executor is provided, in which
+    case they are submitted to the executor so slow consumers cannot stall
+    the loop.
+    """
+
+    def __init__(self, host: str, *, executor: Optional[Executor] = None):
+        """Start listening for BPUP pushes from the host."""
+        self._runner = _LoopThread.get()
+        self._executor = executor
+        # one wrapped callback per subscribe call, as a callback may be
+        # subscribed more than once
+        self._wrapped: Dict[Tuple[str, Callable], List[Callable]] = {}
+        self._wrapped_lock = threading.Lock()
+        self.subscriptions = BPUPSubscriptions()
+        self._stop: Callable = self._runner.run(start_bpup(host, self.subscriptions))
+
+    @property
+    def alive(self) -> bool:
+        """Return if the subscriptions are considered alive."""
+        return self.subscriptions.alive
+
+    def _wrap(self, callback: Callable) -> Callable:
+        if self._executor is None:
+            return callback
+        executor = self._executor
+
+        def submit(*args: Any) -> None:
+            executor.submit(callback, *args)
+
+        return submit
+
+    def _add_wrapped(self, topic: str, callback: Callable) -> Callable:
+        wrapped = self._wrap(callback)
+        with self._wrapped_lock:
+            self._wrapped.setdefault((topic, callback), []).append(wrapped)
+        return wrapped
+
+    def _pop_wrapped(self, topic: str, callback: Callable) -> Optional[Callable]:
+        key = (topic, callback)
+        with self._wrapped_lock:
+            same_key = self._wrapped.get(key)
+            if not same_key:
+                return None
+            wrapped = same_key.pop()
+            if not same_key:
+                del self._wrapped[key]
+        return wrapped
+
+    def subscribe(self, device_id: str, callback: Callable) -> None:
+        """Subscribe to BPUP updates from any thread."""
+        wrapped = self._add_wrapped(f"devices/{device_id}", callback)
+        self._runner.loop.call_soon_threadsafe(
+            self.subscriptions.subscribe, device_id, wrapped
+        )
+
+    def unsubscribe(self, device_id: str, callback: Callable) -> None:
+        """Unsubscribe one subscription of a callback from any thread."""
+        wrapped = self._pop_wrapped(f"devices/{device_id}", callback)
+        if wrapped is not None:
+            self._runner.loop.call_soon_threadsafe(
+                self.subscriptions.unsubscribe, device_id, wrapped
+            )
+
+    def subscribe_group(self, group_id: str, callback: Callable) -> None:
+        """Subscribe to BPUP updates for a group from any thread."""
+        wrapped = self._add_wrapped(f"groups/{group_id}", callback)
+        self._runner.loop.call_soon_threadsafe(
+            self.subscriptions.subscribe_group, group_id, wrapped
+        )
+
+    def unsubscribe_group(self, group_id: str, callback: Callable) -> None:
+        """Unsubscribe one group subscription of a callback from any thread."""
+        wrapped = self._pop_wrapped(f"groups/{group_id}", callback)
+        if wrapped is not None:
+            self._runner.loop.call_soon_threadsafe(
+                self.subscriptions.unsubscribe_group, group_id, wrapped
+            )
+
+    def stop(self) -> None:
+        """Stop listening for BPUP pushes."""
+        self._runner.loop.call_soon_threadsafe(self._stop)
@@ -0,0 +1,235 @@
+"""Transports carrying Bond Local API requests."""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HTTP_PORT = 80
+DEFAULT_MAX_CONNECTIONS = 4
+WARM_PATH = "/v2/sys/version"
+
+
+class TransportResponseError(Exception):
+    """Raised by lean transports when the hub answers with an error status."""
+
+    def __init__(self, status: int, message: str = "") -> None:
+        """Create an error for the given HTTP status."""
+        super().__init__(f"{status}, message={message!r}")
+        self.status = status
+        self.message = message
+
+    def __reduce__(self) -> Any:
+        return type(self), (self.status, self.message)
+
+
+class Transport:
+    """Sends requests to a single Bond hub."""
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> Any:
+        """Send a request and return the decoded JSON body, None when empty."""
+        raise NotImplementedError
+
+    async def warm(self) -> Optional[float]:
+        """Open or refresh a connection ahead of use.
+
+        Return seconds until the first byte of the response, None when the
+        transport holds no connections to keep warm.
+        """
+        return None
+
+    async def close(self) -> None:
+        """Release connections held by the transport."""
+
+
+class StreamTransport(Transport):
+    """Minimal keep-alive HTTP/1.1 client on top of asyncio streams.
+
+    Headers, including `BOND-Token`, are built once; there is no redirect,
+    cookie or proxy handling since the hub needs none of it.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        token: str,
+        *,
+        timeout: Optional[float] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ):
+        """Create a transport for the host, optionally given as host:port.
+
+        IPv6 literals with a port are given in brackets, e.g. `[fe80::1]:80`.
+        """
+        name, port = _split_host(host)
+        self._address = (name, port or DEFAULT_HTTP_PORT)
+        authority = f"[{name}]" if ":" in name else name
+        if port:
+            authority += f":{port}"
+        self._timeout = timeout
+        self._headers = (
+            f"Host: {authority}\r\nBOND-Token: {token}\r\nConnection: keep-alive\r\n"
+        ).encode()
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._max_connections = max_connections
+        # created on first use, as Python < 3.10 binds it to the current loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> Any:
+        """Send a request over a pooled connection."""
+        data, _ = await self._send(method, path, json)
+        return data
+
+    async def warm(self) -> Optional[float]:
+        """Refresh the most recently used connection, reconnecting if stale."""
+        _, first_byte_time = await self._send("GET", WARM_PATH, None)
+        return first_byte_time
+
+    async def _send(
+        self, method: str, path: str, body: Optional[dict]
+    ) -> Tuple[Any, float]:
+        if self._timeout is None:
+            return await self._request(method, path, body)
+        return await asyncio.wait_for(self._request(method, path, body), self._timeout)
+
+    async def _request(
+        self, method: str, path: str, body: Optional[dict]
+    ) -> Tuple[Any, float]:
+        payload = self._build(method, path, body)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_connections)
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            if connection is not None:
+                try:
+                    return await self._exchange(connection, payload)
+                except (ConnectionError, asyncio.IncompleteReadError) as ex:
+                    # bond has a short connection close time
+                    # so we need to retry if we idled for a bit
+                    _LOGGER.debug("Reconnecting stale connection: %s", ex)
+            connection = await asyncio.open_connection(*self._address)
+            return await self._exchange(connection, payload)
+
+    def _build(self, method: str, path: str, body: Optional[dict]) -> bytes:
+        request = f"{method} {path} HTTP/1.1\r\n".encode() + self._headers
+        if body is None:
+            return request + b"\r\n"
+        data = json.dumps(body, separators=(",", ":")).encode()
+        return (
+            request
+            + b"Content-Type: application/json\r\nContent-Length: "
+            + str(len(data)).encode()
+            + b"\r\n\r\n"
+            + data
+        )
+
+    async def _exchange(
+        self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter], payload: bytes
+    ) -> Tuple[Any, float]:
+        """Return the decoded body and seconds until the first response byte."""
+        reader, writer = connection
+        keep_alive = False
+        try:
+            start = time.perf_counter()
+            writer.write(payload)
+            status_line = await reader.readline()
+            first_byte_time = time.perf_counter() - start
+            if not status_line:
+                raise ConnectionResetError("Connection closed by hub")
+            _, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+            length: Optional[int] = None
+            chunked = False
+            keep_alive = True
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name = name.strip().lower()
+                value = value.strip()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "transfer-encoding":
+                    chunked = value.lower() == "chunked"
+                elif name == "connection":
+                    keep_alive = value.lower() != "close"
+            if chunked:
+                data = await self._read_chunked(reader)
+            elif length is not None:
+                data = await reader.readexactly(length)
+            elif status in ("204", "304") or status.startswith("1"):
+                data = b""
+            else:
+                # without a length the body ends when the hub closes the connection
+                keep_alive = False
+                data = await reader.read()
+        except BaseException:
+            keep_alive = False
+            raise
+        finally:
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                writer.close()
+        if int(status) >= 400:
+            raise TransportResponseError(int(status), "".join(reason))
+        return (json.loads(data) if data else None), first_byte_time
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        data = b""
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                return data
+            data += chunk[:-2]
+
+    async def close(self) -> None:
+        """Close idle connections."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def _split_host(host: str) -> Tuple[str, Optional[int]]:
+    if host.startswith("["):
+        name, _, rest = host[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif host.count(":") == 1:
+        name, _, port = host.partition(":")
+    else:
+        name, port = host, ""
+    return name, int(port) if port else None
+
+
+class MemoryTransport(Transport):
+    """Serves requests from an in-memory route table, for tests.
+
+    Routes map (method, path) to a response body, to a callable receiving the
+    request JSON and returning the body, or to an exception to raise.
+    """
+
+    def __init__(self, routes: Optional[Dict[Tuple[str, str], Any]] = None):
+        """Create a transport serving the given routes."""
+        self.routes: Dict[Tuple[str, str], Any] = dict(routes or {})
+        self.requests: List[Tuple[str, str, Optional[dict]]] = []
+
+    def add(self, method: str, path: str, response: Any = None) -> None:
+        """Add or replace a route."""
+        self.routes[(method, path)] = response
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> Any:
+        """Record the request and serve it from the route table."""
+        self.requests.append((method, path, json))
+        if (method, path) not in self.routes:
+            raise TransportResponseError(404, "Not Found")
+        response = self.routes[(method, path)]
+        if isinstance(response, BaseException):
+            raise response
+        if callable(response):
+            return response(json)
+        return response
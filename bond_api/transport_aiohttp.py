@@ -0,0 +1,78 @@
+"""Default transport backed by aiohttp."""
+
+import json
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from aiohttp import ClientSession, ClientTimeout
+from aiohttp.client_exceptions import ServerDisconnectedError, ClientOSError
+
+from .transport import WARM_PATH, Transport
+
+
+class AiohttpTransport(Transport):
+    """Sends requests through an aiohttp session."""
+
+    def __init__(
+        self,
+        host: str,
+        token: str,
+        *,
+        session: Optional[ClientSession] = None,
+        timeout: Optional[ClientTimeout] = None,
+    ):
+        """Create a transport, using a session per request unless one is given."""
+        self._host = host
+        self._api_kwargs: dict = {"headers": {"BOND-Token": token}}
+        if timeout:
+            self._api_kwargs["timeout"] = timeout
+        self._session = session
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> Any:
+        """Send a request and return the decoded JSON body, None when empty."""
+
+        async def send(session: ClientSession) -> Any:
+            async with session.request(
+                method, f"http://{self._host}{path}", **self._api_kwargs, json=json
+            ) as response:
+                response.raise_for_status()
+                if method == "GET":
+                    return await response.json()
+                # hubs may answer writes with an empty or non-JSON body
+                if response.content_type != "application/json":
+                    return None
+                return _decode(await response.read())
+
+        return await self.__call(send)
+
+    async def warm(self) -> Optional[float]:
+        """Refresh a pooled connection of the session, if one was given."""
+        if not self._session:
+            return None
+
+        async def send(session: ClientSession) -> float:
+            start = time.perf_counter()
+            async with session.get(
+                f"http://{self._host}{WARM_PATH}", **self._api_kwargs
+            ) as response:
+                first_byte_time = time.perf_counter() - start
+                await response.read()
+            return first_byte_time
+
+        return await self.__call(send)
+
+    async def __call(self, handler: Callable[[ClientSession], Awaitable[Any]]) -> Any:
+        if not self._session:
+            async with ClientSession() as request_session:
+                return await handler(request_session)
+        else:
+            try:
+                return await handler(self._session)
+            except (ClientOSError, ServerDisconnectedError):
+                # bond has a short connection close time
+                # so we need to retry if we idled for a bit
+                return await handler(self._session)
+
+
+def _decode(body: bytes) -> Any:
+    return json.loads(body) if body else None
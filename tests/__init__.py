@@ -4,6 +4,8 @@ from datetime import datetime
 import asyncio
 import time
 
+from bond_api.transport import MemoryTransport
+
 
 def mock_time_changed(loop: asyncio.AbstractEventLoop, datetime_: datetime) -> None:
     """Call events in the future."""
@@ -19,3 +21,37 @@ def mock_time_changed(loop: asyncio.AbstractEventLoop, datetime_: datetime) -> N
         if mock_seconds_into_future >= future_seconds:
             task._run()
             task.cancel()
+
+
+class ConcurrencyTransport(MemoryTransport):
+    """In-memory transport recording the most requests in flight at once."""
+
+    def __init__(self, routes=None, delay: float = 0.001):
+        super().__init__(routes)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, method, path, json=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return await super().request(method, path, json)
+        finally:
+            self.in_flight -= 1
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def push(subscriptions, body, device_id: str = "fan") -> None:
+    """Deliver a successful state push of a device."""
+    subscriptions.notify({"t": f"devices/{device_id}/state", "s": 200, "b": body})
@@ -11,3 +11,9 @@ def test_action_eq():
     assert Action("name-1", argument="arg-1") != Action(
         "name-other", argument="arg-other"
     )
+
+
+def test_set_timer():
+    """Tests the timer action carries seconds as argument."""
+    assert Action.set_timer(3600) == Action(Action.SET_TIMER, 3600)
+    assert Action.set_timer(3600).argument == {"argument": 3600}
@@ -0,0 +1,117 @@
+"""Unit tests for actuation latency tracking."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action, Bond, BPUPSubscriptions
+from bond_api.actuation import ActuationTracker, Histogram
+from bond_api.transport import MemoryTransport, TransportResponseError
+
+from . import FakeClock, push
+
+
+def test_histogram_buckets_and_quantiles():
+    """Tests samples land in bounded buckets and quantiles use upper bounds."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.6, 3.0):
+        histogram.add(value)
+    assert histogram.buckets == [1, 2, 1]
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+    assert histogram.mean == pytest.approx(1.0375)
+
+
+@pytest.mark.asyncio
+async def test_action_to_push_latency():
+    """Tests latency runs until the matching push and late pushes count as timeouts."""
+    clock = FakeClock(100.0)
+    exported = []
+    tracker = ActuationTracker(
+        clock=clock, timeout=5, exporter=lambda key, latency: exported.append(key)
+    )
+    subscriptions = BPUPSubscriptions()
+    transport = MemoryTransport(
+        {
+            ("GET", "/v2/devices/fan"): {"type": "CF", "name": "Fan"},
+            ("PUT", "/v2/devices/fan/actions/SetSpeed"): None,
+            ("PUT", "/v2/devices/fan/actions/TurnOff"): TransportResponseError(500),
+        }
+    )
+    bond = Bond(
+        "hub",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=subscriptions,
+        actuation_tracker=tracker,
+    )
+    await bond.device("fan")
+
+    await bond.action("fan", Action.set_speed(3))
+    clock.now += 0.3
+    push(subscriptions, {"speed": 2})
+    clock.now += 0.2
+    push(subscriptions, {"speed": 3})
+
+    with pytest.raises(TransportResponseError):
+        await bond.action("fan", Action.turn_off())
+    await bond.action("fan", Action.set_speed(1))
+    clock.now += 6
+    push(subscriptions, {"speed": 1})
+
+    histogram = tracker.histograms[("hub", "CF", "SetSpeed")]
+    assert histogram.count == 1
+    assert histogram.total == pytest.approx(0.5)
+    assert exported == [("hub", "CF", "SetSpeed")]
+    assert tracker.timeouts == {("hub", "CF", "SetSpeed"): 1}
+    (record,) = tracker.export()
+    assert record["hub"] == "hub"
+    assert record["device_type"] == "CF"
+    assert record["timeouts"] == 1
+    assert record["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_actions_without_push_time_out():
+    """Tests actions without a push expire on a timer."""
+    tracker = ActuationTracker(timeout=0.01)
+    transport = MemoryTransport({("PUT", "/v2/devices/fan/actions/TurnOn"): None})
+    subscriptions = BPUPSubscriptions()
+    bond = Bond(
+        "hub",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=subscriptions,
+        actuation_tracker=tracker,
+    )
+    for _ in range(3):
+        await bond.action("fan", Action.turn_on())
+    assert tracker.pending == 3
+    await asyncio.sleep(0.05)
+    assert tracker.pending == 0
+    assert tracker.timeouts == {("hub", "unknown", "TurnOn"): 3}
+    assert tracker.export()[0]["timeouts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_actions_not_tracked_without_subscriptions():
+    """Tests nothing is tracked when no push could confirm an action."""
+    tracker = ActuationTracker()
+    transport = MemoryTransport({("PUT", "/v2/devices/fan/actions/TurnOn"): None})
+    bond = Bond("hub", "test-token", transport=transport, actuation_tracker=tracker)
+    for _ in range(100):
+        await bond.action("fan", Action.turn_on())
+    assert tracker.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_actions_tracked_through_new_subscriptions():
+    """Tests actions sent through restarted BPUP are confirmed by its pushes."""
+    tracker = ActuationTracker()
+    old, new = BPUPSubscriptions(), BPUPSubscriptions()
+    tracker.issued("hub", "fan", Action.turn_on(), old)
+    tracker.issued("hub", "fan", Action.turn_on(), new)
+
+    push(new, {"power": 1})
+    assert tracker.pending == 0
+    assert tracker.histograms[("hub", "unknown", "TurnOn")].count == 2
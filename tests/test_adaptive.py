@@ -0,0 +1,63 @@
+"""Unit tests for adaptive request timeouts."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Bond, deadline_scope
+from bond_api.adaptive import AdaptiveTimeout
+from bond_api.transport import MemoryTransport
+
+
+def test_timeout_follows_latency_within_bounds():
+    """Tests the timeout tracks observed latency, backs off and stays clamped."""
+    adaptive = AdaptiveTimeout(min_timeout=0.5, max_timeout=8, initial_timeout=100)
+    assert adaptive.timeout == 8
+    adaptive.observe(0.2)
+    assert adaptive.smoothed == pytest.approx(0.2)
+    assert adaptive.timeout == pytest.approx(0.6)
+    for _ in range(50):
+        adaptive.observe(0.01)
+    assert adaptive.timeout == 0.5
+
+    adaptive.backoff()
+    adaptive.backoff()
+    assert adaptive.timeout == 2
+    assert adaptive.timeouts == 2
+    for _ in range(5):
+        adaptive.backoff()
+    assert adaptive.timeout == 8
+
+
+class _DelayTransport(MemoryTransport):
+    """Memory transport answering after a configurable delay."""
+
+    def __init__(self):
+        super().__init__({("GET", "/v2/sys/version"): {"some": "version"}})
+        self.delay = 0.0
+
+    async def request(self, method, path, json=None):
+        await asyncio.sleep(self.delay)
+        return await super().request(method, path, json)
+
+
+@pytest.mark.asyncio
+async def test_bond_requests_use_adaptive_timeout():
+    """Tests Bond bounds requests by the adaptive timeout and feeds it samples."""
+    transport = _DelayTransport()
+    adaptive = AdaptiveTimeout(min_timeout=0.02, max_timeout=1, initial_timeout=0.02)
+    bond = Bond("test-host", "test-token", transport=transport, adaptive_timeout=adaptive)
+
+    transport.delay = 0.05
+    with pytest.raises(asyncio.TimeoutError):
+        await bond.version()
+    assert adaptive.timeout == 0.04
+    with deadline_scope(0.01):
+        with pytest.raises(asyncio.TimeoutError):
+            await bond.version()
+    assert adaptive.timeouts == 1
+
+    transport.delay = 0.0
+    assert await bond.version() == {"some": "version"}
+    assert adaptive.samples == 1
+    assert adaptive.timeout == 0.02
@@ -1,10 +1,15 @@
 """Unit tests for Bond API wrapper."""
 
+import asyncio
+import time
+
 import pytest
 from aiohttp import ClientSession, ClientTimeout
 from aioresponses import CallbackResult, aioresponses
 
-from bond_api import Action, Bond, Direction
+from bond_api import Action, Bond, BPUPSubscriptions, Direction
+from bond_api.deadline import deadline_scope
+from bond_api.transport import MemoryTransport
 
 
 @pytest.fixture(name="bond")
@@ -486,3 +491,233 @@ async def test_decrease_position(bond: Bond):
             callback=callback,
         )
         await bond.action("test-device-id", Action.decrease_position(50))
+
+
+@pytest.mark.asyncio
+async def test_groups(bond: Bond):
+    """Tests API to get a list of group IDs."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/groups",
+            payload={
+                "_": "some-hash",
+                "group-1": {"_": "some-hash"},
+                "group-2": {"_": "some-hash"},
+            },
+        )
+        actual = await bond.groups()
+        assert actual == ["group-1", "group-2"]
+
+
+@pytest.mark.asyncio
+async def test_group(bond: Bond):
+    """Tests API to get group details."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/groups/group-1",
+            payload={"name": "Living Room Shades", "devices": ["device-1"]},
+        )
+        actual = await bond.group("group-1")
+        assert actual == {"name": "Living Room Shades", "devices": ["device-1"]}
+
+
+@pytest.mark.asyncio
+async def test_group_properties(bond: Bond):
+    """Tests API to get group properties."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/groups/group-1/properties",
+            payload={"some": "group properties"},
+        )
+        actual = await bond.group_properties("group-1")
+        assert actual == {"some": "group properties"}
+
+
+@pytest.mark.asyncio
+async def test_group_state(bond: Bond):
+    """Tests API to get group state."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/groups/group-1/state",
+            payload={"some": "group state"},
+        )
+        actual = await bond.group_state("group-1")
+        assert actual == {"some": "group state"}
+
+
+@pytest.mark.asyncio
+async def test_group_action(bond: Bond):
+    """Tests group action delegates to groups API."""
+    with aioresponses() as response:
+
+        def callback(_url, **kwargs):
+            assert kwargs.get("json") == {"argument": 50}
+            return CallbackResult()
+
+        response.put(
+            "http://test-host/v2/groups/group-1/actions/SetPosition",
+            callback=callback,
+        )
+        await bond.group_action("group-1", Action.set_position(50))
+
+
+@pytest.mark.asyncio
+async def test_group_state_belief(bond: Bond):
+    """Tests group belief action delegates to groups state API."""
+    with aioresponses() as response:
+
+        def callback(_url, **kwargs):
+            assert kwargs.get("json") == {"power": 1}
+            return CallbackResult()
+
+        response.patch("http://test-host/v2/groups/group-1/state", callback=callback)
+        await bond.group_action("group-1", Action.set_power_state_belief(True))
+
+
+@pytest.mark.asyncio
+async def test_device_hashes(bond: Bond):
+    """Tests API to get device hashes."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/devices",
+            payload={
+                "_": "some-hash",
+                "device-1": {"_": "hash-1"},
+                "device-2": {"_": "hash-2"},
+            },
+        )
+        actual = await bond.device_hashes()
+        assert actual == {"device-1": "hash-1", "device-2": "hash-2"}
+
+
+@pytest.mark.asyncio
+async def test_action_confirm_via_bpup():
+    """Tests confirmed actions resolve on a matching BPUP push."""
+    subscriptions = BPUPSubscriptions()
+    subscriptions.notify({"B": "ZZBL12345"})
+    transport = MemoryTransport()
+
+    def on_put(_json):
+        subscriptions.notify({"t": "devices/fan/state", "s": 200, "b": {"speed": 1}})
+        asyncio.get_event_loop().call_soon(
+            subscriptions.notify,
+            {"t": "devices/fan/state", "s": 200, "b": {"speed": 3, "power": 1}},
+        )
+
+    transport.add("PUT", "/v2/devices/fan/actions/SetSpeed", on_put)
+    bond = Bond(
+        "test-host",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=subscriptions,
+    )
+
+    state = await bond.action("fan", Action.set_speed(3), confirm=True, timeout=1)
+
+    assert state == {"speed": 3, "power": 1}
+    assert [request[0] for request in transport.requests] == ["PUT"]
+    await asyncio.sleep(0)
+    assert subscriptions.subscribers("fan") == 0
+
+
+@pytest.mark.asyncio
+async def test_action_confirm_timeout():
+    """Tests confirmed actions time out without a matching push."""
+    subscriptions = BPUPSubscriptions()
+    subscriptions.notify({"B": "ZZBL12345"})
+    transport = MemoryTransport()
+    transport.add("PUT", "/v2/devices/fan/actions/TurnOn")
+    bond = Bond(
+        "test-host",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=subscriptions,
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await bond.action("fan", Action.turn_on(), confirm=True, timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_action_confirm_falls_back_to_state_without_bpup():
+    """Tests confirmed actions read state once when BPUP is not alive."""
+    transport = MemoryTransport()
+    transport.add("PUT", "/v2/devices/fan/actions/TurnOn")
+    transport.add("GET", "/v2/devices/fan/state", {"power": 1})
+    bond = Bond(
+        "test-host",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=BPUPSubscriptions(),
+    )
+
+    assert await bond.action("fan", Action.turn_on(), confirm=True) == {"power": 1}
+    assert [request[0] for request in transport.requests] == ["PUT", "GET"]
+
+
+class _SlowTransport(MemoryTransport):
+    """Memory transport answering after a delay."""
+
+    def __init__(self, delay):
+        super().__init__({("GET", "/v2/sys/version"): {"some": "version"}})
+        self.delay = delay
+
+    async def request(self, method, path, json=None):
+        await asyncio.sleep(self.delay)
+        return await super().request(method, path, json)
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout():
+    """Tests that a per-call timeout bounds the request."""
+    bond = Bond("test-host", "test-token", transport=_SlowTransport(0.05))
+    with pytest.raises(asyncio.TimeoutError):
+        await bond.version(timeout=0.01)
+    assert await bond.version(timeout=1) == {"some": "version"}
+
+
+@pytest.mark.asyncio
+async def test_deadline_scope_bounds_composite_calls():
+    """Tests that a scoped deadline applies to every call of a composite."""
+    bond = Bond("test-host", "test-token", transport=_SlowTransport(0.03))
+    with deadline_scope(0.05):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.gather(bond.version(), bond.version(timeout=0.01))
+        await asyncio.sleep(0.03)
+        with pytest.raises(asyncio.TimeoutError):
+            await bond.version(timeout=10)
+    assert await bond.version(deadline=time.monotonic() + 1) == {"some": "version"}
+
+
+@pytest.mark.asyncio
+async def test_device_schedules(bond: Bond):
+    """Tests schedule CRUD delegates to the schedules API."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/devices/fan/schedules",
+            payload={"_": "00000000", "1a2b": {"_": "7fc1e84b"}},
+        )
+        response.post(
+            "http://test-host/v2/devices/fan/schedules",
+            payload={"id": "3c4d", "action": "TurnOff"},
+        )
+        response.delete("http://test-host/v2/devices/fan/schedules/1a2b")
+
+        assert await bond.device_schedules("fan") == ["1a2b"]
+        assert await bond.create_device_schedule("fan", {"action": "TurnOff"}) == {
+            "id": "3c4d",
+            "action": "TurnOff",
+        }
+        assert await bond.delete_device_schedule("fan", "1a2b") is None
+
+
+@pytest.mark.asyncio
+async def test_action_ignores_non_json_body(bond: Bond):
+    """Tests a write answered with a non-JSON body is not decoded."""
+    with aioresponses() as response:
+        response.put(
+            "http://test-host/v2/devices/test-device-id/actions/TurnOn",
+            body="OK",
+            content_type="text/plain",
+        )
+        assert await bond.action("test-device-id", Action.turn_on()) is None
@@ -3,6 +3,9 @@
 from unittest.mock import call, MagicMock, patch
 from typing import Optional
 import asyncio
+import os
+import socket
+import time
 import pytest
 import datetime as dt
 
@@ -203,3 +206,222 @@ async def test_start_bpup(transport):
         stop = await start_bpup("127.0.0.1", bpup_subscriptions)
 
     stop()
+
+
+@pytest.mark.asyncio
+async def test_protocol_group_subscriptions(transport):
+    bpup_subscriptions = BPUPSubscriptions()
+    bpup_protocol = BPUProtocol(bpup_subscriptions)
+    device_msgs = []
+    group_msgs = []
+
+    bpup_subscriptions.subscribe("1", device_msgs.append)
+    bpup_subscriptions.subscribe_group("1", group_msgs.append)
+    bpup_protocol.connection_made(transport)
+
+    bpup_protocol.datagram_received(
+        b'{"t":"groups/1/state","s":200,"b":{"open":1,"_":"6a2b"}}\n', MOCK_ADDR
+    )
+    assert group_msgs == [{"open": 1, "_": "6a2b"}]
+    assert device_msgs == []
+
+    bpup_protocol.datagram_received(
+        b'{"t":"devices/1/state","s":200,"b":{"open":0,"_":"7b3c"}}\n', MOCK_ADDR
+    )
+    assert device_msgs == [{"open": 0, "_": "7b3c"}]
+    assert len(group_msgs) == 1
+
+    bpup_subscriptions.unsubscribe_group("1", group_msgs.append)
+    bpup_protocol.datagram_received(
+        b'{"t":"groups/1/state","s":200,"b":{"open":0,"_":"8c4d"}}\n', MOCK_ADDR
+    )
+    assert len(group_msgs) == 1
+
+
+@pytest.mark.asyncio
+async def test_protocol_counters(transport):
+    bpup_subscriptions = BPUPSubscriptions()
+    bpup_protocol = BPUProtocol(bpup_subscriptions)
+    bpup_protocol.connection_made(transport)
+
+    bpup_protocol.datagram_received(
+        b'{"B":"KNKSADE42149","d":0,"v":"v2.29.2-beta"}\n', MOCK_ADDR
+    )
+    bpup_protocol.datagram_received(b"GIGO", MOCK_ADDR)
+
+    assert bpup_subscriptions.message_count == 1
+    assert bpup_subscriptions.parse_error_count == 1
+
+
+def test_notify_isolates_failing_callbacks(caplog):
+    bpup_subscriptions = BPUPSubscriptions()
+    received = []
+
+    def _failing(_msg):
+        raise ValueError("boom")
+
+    bpup_subscriptions.subscribe("1", _failing)
+    bpup_subscriptions.subscribe("1", received.append)
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 1}})
+
+    assert received == [{"power": 1}]
+    assert "Error in BPUP callback" in caplog.text
+    stats = bpup_subscriptions.callback_stats
+    assert stats[_failing].errors == 1
+    assert stats[received.append].calls == 1
+    assert stats[received.append].errors == 0
+
+    bpup_subscriptions.unsubscribe("1", _failing)
+    assert _failing not in bpup_subscriptions.callback_stats
+
+
+def test_notify_offloads_slow_callbacks(caplog):
+    executor = MagicMock()
+    bpup_subscriptions = BPUPSubscriptions(
+        slow_callback_threshold=0.001, executor=executor
+    )
+    calls = []
+
+    def _slow(msg):
+        calls.append(msg)
+        time.sleep(0.002)
+
+    subscription = bpup_subscriptions.subscribe("1", _slow, offload=True)
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 1}})
+    stats = bpup_subscriptions.callback_stats[_slow]
+    assert stats.slow
+    assert stats.max_time >= 0.002
+    assert "Slow BPUP callback" in caplog.text
+    assert calls == [{"power": 1}]
+
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 0}})
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 2}})
+    assert len(calls) == 1
+    # one drain job per subscription delivers queued pushes in order
+    (submitted,) = executor.submit.mock_calls
+    drain, queued = submitted.args
+    assert queued is subscription
+    drain(queued)
+    assert calls == [{"power": 1}, {"power": 0}, {"power": 2}]
+    assert not subscription.draining
+
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 3}})
+    assert len(executor.submit.mock_calls) == 2
+
+
+def test_notify_keeps_slow_callbacks_on_loop_without_offload():
+    executor = MagicMock()
+    bpup_subscriptions = BPUPSubscriptions(
+        slow_callback_threshold=0.001, executor=executor
+    )
+    calls = []
+
+    def _slow(msg):
+        calls.append(msg)
+        time.sleep(0.002)
+
+    bpup_subscriptions.subscribe("1", _slow)
+    for power in range(3):
+        bpup_subscriptions.notify(
+            {"t": "devices/1/state", "s": 200, "b": {"power": power}}
+        )
+    assert bpup_subscriptions.callback_stats[_slow].slow
+    assert calls == [{"power": 0}, {"power": 1}, {"power": 2}]
+    executor.submit.assert_not_called()
+
+
+def test_subscription_handles():
+    bpup_subscriptions = BPUPSubscriptions()
+    first, second = [], []
+    handle = bpup_subscriptions.subscribe("1", first.append)
+    bpup_subscriptions.subscribe("1", second.append)
+
+    handle.unsubscribe()
+    handle.unsubscribe()
+    bpup_subscriptions.unsubscribe("1", first.append)
+    bpup_subscriptions.unsubscribe("2", second.append)
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 1}})
+    assert first == []
+    assert second == [{"power": 1}]
+    assert bpup_subscriptions.subscribers("1") == 1
+
+
+def test_unsubscribe_during_dispatch():
+    bpup_subscriptions = BPUPSubscriptions()
+    received = []
+    handles = []
+
+    def _once(msg):
+        received.append(msg)
+        for handle in handles:
+            handle.unsubscribe()
+
+    handles.append(bpup_subscriptions.subscribe("1", _once))
+    handles.append(bpup_subscriptions.subscribe("1", received.append))
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 1}})
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 0}})
+    assert received == [{"power": 1}, {"power": 1}]
+    assert bpup_subscriptions.subscribers("1") == 0
+
+
+def test_weak_subscriptions():
+    bpup_subscriptions = BPUPSubscriptions()
+
+    class Listener:
+        def __init__(self):
+            self.received = []
+
+        def on_update(self, msg):
+            self.received.append(msg)
+
+    listener = Listener()
+    bpup_subscriptions.subscribe("1", listener.on_update, weak=True)
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 1}})
+    assert listener.received == [{"power": 1}]
+
+    del listener
+    assert bpup_subscriptions.subscribers("1") == 0
+    bpup_subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {"power": 0}})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [0, 16])
+async def test_start_bpup_tuned_socket(batch_size):
+    hub = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    hub.bind(("127.0.0.1", 0))
+    hub.settimeout(1)
+    bpup_subscriptions = BPUPSubscriptions()
+    received = []
+    bpup_subscriptions.subscribe("1", received.append)
+
+    stop = await start_bpup(
+        "127.0.0.1",
+        bpup_subscriptions,
+        port=hub.getsockname()[1],
+        rcvbuf=1 << 20,
+        local_addr=("127.0.0.1", 0),
+        batch_size=batch_size,
+    )
+    try:
+        keep_alive, addr = await asyncio.get_event_loop().run_in_executor(
+            None, hub.recvfrom, 16
+        )
+        assert keep_alive == b"\n"
+        for position in range(40):
+            hub.sendto(
+                b'{"t":"devices/1/state","s":200,"b":{"position":%d}}\n' % position,
+                addr,
+            )
+        for _ in range(100):
+            if len(received) == 40:
+                break
+            await asyncio.sleep(0.01)
+        if os.path.exists("/proc/net/udp"):
+            assert bpup_subscriptions.kernel_drops == 0
+        else:
+            assert bpup_subscriptions.kernel_drops is None
+    finally:
+        stop()
+        hub.close()
+
+    assert received == [{"position": position} for position in range(40)]
@@ -0,0 +1,95 @@
+"""Unit tests for the command line tool."""
+
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from aioresponses import CallbackResult, aioresponses
+
+from bond_api import cli
+
+
+def run(argv):
+    """Run the tool and return its NDJSON output."""
+    output = io.StringIO()
+    assert cli.main(argv, output=output) == 0
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_parse_hubs(tmp_path):
+    """Tests hubs from arguments and files with default tokens."""
+    hubs_file = tmp_path / "hubs.txt"
+    hubs_file.write_text("# fleet\nhub-2 token-2\nhub-3\n")
+    assert cli.parse_hubs(["hub-1=token-1"], str(hubs_file), "default") == {
+        "hub-1": "token-1",
+        "hub-2": "token-2",
+        "hub-3": "default",
+    }
+
+
+def test_query_state_streams_ndjson():
+    """Tests fleet state query emits a record per device and per failure."""
+    with aioresponses() as response:
+        response.get(
+            "http://hub-1/v2/devices",
+            payload={"_": "hash", "device-1": {"_": "a"}, "device-2": {"_": "b"}},
+        )
+        response.get("http://hub-1/v2/devices/device-1/state", payload={"power": 1})
+        response.get("http://hub-1/v2/devices/device-2/state", status=500)
+        records = run(["--hub", "hub-1", "--hub", "hub-2", "--token", "t", "query", "state"])
+
+    records.sort(key=lambda record: (record["hub"], record.get("device_id", "")))
+    assert records[0] == {"hub": "hub-1", "device_id": "device-1", "state": {"power": 1}}
+    assert records[1]["device_id"] == "device-2" and "error" in records[1]
+    assert records[2]["hub"] == "hub-2" and "error" in records[2]
+
+
+def test_query_requires_tokens():
+    """Tests queries are rejected for hubs without a token."""
+    with pytest.raises(SystemExit):
+        cli.main(["--hub", "hub-1", "query", "version"], output=io.StringIO())
+
+
+def test_bulk_actions(tmp_path):
+    """Tests actions from a file are executed and reported."""
+    actions_file = tmp_path / "actions.ndjson"
+    actions_file.write_text(
+        '{"hub": "hub-1", "token": "t", "device_id": "fan", "action": "SetSpeed", "argument": 2}\n'
+        '{"hub": "hub-1", "device_id": "fan", "action": "state", "argument": {"light": 1}, "after": [0]}\n'
+    )
+    with aioresponses() as response:
+
+        def callback(_url, **kwargs):
+            assert kwargs["json"] == {"argument": 2}
+            return CallbackResult()
+
+        response.put("http://hub-1/v2/devices/fan/actions/SetSpeed", callback=callback)
+        response.patch("http://hub-1/v2/devices/fan/state")
+        records = run(["actions", str(actions_file)])
+
+    assert [(record["action"], record["ok"]) for record in records] == [
+        ("SetSpeed", True),
+        ("state", True),
+    ]
+
+
+def test_monitor():
+    """Tests the monitor prints a row per hub."""
+    stopped = []
+
+    async def _mock_start_bpup(host, subscriptions):
+        subscriptions.notify({"t": "devices/1/state", "s": 200, "b": {}})
+        return lambda: stopped.append(host)
+
+    output = io.StringIO()
+    with patch.object(cli, "start_bpup", _mock_start_bpup):
+        cli.main(
+            ["--hub", "hub-1", "monitor", "--interval", "0.01", "--duration", "0.01"],
+            output=output,
+        )
+
+    lines = output.getvalue().splitlines()
+    assert lines[0].split() == ["hub", "alive", "msg/s", "last", "push", "s", "errors"]
+    assert lines[1].split()[:3] == ["hub-1", "True", "100.0"]
+    assert stopped == ["hub-1"]
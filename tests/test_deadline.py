@@ -0,0 +1,33 @@
+"""Unit tests for scoped deadlines."""
+
+import asyncio
+import time
+
+import pytest
+
+from bond_api.deadline import current_deadline, deadline_scope, time_left
+
+
+def test_nested_scopes_only_shorten():
+    """Tests nested scopes keep the earlier deadline."""
+    assert current_deadline() is None
+    assert time_left() is None
+    with deadline_scope(10) as outer:
+        with deadline_scope(100) as inner:
+            assert inner == outer
+        with deadline_scope(deadline=time.monotonic() + 1) as inner:
+            assert inner < outer
+            assert 0 < time_left() <= 1
+        assert current_deadline() == outer
+    assert current_deadline() is None
+
+
+@pytest.mark.asyncio
+async def test_scope_propagates_to_tasks():
+    """Tests tasks created within a scope inherit its deadline."""
+    async def _deadline():
+        return current_deadline()
+
+    with deadline_scope(5) as deadline:
+        assert await asyncio.ensure_future(_deadline()) == deadline
+    assert await asyncio.ensure_future(_deadline()) is None
@@ -0,0 +1,56 @@
+"""Unit tests for field-level state deltas."""
+
+from bond_api import BPUPSubscriptions
+from bond_api.deltas import StateDeltas
+
+from . import push
+
+
+def test_only_changed_fields_delivered():
+    """Tests only fields that changed are delivered, once per device subscription."""
+    subscriptions = BPUPSubscriptions()
+    deltas = StateDeltas()
+    deltas.track(subscriptions, "fan")
+    deltas.track(subscriptions, "fan")
+    received = []
+    remove = deltas.subscribe("fan", received.append)
+
+    push(subscriptions, {"power": 1, "speed": 2, "_": "aa"})
+    push(subscriptions, {"power": 1, "speed": 2, "_": "bb"})
+    push(subscriptions, {"power": 1, "speed": 3, "_": "cc"})
+    remove()
+    push(subscriptions, {"power": 0, "speed": 3, "_": "dd"})
+
+    assert received == [
+        {"power": (None, 1), "speed": (None, 2)},
+        {"speed": (2, 3)},
+    ]
+    assert deltas.state("fan") == {"power": 0, "speed": 3}
+    assert subscriptions.subscribers("fan") == 1
+
+
+def test_seed_and_failing_callback():
+    """Tests seeded state is the baseline and a failing callback is isolated."""
+    deltas = StateDeltas()
+    deltas.seed("fan", {"power": 0, "light": 1, "_": "aa"})
+    received = []
+
+    def _failing(_delta):
+        raise ValueError
+
+    deltas.subscribe("fan", _failing)
+    deltas.subscribe("fan", received.append)
+    assert deltas.update("fan", {"power": 1, "light": 1}) == {"power": (0, 1)}
+    assert received == [{"power": (0, 1)}]
+
+
+def test_track_again_after_bpup_restart():
+    """Tests tracking through new subscriptions subscribes again."""
+    deltas = StateDeltas()
+    old, new = BPUPSubscriptions(), BPUPSubscriptions()
+    assert deltas.track(old, "fan") is deltas.track(old, "fan")
+    deltas.track(new, "fan")
+
+    push(new, {"power": 1})
+    assert deltas.state("fan") == {"power": 1}
+    assert new.subscribers("fan") == 1
@@ -0,0 +1,76 @@
+"""Unit tests for hub discovery."""
+
+import asyncio
+
+import pytest
+from aioresponses import aioresponses
+
+from bond_api.discovery import DiscoveredHub, DiscoveryCache, discover, expand_hosts
+
+
+class HubStandIn(asyncio.DatagramProtocol):
+    """Answers BPUP hellos like a Bond hub."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(b'{"B":"ZZBL12345","d":0,"v":"v3.0.0"}\n', addr)
+
+
+def test_expand_hosts():
+    """Tests CIDR and list expansion."""
+    assert list(expand_hosts("192.168.1.0/30")) == ["192.168.1.1", "192.168.1.2"]
+    assert list(expand_hosts(["bond.local", "10.0.0.5/32"])) == [
+        "bond.local",
+        "10.0.0.5",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_discover_http_only():
+    """Tests hubs are verified by their version endpoint."""
+    with aioresponses() as response:
+        response.get(
+            "http://10.0.0.2/v2/sys/version",
+            payload={"bondid": "ZZBL12345", "fw_ver": "v3.0.0"},
+        )
+        response.get("http://10.0.0.3/v2/sys/version", payload={"not": "a bond"})
+        hubs = [
+            hub
+            async for hub in discover("10.0.0.0/29", bpup_probe=False, concurrency=3)
+        ]
+
+    assert hubs == [
+        DiscoveredHub(
+            "10.0.0.2", "ZZBL12345", {"bondid": "ZZBL12345", "fw_ver": "v3.0.0"}, False
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_discover_bpup_stand_in_and_cache():
+    """Tests the BPUP hello probe against a local stand-in and cache reuse."""
+    loop = asyncio.get_event_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        HubStandIn, local_addr=("127.0.0.1", 0)
+    )
+    port = transport.get_extra_info("sockname")[1]
+    cache = DiscoveryCache()
+    try:
+        with aioresponses():
+            hubs = [
+                hub
+                async for hub in discover(
+                    ["127.0.0.1"], bpup_port=port, timeout=0.5, cache=cache
+                )
+            ]
+    finally:
+        transport.close()
+
+    assert hubs == [DiscoveredHub("127.0.0.1", "ZZBL12345", None, True)]
+    assert cache.get("127.0.0.1") == (True, hubs[0])
+
+    # served from cache although the stand-in is gone
+    cached = [hub async for hub in discover(["127.0.0.1"], cache=cache)]
+    assert cached == hubs
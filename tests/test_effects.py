@@ -0,0 +1,21 @@
+"""Unit tests for action effects."""
+
+from bond_api import Action, Direction
+from bond_api.effects import expected_state, matches
+
+
+def test_expected_state():
+    """Tests predictable effects of actions."""
+    assert expected_state(Action.turn_on()) == {"power": 1}
+    assert expected_state(Action.close()) == {"open": 0}
+    assert expected_state(Action.set_speed(3)) == {"speed": 3}
+    assert expected_state(Action.set_direction(Direction.REVERSE)) == {"direction": -1}
+    assert expected_state(Action.set_brightness_belief(40)) == {"brightness": 40}
+    assert expected_state(Action(Action.TOGGLE_POWER)) is None
+
+
+def test_matches():
+    """Tests state matching against expected fields."""
+    assert matches({"power": 1, "speed": 3}, {"speed": 3})
+    assert not matches({"power": 1, "speed": 2}, {"speed": 3})
+    assert matches({"power": 1}, None)
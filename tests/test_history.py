@@ -0,0 +1,97 @@
+"""Unit tests for state history."""
+
+import sys
+
+import pytest
+
+from bond_api import BPUPSubscriptions
+from bond_api.history import AGGREGATES, RingBuffer, StateHistory
+
+
+def test_ring_buffer_wraps_and_windows():
+    """Tests the oldest samples are overwritten and windows stay ordered."""
+    buffer = RingBuffer(capacity=4)
+    for second in range(6):
+        buffer.append(float(second), float(second * 10))
+
+    assert len(buffer) == 4
+    times, values = buffer.window()
+    assert list(times) == [2.0, 3.0, 4.0, 5.0]
+    assert list(values) == [20.0, 30.0, 40.0, 50.0]
+    assert list(buffer.window(3.0, 5.0)[1]) == [30.0, 40.0]
+    assert list(buffer.window(10.0)[0]) == []
+
+
+def test_ring_buffer_grows_up_to_capacity():
+    """Tests a partially filled buffer windows its samples before wrapping."""
+    buffer = RingBuffer(capacity=3)
+    assert list(buffer.window()[0]) == []
+    buffer.append(1.0, 10.0)
+    buffer.append(2.0, 20.0)
+    assert list(buffer.window(2.0)[1]) == [20.0]
+    buffer.append(3.0, 30.0)
+    buffer.append(4.0, 40.0)
+    assert len(buffer) == 3
+    assert list(buffer.window()[1]) == [20.0, 30.0, 40.0]
+
+
+def test_state_history_records_numeric_fields():
+    """Tests only configured numeric fields are recorded."""
+    history = StateHistory(capacity=8, fields=("power", "speed", "breeze"))
+    history.record("fan", {"power": 1, "speed": 2, "breeze": [0, 50, 50]}, 1.0)
+    history.record("fan", {"power": 1, "speed": 3, "_": "hash"}, 2.0)
+
+    assert list(history.window("fan", "speed")[1]) == [2.0, 3.0]
+    assert list(history.window("fan", "breeze")[1]) == []
+    assert list(history.window("light", "power")[1]) == []
+
+
+def test_state_history_from_bpup_and_aggregates():
+    """Tests BPUP pushes feed history and aggregates span devices."""
+    clock = iter([1.0, 2.0, 3.0, 4.0])
+    history = StateHistory(clock=lambda: next(clock))
+    subscriptions = BPUPSubscriptions()
+    history.track(subscriptions, "fan-1")
+    history.track(subscriptions, "fan-2")
+    history.track(subscriptions, "light").unsubscribe()
+
+    for device_id, speed in [("fan-1", 1), ("fan-1", 3), ("fan-2", 6), ("fan-2", 2)]:
+        subscriptions.notify(
+            {"t": f"devices/{device_id}/state", "s": 200, "b": {"speed": speed}}
+        )
+
+    assert history.aggregate("speed") == {"fan-1": 2.0, "fan-2": 4.0}
+    assert history.aggregate("speed", "max", start=2.0, end=4.0) == {
+        "fan-1": 3.0,
+        "fan-2": 6.0,
+    }
+    assert history.aggregate("speed", "count", start=4.0) == {"fan-2": 1.0}
+    subscriptions.notify({"t": "devices/light/state", "s": 200, "b": {"speed": 0}})
+    assert history.devices == ("fan-1", "fan-2")
+
+
+def test_aggregates_match_without_numpy(monkeypatch):
+    """Tests the vectorized aggregates agree with the pure Python ones."""
+    pytest.importorskip("numpy")
+    history = StateHistory(capacity=4)
+    for second in range(6):
+        history.record("fan-1", {"speed": second % 4}, float(second))
+        history.record("fan-2", {"speed": 6 - second}, float(second))
+    history.record("fan-3", {"speed": 1}, 10.0)
+
+    vectorized = {how: history.aggregate("speed", how, end=8.0) for how in AGGREGATES}
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    for how, result in vectorized.items():
+        assert result == history.aggregate("speed", how, end=8.0)
+        assert set(result) == {"fan-1", "fan-2"}
+    assert vectorized["last"] == {"fan-1": 1.0, "fan-2": 1.0}
+
+
+def test_to_numpy():
+    """Tests NumPy export when NumPy is installed."""
+    numpy = pytest.importorskip("numpy")
+    history = StateHistory()
+    history.record("fan", {"speed": 2}, 1.0)
+    times, values = history.to_numpy("fan", "speed")
+    assert isinstance(values, numpy.ndarray)
+    assert values.tolist() == [2.0]
@@ -0,0 +1,82 @@
+"""Unit tests for the device index."""
+
+import pytest
+
+from bond_api import Bond, BPUPSubscriptions, DeviceType
+from bond_api.index import DeviceIndex
+from bond_api.transport import MemoryTransport
+
+from . import ConcurrencyTransport
+
+
+def _index():
+    index = DeviceIndex()
+    index.put_device("hub-1", "fan", {"type": DeviceType.CEILING_FAN, "location": "Den"})
+    index.put_device("hub-1", "shade", {"type": DeviceType.MOTORIZED_SHADES, "location": "Den"})
+    index.put_device("hub-2", "fan", {"type": DeviceType.CEILING_FAN, "location": "Bedroom"})
+    index.update_state("hub-1", "fan", {"power": 1, "speed": 2})
+    index.update_state("hub-2", "fan", {"power": 0})
+    return index
+
+
+def test_query_intersects_indexes():
+    """Tests queries return devices matching every criterion."""
+    index = _index()
+    assert index.query(device_type=DeviceType.CEILING_FAN, power=1) == {("hub-1", "fan")}
+    assert index.query(location="Den") == {("hub-1", "fan"), ("hub-1", "shade")}
+    assert index.query(hub="hub-2") == {("hub-2", "fan")}
+    assert index.query(location="Attic") == set()
+    assert len(index.query()) == len(index) == 3
+    with pytest.raises(ValueError):
+        index.query(speed=2)
+
+
+def test_reindexing_on_changes():
+    """Tests metadata and state changes move devices between index sets."""
+    index = _index()
+    subscriptions = BPUPSubscriptions()
+    index.track(subscriptions, "hub-2", "fan")
+    subscriptions.notify({"t": "devices/fan/state", "s": 200, "b": {"power": 1}})
+    assert index.query(power=1) == {("hub-1", "fan"), ("hub-2", "fan")}
+    assert index.query(power=0) == set()
+
+    index.put_device("hub-1", "fan", {"type": DeviceType.CEILING_FAN, "location": "Attic"})
+    assert index.query(location="Den") == {("hub-1", "shade")}
+    index.remove_device("hub-1", "fan")
+    assert index.query(power=1) == {("hub-2", "fan")}
+    assert index.device("hub-1", "fan") is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_from_api():
+    """Tests a refresh indexes hub devices and drops removed ones."""
+    index = _index()
+    transport = MemoryTransport(
+        {
+            ("GET", "/v2/devices"): {"_": "00", "light": {"_": "aa"}},
+            ("GET", "/v2/devices/light"): {"type": DeviceType.LIGHT, "location": "Den"},
+            ("GET", "/v2/devices/light/state"): {"light": 1, "_": "bb"},
+        }
+    )
+    await index.refresh(Bond("hub-1", "test-token", transport=transport))
+    assert index.query(hub="hub-1") == {("hub-1", "light")}
+    assert index.query(light=1) == {("hub-1", "light")}
+    assert index.state("hub-1", "light") == {"light": 1}
+
+
+@pytest.mark.asyncio
+async def test_refresh_caps_requests_per_hub():
+    """Tests a refresh sends at most the configured requests to a hub at once."""
+    routes = {("GET", "/v2/devices"): {f"d{i}": {"_": str(i)} for i in range(10)}}
+    for i in range(10):
+        routes[("GET", f"/v2/devices/d{i}")] = {"type": DeviceType.CEILING_FAN}
+        routes[("GET", f"/v2/devices/d{i}/state")] = {"power": i % 2}
+    transport = ConcurrencyTransport(routes)
+    index = DeviceIndex()
+
+    await index.refresh(
+        Bond("hub-1", "test-token", transport=transport), max_concurrency_per_hub=3
+    )
+
+    assert transport.max_in_flight == 3
+    assert len(index.query(device_type=DeviceType.CEILING_FAN, power=1)) == 5
@@ -0,0 +1,41 @@
+"""Unit tests for package level imports."""
+
+import subprocess
+import sys
+
+import pytest
+
+import bond_api
+
+
+def loads_aiohttp(statement: str) -> bool:
+    """Return if running the statement in a fresh interpreter imports aiohttp."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"{statement}\nimport sys\nprint('aiohttp' in sys.modules)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return output.strip() == "True"
+
+
+def test_push_only_imports_skip_aiohttp():
+    """Tests that BPUP and Action consumers do not import aiohttp."""
+    assert not loads_aiohttp("import bond_api.bpup")
+    assert not loads_aiohttp("from bond_api import Action, BPUPSubscriptions, start_bpup")
+    assert not loads_aiohttp(
+        "from bond_api import Bond\n"
+        "from bond_api.transport import MemoryTransport\n"
+        "Bond('host', 'token', transport=MemoryTransport())"
+    )
+    assert loads_aiohttp("from bond_api import Bond\nBond('host', 'token')")
+
+
+def test_lazy_attributes():
+    """Tests that lazily loaded attributes resolve and are listed."""
+    from bond_api.bond import Bond
+
+    assert bond_api.Bond is Bond
+    assert "SyncBond" in dir(bond_api)
+    with pytest.raises(AttributeError):
+        bond_api.NoSuchThing
@@ -0,0 +1,114 @@
+"""Unit tests for the inventory cache."""
+
+import pytest
+from aioresponses import aioresponses
+
+from bond_api import Bond
+from bond_api.inventory import InventoryCache
+
+from . import ConcurrencyTransport
+
+
+def mock_hub(response, hashes):
+    """Mock the devices list with given hashes."""
+    response.get(
+        "http://test-host/v2/devices",
+        payload={"_": "list-hash", **{key: {"_": value} for key, value in hashes.items()}},
+    )
+
+
+def mock_device(response, device_id, name):
+    """Mock device details and properties."""
+    response.get(
+        f"http://test-host/v2/devices/{device_id}", payload={"name": name, "type": "CF"}
+    )
+    response.get(
+        f"http://test-host/v2/devices/{device_id}/properties", payload={"max_speed": 3}
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_fetches_only_changed_devices(tmp_path):
+    """Tests that only devices with a new hash are re-fetched."""
+    path = str(tmp_path / "inventory.jsonl")
+    bond = Bond("test-host", "test-token")
+    cache = InventoryCache(path)
+
+    with aioresponses() as response:
+        mock_hub(response, {"device-1": "a", "device-2": "b"})
+        mock_device(response, "device-1", "Fan")
+        mock_device(response, "device-2", "Shade")
+        assert await cache.refresh(bond) == ["device-1", "device-2"]
+
+    warm = InventoryCache(path)
+    warm.load()
+    assert warm.hosts == ["test-host"]
+    assert warm.device("test-host", "device-1") == {"name": "Fan", "type": "CF"}
+    assert warm.device_properties("test-host", "device-2") == {"max_speed": 3}
+
+    with aioresponses() as response:
+        # device-1 unchanged, device-2 updated, device-3 new
+        mock_hub(response, {"device-1": "a", "device-2": "c", "device-3": "d"})
+        mock_device(response, "device-2", "Bedroom Shade")
+        mock_device(response, "device-3", "Light")
+        assert await warm.refresh(bond) == ["device-2", "device-3"]
+
+    with aioresponses() as response:
+        mock_hub(response, {"device-1": "a", "device-2": "c"})
+        assert await warm.refresh(bond) == ["device-3"]
+        mock_hub(response, {"device-1": "a", "device-2": "c"})
+        assert await warm.refresh(bond) == []
+
+    reloaded = InventoryCache(path)
+    reloaded.load()
+    assert reloaded.devices("test-host") == ["device-1", "device-2"]
+    assert reloaded.device("test-host", "device-2") == {
+        "name": "Bedroom Shade",
+        "type": "CF",
+    }
+
+
+@pytest.mark.asyncio
+async def test_start_refresh_tolerates_failing_hubs(tmp_path, caplog):
+    """Tests background refresh logs failed hubs and keeps the others."""
+    path = str(tmp_path / "inventory.jsonl")
+    cache = InventoryCache(path)
+
+    with aioresponses() as response:
+        mock_hub(response, {"device-1": "a"})
+        mock_device(response, "device-1", "Fan")
+        await cache.start_refresh(
+            [Bond("test-host", "token"), Bond("dead-host", "token")]
+        )
+
+    assert "dead-host: Inventory refresh failed" in caplog.text
+    assert cache.hosts == ["test-host"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_caps_requests_per_hub(tmp_path):
+    """Tests a cold refresh sends at most the configured requests at once."""
+    routes = {("GET", "/v2/devices"): {f"d{i}": {"_": str(i)} for i in range(10)}}
+    for i in range(10):
+        routes[("GET", f"/v2/devices/d{i}")] = {"name": f"Fan {i}"}
+        routes[("GET", f"/v2/devices/d{i}/properties")] = {}
+    transport = ConcurrencyTransport(routes)
+    cache = InventoryCache(str(tmp_path / "inventory.jsonl"))
+    bond = Bond("test-host", "test-token", transport=transport)
+
+    assert len(await cache.refresh(bond, max_concurrency_per_hub=3)) == 10
+    assert transport.max_in_flight == 3
+    assert cache.device("test-host", "d9") == {"name": "Fan 9"}
+
+
+def test_load_skips_corrupt_lines(tmp_path, caplog):
+    """Tests corrupt snapshot lines are skipped."""
+    path = tmp_path / "inventory.jsonl"
+    path.write_text(
+        'GIGO\n{"hub":"test-host","id":"device-1","hash":"a","device":{},"properties":{}}\n'
+    )
+    cache = InventoryCache(str(path))
+    cache.load()
+    assert cache.devices("test-host") == ["device-1"]
+    assert "Skipping corrupt inventory entry" in caplog.text
+    InventoryCache(str(tmp_path / "missing.jsonl")).load()
@@ -0,0 +1,102 @@
+"""Unit tests for keeping hub connections warm."""
+
+import asyncio
+
+import pytest
+from aiohttp import ClientSession
+from aioresponses import aioresponses
+
+from bond_api import Bond, BPUPSubscriptions
+from bond_api.keepwarm import KeepWarm
+from bond_api.priority import Priority, PriorityScheduler
+from bond_api.transport import MemoryTransport, StreamTransport
+
+from .test_transport import HubServer
+
+
+@pytest.mark.asyncio
+async def test_stream_transport_warm_reuses_connection():
+    """Tests warming reuses one connection and reports first-byte latency."""
+    server = HubServer()
+    host = await server.start()
+    transport = StreamTransport(host, "test-token")
+    try:
+        assert await transport.warm() > 0
+        assert await transport.warm() > 0
+    finally:
+        await transport.close()
+        await server.stop()
+    assert server.connections == 1
+    assert [path for _, path, _, _ in server.requests] == ["/v2/sys/version"] * 2
+
+
+@pytest.mark.asyncio
+async def test_keep_warm_refreshes_while_active():
+    """Tests refreshes repeat while active and stop after the active period."""
+    server = HubServer()
+    host = await server.start()
+    bond = Bond(host, "test-token", transport=StreamTransport(host, "test-token"))
+    keep_warm = KeepWarm(bond, refresh_interval=0.01, active_period=0.05)
+    subscriptions = BPUPSubscriptions()
+    keep_warm.track(subscriptions, "fan")
+    try:
+        subscriptions.notify({"t": "devices/fan/state", "s": 200, "b": {"power": 1}})
+        assert keep_warm.active
+        await asyncio.sleep(0.15)
+        assert not keep_warm.active
+    finally:
+        keep_warm.stop()
+        await server.stop()
+    assert keep_warm.stats.count >= 2
+    assert keep_warm.stats.max >= keep_warm.stats.mean > 0
+    assert keep_warm.errors == 0
+    assert server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_keep_warm_without_pooling():
+    """Tests transports without pooling record no latency."""
+    bond = Bond("test-host", "test-token", transport=MemoryTransport())
+    keep_warm = KeepWarm(bond)
+    assert await keep_warm.warm() is None
+    assert keep_warm.stats.count == 0
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_warm_needs_session():
+    """Tests aiohttp warming needs a shared session."""
+    assert await Bond("test-host", "test-token").warm() is None
+    async with ClientSession() as session:
+        bond = Bond("test-host", "test-token", session=session)
+        with aioresponses() as response:
+            response.get("http://test-host/v2/sys/version", payload={})
+            assert await bond.warm() >= 0
+
+
+@pytest.mark.asyncio
+async def test_keep_warm_not_queued_behind_background_sweep():
+    """Tests refreshes pass a saturated background lane without timing out."""
+    server = HubServer()
+    host = await server.start()
+    scheduler = PriorityScheduler(max_concurrency=4, max_background=1)
+    bond = Bond(
+        host,
+        "test-token",
+        transport=StreamTransport(host, "test-token"),
+        scheduler=scheduler,
+    )
+    keep_warm = KeepWarm(bond, refresh_interval=0.05)
+    gate = asyncio.Event()
+    sweep = [
+        asyncio.ensure_future(scheduler.run(Priority.BACKGROUND, gate.wait()))
+        for _ in range(3)
+    ]
+    try:
+        await asyncio.sleep(0)
+        assert await keep_warm.warm() > 0
+    finally:
+        gate.set()
+        await asyncio.gather(*sweep)
+        await server.stop()
+    assert keep_warm.errors == 0
+    assert scheduler.stats[Priority.NORMAL].latency.count == 1
@@ -0,0 +1,110 @@
+"""Unit tests for optimistic device state."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action, Bond, BPUPSubscriptions
+from bond_api.effects import effect
+from bond_api.optimistic import OptimisticState
+from bond_api.transport import MemoryTransport, TransportResponseError
+
+
+def test_effect_of_toggles_and_steps():
+    """Tests effects depending on the current state."""
+    state = {"power": 0, "light": 1, "brightness": 95, "direction": 1, "speed": 2}
+    assert effect(state, Action(Action.TOGGLE_POWER)) == {"power": 1}
+    assert effect(state, Action(Action.TOGGLE_LIGHT)) == {"light": 0}
+    assert effect(state, Action(Action.TOGGLE_DIRECTION)) == {"direction": -1}
+    assert effect(state, Action(Action.INCREASE_BRIGHTNESS, 10)) == {
+        "brightness": 100,
+        "light": 1,
+    }
+    assert effect(state, Action.set_speed(3)) == {"speed": 3, "power": 1}
+    assert effect(state, Action.set_speed_belief(3)) == {"speed": 3}
+    assert effect({}, Action(Action.TOGGLE_POWER)) == {}
+
+
+def test_apply_reconcile_and_rollback():
+    """Tests pending effects are layered, confirmed and rolled back."""
+    store = OptimisticState()
+    views = []
+    remove = store.add_listener(lambda device_id, view: views.append(dict(view)))
+
+    store.reconcile("fan", {"power": 0, "speed": 1, "_": "hash"})
+    pending = store.apply("fan", Action.set_speed(3))
+    assert store.state("fan") == {"power": 1, "speed": 3}
+    assert store.confirmed_state("fan") == {"power": 0, "speed": 1}
+
+    # an older push does not undo the pending effect
+    store.reconcile("fan", {"power": 0, "speed": 1})
+    assert store.state("fan") == {"power": 1, "speed": 3}
+
+    store.rollback(pending)
+    assert store.state("fan") == {"power": 0, "speed": 1}
+
+    store.apply("fan", Action.turn_on())
+    store.reconcile("fan", {"power": 1})
+    assert store.state("fan") == {"power": 1, "speed": 1}
+    assert store._pending["fan"] == []
+
+    remove()
+    assert len(views) == 6
+
+
+def test_unconfirmed_effects_expire():
+    """Tests pending effects are dropped after the timeout."""
+    store = OptimisticState(pending_timeout=0)
+    store.reconcile("fan", {"power": 0})
+    store.apply("fan", Action.turn_on())
+    assert store.state("fan") == {"power": 0}
+
+
+@pytest.mark.asyncio
+async def test_bond_applies_optimistic_effects():
+    """Tests Bond applies effects on issue, rolls back on failure and reconciles."""
+    store = OptimisticState()
+    subscriptions = BPUPSubscriptions()
+    tracked = store.track(subscriptions, "fan")
+    transport = MemoryTransport()
+    transport.add("GET", "/v2/devices/fan/state", {"power": 0, "light": 0})
+    transport.add("PUT", "/v2/devices/fan/actions/TurnOn")
+    transport.add(
+        "PUT", "/v2/devices/fan/actions/TurnLightOn", TransportResponseError(500)
+    )
+    bond = Bond("test-host", "test-token", transport=transport, optimistic_state=store)
+
+    await bond.device_state("fan")
+    await bond.action("fan", Action.turn_on())
+    assert store.state("fan") == {"power": 1, "light": 0}
+
+    with pytest.raises(TransportResponseError):
+        await bond.action("fan", Action.turn_light_on())
+    assert store.state("fan") == {"power": 1, "light": 0}
+
+    subscriptions.notify({"t": "devices/fan/state", "s": 200, "b": {"power": 1}})
+    assert store._pending["fan"] == []
+
+    tracked.unsubscribe()
+    subscriptions.notify({"t": "devices/fan/state", "s": 200, "b": {"power": 0}})
+    assert store.confirmed_state("fan")["power"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_action_keeps_effect_pending():
+    """Tests a sent action whose confirmation times out is not rolled back."""
+    store = OptimisticState()
+    subscriptions = BPUPSubscriptions()
+    subscriptions.notify({"t": "devices/light/state", "s": 200, "b": {"power": 1}})
+    transport = MemoryTransport({("PUT", "/v2/devices/fan/actions/TurnOn"): None})
+    bond = Bond(
+        "test-host",
+        "test-token",
+        transport=transport,
+        bpup_subscriptions=subscriptions,
+        optimistic_state=store,
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await bond.action("fan", Action.turn_on(), confirm=True, timeout=0.05)
+    assert store.state("fan") == {"power": 1}
@@ -0,0 +1,106 @@
+"""Unit tests for priority lanes."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action, Bond
+from bond_api.priority import Priority, PriorityScheduler, priority_scope
+from bond_api.transport import MemoryTransport
+
+
+@pytest.mark.asyncio
+async def test_higher_lanes_served_first():
+    """Tests queued requests start in priority order."""
+    scheduler = PriorityScheduler(max_concurrency=1)
+    gate = asyncio.Event()
+    order = []
+
+    async def _request(name):
+        order.append(name)
+        await gate.wait()
+
+    first = asyncio.ensure_future(scheduler.run(Priority.NORMAL, _request("first")))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.ensure_future(scheduler.run(priority, _request(priority.name)))
+        for priority in (Priority.BACKGROUND, Priority.NORMAL, Priority.INTERACTIVE)
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.queued == {
+        Priority.INTERACTIVE: 1,
+        Priority.NORMAL: 1,
+        Priority.BACKGROUND: 1,
+    }
+    gate.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["first", "INTERACTIVE", "NORMAL", "BACKGROUND"]
+    assert scheduler.stats[Priority.BACKGROUND].wait.max > 0
+    assert scheduler.stats[Priority.NORMAL].latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_background_concurrency_capped():
+    """Tests background requests never take more than their share of slots."""
+    scheduler = PriorityScheduler(max_concurrency=3, max_background=1)
+    gate = asyncio.Event()
+    running = []
+
+    async def _request(name):
+        running.append(name)
+        await gate.wait()
+
+    tasks = [
+        asyncio.ensure_future(scheduler.run(priority, _request(name)))
+        for priority, name in (
+            (Priority.BACKGROUND, "poll-1"),
+            (Priority.BACKGROUND, "poll-2"),
+            (Priority.INTERACTIVE, "press"),
+        )
+    ]
+    await asyncio.sleep(0)
+    assert running == ["poll-1", "press"]
+
+    tasks[1].cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queued[Priority.BACKGROUND] == 0
+    gate.set()
+    await asyncio.gather(tasks[0], tasks[2])
+    assert running == ["poll-1", "press"]
+
+
+@pytest.mark.asyncio
+async def test_bond_requests_use_lanes():
+    """Tests actions are interactive and other requests normal by default."""
+    transport = MemoryTransport(
+        {
+            ("GET", "/v2/devices/fan/state"): {"power": 0},
+            ("PUT", "/v2/devices/fan/actions/TurnOn"): None,
+            ("DELETE", "/v2/devices/fan/schedules/1a2b"): None,
+        }
+    )
+    scheduler = PriorityScheduler()
+    bond = Bond("test-host", "test-token", transport=transport, scheduler=scheduler)
+
+    await bond.action("fan", Action.turn_on())
+    await bond.device_state("fan")
+    await bond.delete_device_schedule("fan", "1a2b")
+    with priority_scope(Priority.BACKGROUND):
+        await bond.device_state("fan")
+
+    assert [scheduler.stats[lane].latency.count for lane in Priority] == [1, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_bond_warm_queued_as_background():
+    """Tests warm-ups default to the background lane."""
+    scheduler = PriorityScheduler()
+    bond = Bond(
+        "test-host", "test-token", transport=MemoryTransport(), scheduler=scheduler
+    )
+
+    assert await bond.warm() is None
+    with priority_scope(Priority.INTERACTIVE):
+        await bond.warm()
+
+    assert [scheduler.stats[lane].latency.count for lane in Priority] == [1, 0, 1]
@@ -0,0 +1,88 @@
+"""Unit tests for action rate limiting."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action, Bond
+from bond_api.ratelimit import RateLimiter, TokenBucket
+from bond_api.transport import MemoryTransport
+
+from . import FakeClock
+
+
+def test_token_bucket_delays_instead_of_dropping():
+    """Tests reservations beyond the burst turn into growing delays."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2.0, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+    assert bucket.wait_time() == 1.5
+
+    clock.now = 2.0
+    assert bucket.wait_time() == 0
+    assert bucket.wait_time(3.0) == 0.5
+
+
+def test_rate_limiter_per_device_and_hub_buckets():
+    """Tests device buckets are independent while sharing the hub bucket."""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        hub_rate=10, hub_burst=3, device_rate=1, device_burst=1, clock=clock
+    )
+
+    assert limiter.reserve("fan", Action.TURN_ON) == 0
+    assert limiter.wait_time("fan", Action.TURN_OFF) == 1.0
+    assert limiter.reserve("fan", Action.TURN_OFF) == 1.0
+    assert limiter.reserve("light", Action.TURN_LIGHT_ON) == 0
+    # hub burst of 3 is used up now
+    assert limiter.wait_time("shade", Action.OPEN) == pytest.approx(0.1)
+    # belief updates are not transmitted and never wait
+    assert limiter.reserve("fan", Action.SET_STATE_BELIEF) == 0
+
+
+def test_rate_limiter_action_costs():
+    """Tests per-action costs, including overrides."""
+    limiter = RateLimiter(costs={Action.TURN_ON: 0.5})
+    assert limiter.cost(Action.SET_POSITION) == 2.0
+    assert limiter.cost(Action.TURN_ON) == 0.5
+    assert limiter.cost(Action.STOP) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_bond_action_is_paced():
+    """Tests Bond waits for the limiter before sending actions."""
+    transport = MemoryTransport()
+    transport.add("PUT", "/v2/devices/fan/actions/TurnOn")
+    transport.add("PUT", "/v2/groups/shades/actions/Open")
+    limiter = RateLimiter(device_rate=20, device_burst=1)
+    bond = Bond("test-host", "test-token", transport=transport, rate_limiter=limiter)
+
+    await bond.action("fan", Action.turn_on())
+    assert limiter.wait_time("fan", Action.TURN_ON) > 0
+    await bond.action("fan", Action.turn_on())
+    await bond.group_action("shades", Action.open())
+
+    assert bond.rate_limiter is limiter
+    assert len(transport.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_timed_out_actions_refund_tokens():
+    """Tests actions cancelled while waiting leave no debt behind."""
+    transport = MemoryTransport()
+    transport.add("PUT", "/v2/devices/fan/actions/TurnOn")
+    limiter = RateLimiter(device_rate=1, device_burst=1)
+    bond = Bond("test-host", "test-token", transport=transport, rate_limiter=limiter)
+
+    await bond.action("fan", Action.turn_on())
+    before = limiter.wait_time("fan", Action.TURN_ON)
+    for _ in range(5):
+        with pytest.raises(asyncio.TimeoutError):
+            await bond.action("fan", Action.turn_on(), timeout=0.01)
+
+    assert len(transport.requests) == 1
+    assert limiter.wait_time("fan", Action.TURN_ON) <= before
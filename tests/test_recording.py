@@ -0,0 +1,75 @@
+"""Unit tests for BPUP recording and replay."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from bond_api.bpup import BPUProtocol, BPUPSubscriptions
+from bond_api.recording import BPUPRecorder, BPUPRecording, replay
+
+MOCK_ADDR = ("127.0.0.1", 30007)
+STATE_1 = b'{"t":"devices/1/state","s":200,"b":{"power":1,"_":"a"}}\n'
+STATE_2 = b'{"t":"devices/1/state","s":200,"b":{"power":0,"_":"b"}}\n'
+
+
+@pytest.mark.asyncio
+async def test_protocol_records_datagrams(tmp_path):
+    """Tests the protocol appends every datagram to the recorder."""
+    path = str(tmp_path / "bpup.rec")
+    with BPUPRecorder(path) as recorder:
+        protocol = BPUProtocol(BPUPSubscriptions(), recorder)
+        protocol.transport = MagicMock(auto_spec=asyncio.DatagramTransport)
+        protocol.datagram_received(STATE_1, MOCK_ADDR)
+        protocol.datagram_received(b"GIGO", MOCK_ADDR)
+
+    # appending to an existing log keeps earlier records
+    with BPUPRecorder(path) as recorder:
+        recorder.record(STATE_2, MOCK_ADDR)
+
+    with BPUPRecording(path) as recording:
+        records = [(addr, bytes(data)) for _, addr, data in recording]
+    assert records == [(MOCK_ADDR, STATE_1), (MOCK_ADDR, b"GIGO"), (MOCK_ADDR, STATE_2)]
+
+
+def test_truncated_and_invalid_recordings(tmp_path):
+    """Tests a torn final record is ignored and foreign files rejected."""
+    path = tmp_path / "bpup.rec"
+    with BPUPRecorder(str(path)) as recorder:
+        recorder.record(STATE_1, MOCK_ADDR, timestamp=1.0)
+        recorder.record(STATE_2, MOCK_ADDR, timestamp=2.0)
+    path.write_bytes(path.read_bytes()[:-5])
+
+    with BPUPRecording(str(path)) as recording:
+        assert [timestamp for timestamp, _, _ in recording] == [1.0]
+
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"not a recording")
+    with pytest.raises(ValueError):
+        BPUPRecording(str(other))
+
+
+@pytest.mark.asyncio
+async def test_replay_at_speed(tmp_path):
+    """Tests replay delivers messages with recorded spacing scaled by speed."""
+    path = str(tmp_path / "bpup.rec")
+    with BPUPRecorder(path) as recorder:
+        recorder.record(STATE_1, MOCK_ADDR, timestamp=100.0)
+        recorder.record(STATE_2, MOCK_ADDR, timestamp=100.2)
+
+    subscriptions = BPUPSubscriptions()
+    received = []
+    subscriptions.subscribe("1", received.append)
+    loop = asyncio.get_event_loop()
+
+    start = loop.time()
+    assert await replay(path, subscriptions, speed=2) == 2
+    elapsed = loop.time() - start
+
+    assert received == [{"power": 1, "_": "a"}, {"power": 0, "_": "b"}]
+    assert 0.09 <= elapsed < 0.5
+    assert subscriptions.alive
+
+    start = loop.time()
+    assert await replay(path, subscriptions, speed=0) == 2
+    assert loop.time() - start < 0.09
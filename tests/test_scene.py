@@ -0,0 +1,88 @@
+"""Unit tests for scene execution."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action, Scene, execute_scene
+from bond_api.scene import SceneStepSkipped
+
+
+class FakeBond:
+    """Records actions and tracks concurrency per hub."""
+
+    def __init__(self, host: str, delay: float = 0.01, fail_for=()):
+        self.host = host
+        self.delay = delay
+        self.fail_for = set(fail_for)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def action(self, device_id: str, action: Action) -> None:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if device_id in self.fail_for:
+                raise OSError("unreachable")
+            self.calls.append((device_id, action.name))
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_execute_scene_caps_concurrency_per_hub():
+    """Tests that each hub never exceeds its concurrency cap."""
+    hub_1 = FakeBond("hub-1")
+    hub_2 = FakeBond("hub-2")
+    steps = [(hub_1, f"device-{i}", Action.turn_on()) for i in range(6)]
+    steps += [(hub_2, f"device-{i}", Action.turn_off()) for i in range(6)]
+
+    results = await execute_scene(steps, max_concurrency_per_hub=2)
+
+    assert all(result.ok for result in results)
+    assert hub_1.max_active == 2
+    assert hub_2.max_active == 2
+    assert len(hub_1.calls) == 6
+    assert len(hub_2.calls) == 6
+    assert all(result.duration is not None for result in results)
+
+
+@pytest.mark.asyncio
+async def test_scene_respects_dependencies():
+    """Tests that dependent steps start after their dependencies finish."""
+    hub_1 = FakeBond("hub-1")
+    hub_2 = FakeBond("hub-2")
+    scene = Scene(max_concurrency_per_hub=4)
+    first = scene.add(hub_1, "shade", Action.close())
+    scene.add(hub_2, "light", Action.turn_light_off(), after=[first])
+
+    results = await scene.execute()
+
+    assert results[1].started >= results[0].finished
+
+
+@pytest.mark.asyncio
+async def test_scene_skips_steps_after_failed_dependency():
+    """Tests that failures are reported per step and skip dependents."""
+    hub = FakeBond("hub-1", fail_for=["broken"])
+    scene = Scene()
+    first = scene.add(hub, "broken", Action.turn_on())
+    scene.add(hub, "fan", Action.turn_on(), after=[first])
+    scene.add(hub, "other", Action.turn_on())
+
+    results = await scene.execute()
+
+    assert isinstance(results[0].error, OSError)
+    assert isinstance(results[1].error, SceneStepSkipped)
+    assert results[1].started is None
+    assert results[2].ok
+    assert hub.calls == [("other", "TurnOn")]
+
+
+def test_scene_rejects_forward_dependencies():
+    """Tests that steps may only depend on earlier steps."""
+    scene = Scene()
+    with pytest.raises(ValueError):
+        scene.add(FakeBond("hub-1"), "fan", Action.turn_on(), after=[0])
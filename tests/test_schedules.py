@@ -0,0 +1,157 @@
+"""Unit tests for schedule synchronization."""
+
+import pytest
+
+from bond_api import Bond
+from bond_api.priority import Priority, PriorityScheduler
+from bond_api.schedules import (
+    CREATE,
+    DELETE,
+    UPDATE,
+    ScheduleChange,
+    apply_schedule_changes,
+    diff_schedules,
+    sync_schedules,
+)
+from bond_api.transport import MemoryTransport, Transport
+
+from . import ConcurrencyTransport
+
+NIGHT_CLOSE = {"action": "Close", "argument": None, "time": "22:00"}
+MORNING_OPEN = {"action": "Open", "argument": None, "time": "07:00"}
+NOON_HALF = {"action": "SetPosition", "argument": 50, "time": "12:00"}
+
+
+class ScheduleHub(Transport):
+    """Schedules API of a hub that fills in fields the client left out."""
+
+    def __init__(self, schedules):
+        self.schedules = schedules
+        self.writes = []
+        self.ids = iter(f"n{index}" for index in range(100))
+
+    async def request(self, method, path, json=None):
+        parts = path.split("/")[5:]
+        if method != "GET":
+            self.writes.append((method, path))
+        if method == "GET":
+            return self.schedules[parts[0]] if parts else {"_": "0", **self.schedules}
+        if method == "POST":
+            self.schedules[next(self.ids)] = {"enabled": True, **json}
+        elif method == "PATCH":
+            self.schedules[parts[0]].update(json)
+        elif method == "DELETE":
+            del self.schedules[parts[0]]
+        return None
+
+
+def test_diff_keeps_matching_and_updates_before_deleting():
+    """Tests matching schedules are kept and leftovers reused before deleting."""
+    current = {
+        "b": {**NIGHT_CLOSE, "_": "aa"},
+        "a": {"action": "Open", "argument": None, "time": "06:00"},
+        "c": {"action": "Stop", "argument": None, "time": "08:00"},
+    }
+    assert diff_schedules("shade", current, [NIGHT_CLOSE, MORNING_OPEN]) == [
+        ScheduleChange(UPDATE, "shade", "a", MORNING_OPEN),
+        ScheduleChange(DELETE, "shade", "c"),
+    ]
+    assert diff_schedules("shade", {}, [NOON_HALF]) == [
+        ScheduleChange(CREATE, "shade", schedule=NOON_HALF)
+    ]
+    assert diff_schedules("shade", current, list(map(dict, current.values()))) == []
+
+
+def test_diff_ignores_fields_filled_in_by_hub():
+    """Tests hub schedules with extra fields match and are never patched."""
+    current = {"s1": {**NIGHT_CLOSE, "enabled": True}, "s2": {**NOON_HALF, "days": 3}}
+    assert diff_schedules("shade", current, [NIGHT_CLOSE, MORNING_OPEN]) == [
+        ScheduleChange(DELETE, "shade", "s2"),
+        ScheduleChange(CREATE, "shade", schedule=MORNING_OPEN),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sync_twice_changes_nothing():
+    """Tests a second sync after applying the first finds nothing to change."""
+    hub = ScheduleHub(
+        {
+            "s1": {**NIGHT_CLOSE, "enabled": True},
+            "s2": {**NOON_HALF, "days": 3},
+            "s3": {"action": "Stop", "argument": None, "time": "08:00"},
+        }
+    )
+    bond = Bond("test-host", "test-token", transport=hub)
+    desired = {"shade": [NIGHT_CLOSE, MORNING_OPEN, {**NOON_HALF, "time": "13:00"}]}
+
+    assert await sync_schedules(bond, desired) == [
+        ScheduleChange(UPDATE, "shade", "s3", MORNING_OPEN),
+        ScheduleChange(DELETE, "shade", "s2"),
+        ScheduleChange(CREATE, "shade", schedule={**NOON_HALF, "time": "13:00"}),
+    ]
+    assert "days" not in str(hub.schedules)
+    hub.writes.clear()
+    assert await sync_schedules(bond, desired) == []
+    assert hub.writes == []
+
+
+@pytest.mark.asyncio
+async def test_sync_applies_only_changes():
+    """Tests a dry run only reads and a sync sends only the planned changes."""
+    transport = MemoryTransport(
+        {
+            ("GET", "/v2/devices/shade/schedules"): {"_": "00", "s1": {"_": "11"}},
+            ("GET", "/v2/devices/shade/schedules/s1"): {**NIGHT_CLOSE, "_": "11"},
+            ("GET", "/v2/devices/fan/schedules"): {"f1": {}},
+            ("GET", "/v2/devices/fan/schedules/f1"): MORNING_OPEN,
+            ("POST", "/v2/devices/shade/schedules"): lambda json: {"id": "s2", **json},
+            ("DELETE", "/v2/devices/fan/schedules/f1"): None,
+        }
+    )
+    bond = Bond("test-host", "test-token", transport=transport)
+    desired = {"shade": [NIGHT_CLOSE, MORNING_OPEN], "fan": []}
+
+    planned = await sync_schedules(bond, desired, dry_run=True)
+    assert all(method == "GET" for method, _, _ in transport.requests)
+
+    transport.requests.clear()
+    assert await sync_schedules(bond, desired) == planned
+    assert [
+        request for request in transport.requests if request[0] != "GET"
+    ] == [
+        ("POST", "/v2/devices/shade/schedules", MORNING_OPEN),
+        ("DELETE", "/v2/devices/fan/schedules/f1", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_apply_changes_as_background_work():
+    """Tests schedule writes are queued in the background lane."""
+    transport = MemoryTransport({("DELETE", "/v2/devices/fan/schedules/f1"): None})
+    scheduler = PriorityScheduler()
+    bond = Bond("test-host", "test-token", transport=transport, scheduler=scheduler)
+
+    await apply_schedule_changes(bond, [ScheduleChange(DELETE, "fan", "f1")])
+
+    assert [scheduler.stats[lane].latency.count for lane in Priority] == [0, 0, 1]
+
+
+@pytest.mark.asyncio
+async def test_plan_caps_requests_per_hub():
+    """Tests planning sends at most the configured requests to a hub at once."""
+    routes = {}
+    for device in range(4):
+        schedules = {f"s{index}": {} for index in range(5)}
+        routes[("GET", f"/v2/devices/d{device}/schedules")] = schedules
+        for schedule_id in schedules:
+            routes[("GET", f"/v2/devices/d{device}/schedules/{schedule_id}")] = NOON_HALF
+    transport = ConcurrencyTransport(routes)
+    bond = Bond("test-host", "test-token", transport=transport)
+
+    desired = {f"d{device}": [NOON_HALF] * 5 for device in range(4)}
+    changes = await sync_schedules(
+        bond, desired, dry_run=True, max_concurrency_per_hub=3
+    )
+
+    assert changes == []
+    assert transport.max_in_flight == 3
@@ -0,0 +1,134 @@
+"""Unit tests for running hubs in worker processes."""
+
+import asyncio
+
+import pytest
+
+from bond_api import Action
+from bond_api.bond import Bond
+from bond_api.shard import ShardedFleet, shard_for
+from bond_api.transport import MemoryTransport, TransportResponseError
+
+
+def _memory_bond(host, token, _session, subscriptions):
+    """Create a Bond served from memory that pushes state on TurnOn."""
+
+    def _turn_on(_json):
+        subscriptions.notify(
+            {"t": "devices/fan/state", "s": 200, "b": {"power": 1, "hub": host}}
+        )
+
+    def _light_on(_json):
+        subscriptions.notify({"t": "devices/light/state", "s": 200, "b": {"light": 1}})
+        subscriptions.notify({"t": "devices/light/state", "s": 500, "b": {}})
+
+    transport = MemoryTransport(
+        {
+            ("GET", "/v2/sys/version"): {"host": host, "token": token},
+            ("PUT", "/v2/devices/light/actions/TurnLightOn"): _light_on,
+            ("GET", "/v2/bridge"): {"name": host, "padding": "x" * 2048},
+            ("PUT", "/v2/devices/fan/actions/TurnOn"): _turn_on,
+        }
+    )
+    return Bond(host, token, transport=transport, bpup_subscriptions=subscriptions)
+
+
+def test_shard_for_is_stable():
+    """Tests hosts map to the same shard every time and spread over all shards."""
+    assert shard_for("hub-1", 4) == shard_for("hub-1", 4)
+    assert {shard_for(f"hub-{i}", 4) for i in range(32)} == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_calls_and_pushes_cross_processes():
+    """Tests calls, errors and pushes travel between the fleet and its shards."""
+    hubs = {f"hub-{i}": f"token-{i}" for i in range(4)}
+    received = []
+    async with ShardedFleet(
+        hubs, shards=2, bond_factory=_memory_bond, bpup=False
+    ) as fleet:
+        assert fleet.shard_count == len({shard_for(host, 2) for host in hubs})
+        versions = await asyncio.gather(
+            *[fleet.call(host, "version") for host in hubs]
+        )
+        assert versions == [
+            {"host": host, "token": token} for host, token in hubs.items()
+        ]
+
+        pushed = asyncio.get_event_loop().create_future()
+        fleet.subscribe("hub-3", "fan", pushed.set_result)
+        fleet.subscribe("hub-3", "fan", received.append)
+        await fleet.call("hub-3", "action", "fan", Action.turn_on())
+        assert await asyncio.wait_for(pushed, 5) == {"power": 1, "hub": "hub-3"}
+        assert fleet.subscriptions("hub-3").alive
+        assert not fleet.subscriptions("hub-1").alive
+
+        with pytest.raises(TransportResponseError) as error:
+            await fleet.call("hub-0", "device", "missing")
+        assert error.value.status == 404
+        with pytest.raises(KeyError):
+            await fleet.call("unknown", "version")
+
+    assert received == [{"power": 1, "hub": "hub-3"}]
+
+
+@pytest.mark.asyncio
+async def test_thousands_of_concurrent_calls():
+    """Tests thousands of calls in flight do not stall the shard streams."""
+    hubs = {"hub-0": "token-0"}
+    async with ShardedFleet(hubs, bond_factory=_memory_bond, bpup=False) as fleet:
+        bridges = await asyncio.wait_for(
+            asyncio.gather(*[fleet.call("hub-0", "bridge") for _ in range(5000)]), 60
+        )
+    assert len(bridges) == 5000
+    assert all(bridge["name"] == "hub-0" for bridge in bridges)
+
+
+@pytest.mark.asyncio
+async def test_only_subscribed_pushes_forwarded():
+    """Tests shards send back only successful pushes the parent subscribed to."""
+
+    async def _messages(subscriptions, count):
+        for _ in range(100):
+            if subscriptions.message_count >= count:
+                return
+            await asyncio.sleep(0.05)
+
+    received = []
+    async with ShardedFleet(
+        {"hub-0": "token-0"}, bond_factory=_memory_bond, bpup=False
+    ) as fleet:
+        subscriptions = fleet.subscriptions("hub-0")
+        forwarded = []
+        notify = subscriptions.notify
+
+        def _record(json_msg):
+            forwarded.append(json_msg)
+            notify(json_msg)
+
+        subscriptions.notify = _record
+        subscriptions.subscribe("fan", received.append)
+        await fleet.call("hub-0", "action", "light", Action.turn_light_on())
+        await _messages(subscriptions, 2)
+        assert subscriptions.alive
+        assert subscriptions.subscribers("light") == 0
+
+        subscriptions.subscribe("light", received.append)
+        await fleet.call("hub-0", "action", "light", Action.turn_light_on())
+        await _messages(subscriptions, 4)
+
+    assert subscriptions.message_count == 4
+    assert [json_msg["b"] for json_msg in forwarded] == [{"light": 1}]
+    assert received == [{"light": 1}]
+
+
+def test_shard_count_skips_empty_partitions():
+    """Tests no worker is started for a partition without hubs."""
+    hubs = {"hub-0": "token"}
+    hubs.update(
+        (host, "token")
+        for host in (f"hub-{i}" for i in range(1, 64))
+        if shard_for(host, 2) == shard_for("hub-0", 2)
+    )
+    hubs = dict(list(hubs.items())[:2])
+    assert ShardedFleet(hubs, shards=2).shard_count == 1
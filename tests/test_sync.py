@@ -0,0 +1,107 @@
+"""Unit tests for the synchronous Bond facade."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from aioresponses import aioresponses
+
+from bond_api import Action, SyncBond
+from bond_api import sync
+
+
+@pytest.fixture(name="bond")
+def bond_fixture():
+    """Creates SyncBond fixture."""
+    yield SyncBond("test-host", "test-token")
+    sync.shutdown()
+
+
+def test_blocking_calls_share_loop_and_session(bond: SyncBond):
+    """Tests that blocking calls from many threads share one loop."""
+    with aioresponses() as response:
+        response.get(
+            "http://test-host/v2/sys/version",
+            payload={"some": "version"},
+            repeat=True,
+        )
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: bond.version(), range(8)))
+
+    assert results == [{"some": "version"}] * 8
+    assert SyncBond("other-host", "token")._runner is bond._runner
+
+
+def test_blocking_action(bond: SyncBond):
+    """Tests that actions are executed through the facade."""
+    with aioresponses() as response:
+        response.put("http://test-host/v2/devices/device-1/actions/TurnOn")
+        assert bond.action("device-1", Action.turn_on()) is None
+
+
+def test_unknown_attribute(bond: SyncBond):
+    """Tests that only Bond coroutine methods are exposed."""
+    with pytest.raises(AttributeError):
+        bond.no_such_method()
+    with pytest.raises(AttributeError):
+        bond._SyncBond__missing
+
+
+def test_bpup_subscriptions_from_threads(bond: SyncBond):
+    """Tests BPUP callbacks are delivered through the executor."""
+    stopped = threading.Event()
+
+    async def _mock_start_bpup(_host, _subscriptions):
+        return stopped.set
+
+    received = []
+    delivered = threading.Event()
+
+    def _on_message(msg):
+        received.append((threading.current_thread().name, msg))
+        delivered.set()
+
+    with ThreadPoolExecutor(thread_name_prefix="consumer") as executor:
+        with patch.object(sync, "start_bpup", _mock_start_bpup):
+            listener = bond.bpup(executor=executor)
+        listener.subscribe("1", _on_message)
+        listener._runner.loop.call_soon_threadsafe(
+            listener.subscriptions.notify,
+            {"t": "devices/1/state", "s": 200, "b": {"power": 1}},
+        )
+        assert delivered.wait(1)
+        listener.unsubscribe("1", _on_message)
+        listener.stop()
+        assert stopped.wait(1)
+
+    assert received[0][0].startswith("consumer")
+    assert received[0][1] == {"power": 1}
+
+
+def test_bpup_duplicate_subscriptions(bond: SyncBond):
+    """Tests each subscribe of the same callback is undone by one unsubscribe."""
+
+    async def _mock_start_bpup(_host, _subscriptions):
+        return lambda: None
+
+    async def _notify(power):
+        listener.subscriptions.notify(
+            {"t": "devices/1/state", "s": 200, "b": {"power": power}}
+        )
+
+    received = []
+    with patch.object(sync, "start_bpup", _mock_start_bpup):
+        listener = bond.bpup()
+    listener.subscribe("1", received.append)
+    listener.subscribe("1", received.append)
+    listener._runner.run(_notify(1))
+    assert received == [{"power": 1}, {"power": 1}]
+
+    listener.unsubscribe("1", received.append)
+    listener._runner.run(_notify(2))
+    listener.unsubscribe("1", received.append)
+    listener.unsubscribe("1", received.append)
+    listener._runner.run(_notify(3))
+    listener.stop()
+    assert received == [{"power": 1}, {"power": 1}, {"power": 2}]
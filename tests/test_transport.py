@@ -0,0 +1,169 @@
+"""Unit tests for transports."""
+
+import asyncio
+import json
+
+import pytest
+
+from bond_api import Action, Bond
+from bond_api.transport import (
+    MemoryTransport,
+    StreamTransport,
+    TransportResponseError,
+    _split_host,
+)
+
+
+class HubServer:
+    """Tiny HTTP/1.1 stand-in for a hub, recording requests and connections."""
+
+    def __init__(self, close_after: int = 0):
+        self.close_after = close_after
+        self.connections = 0
+        self.requests = []
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        served = 0
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line == b"\r\n":
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method, path, _ = request_line.decode().split(" ")
+                self.requests.append((method, path, headers, body))
+                if path == "/missing":
+                    status, payload = "404 Not Found", b""
+                elif method == "GET":
+                    status, payload = "200 OK", json.dumps({"path": path}).encode()
+                else:
+                    status, payload = "204 No Content", b""
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                served += 1
+                if self.close_after and served >= self.close_after:
+                    break
+        finally:
+            writer.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_transport_keeps_connection_alive():
+    """Tests requests reuse one connection and carry the token."""
+    server = HubServer()
+    host = await server.start()
+    bond = Bond(host, "test-token", transport=StreamTransport(host, "test-token"))
+    try:
+        assert await bond.device_state("device-1") == {"path": "/v2/devices/device-1/state"}
+        await bond.action("device-1", Action.set_speed(3))
+        assert await bond.version() == {"path": "/v2/sys/version"}
+    finally:
+        await server.stop()
+
+    assert server.connections == 1
+    method, path, headers, body = server.requests[1]
+    assert (method, path) == ("PUT", "/v2/devices/device-1/actions/SetSpeed")
+    assert headers["bond-token"] == "test-token"
+    assert json.loads(body) == {"argument": 3}
+
+
+@pytest.mark.asyncio
+async def test_stream_transport_reconnects_after_idle_close():
+    """Tests a connection closed by the hub is replaced transparently."""
+    server = HubServer(close_after=1)
+    host = await server.start()
+    transport = StreamTransport(host, "test-token")
+    try:
+        assert await transport.request("GET", "/a") == {"path": "/a"}
+        await asyncio.sleep(0.01)
+        assert await transport.request("GET", "/b") == {"path": "/b"}
+        with pytest.raises(TransportResponseError) as error:
+            await transport.request("GET", "/missing")
+        assert error.value.status == 404
+        await transport.close()
+    finally:
+        await server.stop()
+
+    assert server.connections == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_transport_reads_body_until_close():
+    """Tests a response without length is read until the hub closes it."""
+
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b'HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n{"power": 1}')
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    host = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    transport = StreamTransport(host, "test-token")
+    try:
+        assert await transport.request("GET", "/v2/devices/fan/state") == {"power": 1}
+        assert await transport.request("GET", "/v2/devices/fan/state") == {"power": 1}
+    finally:
+        await transport.close()
+        server.close()
+        await server.wait_closed()
+
+
+def test_split_host():
+    """Tests host parsing of names, ports and IPv6 literals."""
+    assert _split_host("bond-hub") == ("bond-hub", None)
+    assert _split_host("10.0.0.2:8080") == ("10.0.0.2", 8080)
+    assert _split_host("[fe80::1]:8080") == ("fe80::1", 8080)
+    assert _split_host("[fe80::1]") == ("fe80::1", None)
+    assert _split_host("fe80::1") == ("fe80::1", None)
+
+
+def test_stream_transport_created_outside_loop():
+    """Tests a transport created while no loop runs serves requests later."""
+    loop = asyncio.new_event_loop()
+    server = HubServer()
+    try:
+        host = loop.run_until_complete(server.start())
+        transport = StreamTransport(host, "test-token")
+        assert loop.run_until_complete(transport.request("GET", "/a")) == {"path": "/a"}
+        loop.run_until_complete(transport.close())
+        loop.run_until_complete(server.stop())
+    finally:
+        loop.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_transport():
+    """Tests the in-memory transport serves and records routes."""
+    transport = MemoryTransport({("GET", "/v2/devices"): {"device-1": {"_": "a"}}})
+    transport.add("PUT", "/v2/devices/device-1/actions/TurnOn")
+    transport.add("GET", "/v2/sys/version", TransportResponseError(401, "Unauthorized"))
+    bond = Bond("test-host", "test-token", transport=transport)
+
+    assert await bond.devices() == ["device-1"]
+    await bond.action("device-1", Action.turn_on())
+    with pytest.raises(TransportResponseError):
+        await bond.version()
+    with pytest.raises(TransportResponseError):
+        await bond.bridge()
+    assert transport.requests[1] == ("PUT", "/v2/devices/device-1/actions/TurnOn", {})